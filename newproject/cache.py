@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+
+from typing import Final
+
+from newproject.utils import get_cache_path
+
+CONFIG_CACHE_FILE_NAME: Final[str] = "config_cache.json"
+CONFIG_CACHE_VERSION: Final[int] = 4
+
+# The config resolved by this process and its cache key
+_resolved_config = None
+
+
+def file_fingerprint(file_path: str) -> dict:
+    """
+    Fingerprints a file by its mtime, size and content hash
+    :param file_path: (str) path of the file to fingerprint
+    :return: (dict) the fingerprint of the file
+    """
+    file_stat = os.stat(file_path)
+    with open(file_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    return {
+        "path": os.path.abspath(file_path),
+        "mtime_ns": file_stat.st_mtime_ns,
+        "size": file_stat.st_size,
+        "sha256": digest,
+    }
+
+
+def config_cache_key(config_files: tuple, json_schema_file: str) -> dict | None:
+    """
+    Builds the key of the validated config cache from the YAML config files and the JSON Schema file
+    :param config_files: (tuple) paths of the YAML config files, see utils.get_config_layers
+    :param json_schema_file: (str) path of the JSON Schema file
+    :return: (dict) the cache key or None if one of the files can't be read
+    """
+    try:
+        return {
+            "version": CONFIG_CACHE_VERSION,
+            "config": [file_fingerprint(config_file) for config_file in config_files],
+            "schema": file_fingerprint(json_schema_file),
+        }
+    except OSError:
+        return None
+
+
+def write_cache_file(file_name: str, content: str | bytes) -> None:
+    """
+    Atomically writes a file in the cache folder. Errors are ignored: the cache is only an optimization
+    :param file_name: (str) name of the file in the cache folder
+    :param content: (str | bytes) content to write to file
+    """
+    import tempfile
+
+    cache_path = get_cache_path()
+    try:
+        os.makedirs(cache_path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path, prefix=f".{file_name}.")
+        try:
+            with os.fdopen(fd, "wb" if isinstance(content, bytes) else "w") as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, os.path.join(cache_path, file_name))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+
+
+def load_cached_config(cache_key: dict | None) -> tuple[dict, dict, dict] | None:
+    """
+    Loads the already validated config, its compiled templates and the validated language sections if they have been
+    cached with the same key
+    :param cache_key: (dict) the key returned by config_cache_key
+    :return: the cached config, compiled templates and language sections or None on a cache miss
+    """
+    global _resolved_config
+
+    if cache_key is None:
+        return None
+    # Already loaded by this process, e.g. by the daemon
+    if _resolved_config is not None and _resolved_config[0] == cache_key:
+        return _resolved_config[1]
+
+    try:
+        with open(os.path.join(get_cache_path(), CONFIG_CACHE_FILE_NAME)) as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(cache, dict) or cache.get("key") != cache_key:
+        return None
+
+    _resolved_config = (cache_key, (cache.get("config"), cache.get("templates", {}), cache.get("sections", {})))
+
+    return _resolved_config[1]
+
+
+def store_cached_config(cache_key: dict | None, config: dict, templates: dict, sections: dict = None) -> None:
+    """
+    Caches a validated config and its compiled templates
+    :param cache_key: (dict) the key returned by config_cache_key
+    :param config: (dict) the validated config
+    :param templates: (dict) the compiled templates, see templates.compile_config_templates, with those of the
+    language sections
+    :param sections: (dict) the validated language sections, see NewProject.language_config
+    """
+    global _resolved_config
+
+    if cache_key is None:
+        return
+
+    sections = sections if sections is not None else {}
+    _resolved_config = (cache_key, (config, templates, sections))
+    try:
+        content = json.dumps({"key": cache_key, "config": config, "templates": templates, "sections": sections})
+    except (TypeError, ValueError):
+        # The config contains values that can't be stored as JSON
+        return
+
+    write_cache_file(CONFIG_CACHE_FILE_NAME, content)
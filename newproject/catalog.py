@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+
+import heapq
+import json
+import logging
+import math
+import os
+
+from array import array
+
+from collections import Counter
+from typing import Final, NamedTuple
+
+from newproject.cache import write_cache_file
+from newproject.tracing import span
+from newproject.utils import console, get_cache_path
+
+# The projects and their trigram index, mapped in memory: see load_catalog
+CATALOG_FILE_NAME: Final[str] = "catalog.index"
+# The language folders and their mtimes, small enough to be read before every creation, see find_collisions
+CATALOG_FOLDERS_FILE_NAME: Final[str] = "catalog_folders.json"
+CATALOG_VERSION: Final[int] = 2
+
+# Minimum share of the trigrams of the query a result has, the default similarity threshold of PostgreSQL's pg_trgm
+SEARCH_THRESHOLD: Final[float] = 0.3
+SEARCH_LIMIT: Final[int] = 20
+
+# Folders of a project that are recorded in the catalog
+GIT_DIR_NAME: Final[str] = ".git"
+VENV_DIR_NAME: Final[str] = "venv"
+
+
+# The separators of the words of a name are the same for the search: web-api finds web_api
+SEPARATORS: Final[dict] = str.maketrans("-. ", "___")
+
+
+def trigrams(name: str) -> set:
+    """
+    :return: (set) the trigrams of the words of a name, each padded like pg_trgm's: "  word "
+    """
+    words = [word for word in name.lower().translate(SEPARATORS).split("_") if word] or [name.lower()]
+    name_trigrams = set()
+    for word in words:
+        padded = f"  {word} "
+        name_trigrams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+
+    return name_trigrams
+
+
+def scan_folder(folder: str) -> dict:
+    """
+    :param folder: (str) a language folder
+    :return: (dict) project name -> os.stat_result of the project folder, empty if the folder doesn't exist
+    """
+    projects = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.name.startswith(".") and entry.is_dir(follow_symlinks=False):
+                    projects[entry.name] = entry.stat(follow_symlinks=False)
+    except OSError:
+        pass
+
+    return projects
+
+
+def project_record(name: str, language: str, path: str, project_stat: os.stat_result) -> dict:
+    return {
+        "name": name,
+        "language": language,
+        "path": path,
+        # The birth time where the platform has one, the time of the last metadata change otherwise
+        "created": getattr(project_stat, "st_birthtime", project_stat.st_ctime),
+        "git": os.path.isdir(os.path.join(path, GIT_DIR_NAME)),
+        "venv": os.path.isdir(os.path.join(path, VENV_DIR_NAME)),
+        "mtime_ns": project_stat.st_mtime_ns,
+    }
+
+
+class StoredCatalog(NamedTuple):
+    """
+    The sections of a catalog file that are read when they are used, see load_catalog
+    """
+    # The mapped catalog file
+    data: object
+    # The trigrams of the index, sorted and concatenated: a trigram is 3 characters
+    trigrams: str
+    # Where the posting list of every trigram starts in the project ids, then where the last one ends
+    starts: array
+    # The offset of the project ids in data
+    ids_offset: int
+    # Where every record starts in data, then where the last one ends
+    record_offsets: array
+
+    def postings(self, trigram: str) -> array:
+        """
+        :return: (array) the ids of the projects whose name contains the trigram, found by a binary search
+        """
+        low, high = 0, len(self.trigrams) // 3
+        while low < high:
+            middle = (low + high) // 2
+            if self.trigrams[middle * 3:middle * 3 + 3] < trigram:
+                low = middle + 1
+            else:
+                high = middle
+
+        project_ids = array("I")
+        if self.trigrams[low * 3:low * 3 + 3] == trigram:
+            project_ids.frombytes(self.data[
+                self.ids_offset + self.starts[low] * project_ids.itemsize:
+                self.ids_offset + self.starts[low + 1] * project_ids.itemsize
+            ])
+
+        return project_ids
+
+    def record_bytes(self, project_id: int) -> bytes:
+        return self.data[self.record_offsets[project_id]:self.record_offsets[project_id + 1]]
+
+
+class Catalog:
+    """
+    The projects of the language folders, with a trigram index of the words of their names. A project's id is its
+    position in projects: removed projects leave a None until the catalog is compacted.
+    A loaded catalog is read lazily from its file: a record and a posting list are only decoded when they are used,
+    e.g. a search only decodes the posting lists of the query and the results
+    """
+
+    def __init__(self, folders: dict = None, projects: list = None, index: dict = None, sizes: array = None,
+                 languages: dict = None, stored: StoredCatalog = None):
+        """
+        :param folders: (dict) language -> {path, mtime_ns} of its folder when it was last scanned
+        :param projects: (list) the project records (see project_record), None for the removed ones and for the
+        ones not read from stored yet
+        :param index: (dict) trigram -> the ids of the projects whose name contains it, the trigrams of stored
+        are read into it when they are used
+        :param sizes: (array) the number of trigrams of the name of every project, 0 for the removed ones
+        :param languages: (dict) language -> the ids of its projects
+        :param stored: (StoredCatalog) the file the catalog was loaded from
+        """
+        self.folders = folders or {}
+        self.projects = projects or []
+        self.index = index or {}
+        self.sizes = sizes or array("H")
+        self.languages = languages or {}
+        self.stored = stored
+
+    def record(self, project_id: int) -> dict | None:
+        record = self.projects[project_id]
+        if record is None and self.sizes[project_id]:
+            record = self.projects[project_id] = json.loads(self.stored.record_bytes(project_id))
+
+        return record
+
+    def postings(self, trigram: str) -> array:
+        """
+        :return: (array) the ids of the projects whose name contains the trigram, empty if there is none
+        """
+        project_ids = self.index.get(trigram)
+        if project_ids is None:
+            project_ids = self.index[trigram] = self.stored.postings(trigram) if self.stored else array("I")
+
+        return project_ids
+
+    def add(self, record: dict) -> None:
+        project_id = len(self.projects)
+        self.projects.append(record)
+        name_trigrams = trigrams(record["name"])
+        self.sizes.append(len(name_trigrams))
+        for trigram in name_trigrams:
+            self.postings(trigram).append(project_id)
+        self.languages.setdefault(record["language"], array("I")).append(project_id)
+
+    def remove(self, project_id: int) -> None:
+        record = self.record(project_id)
+        # The emptied posting lists are kept: they hide those of stored
+        for trigram in trigrams(record["name"]):
+            self.postings(trigram).remove(project_id)
+        self.languages[record["language"]].remove(project_id)
+        self.projects[project_id] = None
+        self.sizes[project_id] = 0
+
+    def compact(self) -> None:
+        """
+        Renumbers the projects once more than half of the ids are holes
+        """
+        live_ids = [project_id for project_id, size in enumerate(self.sizes) if size]
+        if len(live_ids) * 2 >= len(self.projects):
+            return
+
+        records = [self.record(project_id) for project_id in live_ids]
+        self.projects, self.index, self.sizes, self.languages, self.stored = [], {}, array("H"), {}, None
+        for record in records:
+            self.add(record)
+
+    def language_ids(self, language: str) -> dict:
+        """
+        :return: (dict) project name -> id of the projects of a language
+        """
+        return {self.record(project_id)["name"]: project_id for project_id in self.languages.get(language, ())}
+
+    def remove_language(self, language: str) -> None:
+        for project_id in self.language_ids(language).values():
+            self.remove(project_id)
+        self.folders.pop(language, None)
+
+    def refresh_language(self, language: str, folder: str) -> bool:
+        """
+        Brings the projects of a language up to date if its folder changed
+        :param language: (str) the language
+        :param folder: (str) its folder
+        :return: (bool) True if the folder was scanned
+        """
+        try:
+            folder_mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            folder_mtime = None
+        state = {"path": folder, "mtime_ns": folder_mtime}
+        if self.folders.get(language) == state:
+            return False
+
+        if self.folders.get(language, {}).get("path") != folder:
+            # The language's projects moved to another folder
+            self.remove_language(language)
+        known = self.language_ids(language)
+
+        # The mtime is read before the scan: a project created meanwhile is found by the next refresh
+        with span("scan_folder", folder=folder):
+            scanned = scan_folder(folder)
+        for name, project_id in known.items():
+            if name not in scanned:
+                self.remove(project_id)
+        for name, project_stat in scanned.items():
+            project_id = known.get(name)
+            if project_id is not None:
+                if self.record(project_id)["mtime_ns"] == project_stat.st_mtime_ns:
+                    continue
+                self.remove(project_id)
+            self.add(project_record(name, language, os.path.join(folder, name), project_stat))
+
+        self.folders[language] = state
+        return True
+
+    def refresh(self, language_folders: dict) -> bool:
+        """
+        Brings the catalog up to date. Only the language folders whose mtime changed (a project was created, removed
+        or renamed in them) are scanned, and only the projects whose own mtime changed are looked into again
+        :param language_folders: (dict) language -> its folder, see language_folders
+        :return: (bool) True if the catalog changed
+        """
+        changed = False
+        for language in (set(self.folders) | set(self.languages)) - set(language_folders):
+            self.remove_language(language)
+            changed = True
+
+        for language, folder in language_folders.items():
+            changed |= self.refresh_language(language, folder)
+
+        if changed:
+            self.compact()
+
+        return changed
+
+    def records(self, language: str = "") -> list:
+        """
+        :param language: (str) only the projects of this language if not empty
+        :return: (list) the project records, sorted by language and name
+        """
+        languages = [language] if language else sorted(self.languages)
+        return [
+            record
+            for records_language in languages
+            for record in sorted(
+                (self.record(project_id) for project_id in self.languages.get(records_language, ())),
+                key=lambda record: record["name"],
+            )
+        ]
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT, threshold: float = SEARCH_THRESHOLD) -> list:
+        """
+        Finds the projects whose name is the most similar to the query, like pg_trgm's word similarity: by the share
+        of the trigrams of the query the name has, so that a partial name finds the names that contain it, then by
+        the trigrams they share over the trigrams of both
+        :param query: (str) the name to look for, possibly misspelled or partial
+        :param limit: (int) the maximum number of results
+        :param threshold: (float) the minimum share of the trigrams of the query of a result, between 0 and 1
+        :return: (list) (similarity, project record) pairs, the most similar first: the similarity is the share
+        of the trigrams of the query
+        """
+        query_trigrams = trigrams(query)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self.postings(trigram))
+
+        # The names that don't share enough trigrams are dropped without looking at them
+        min_shared = math.ceil(threshold * len(query_trigrams) - 1e-9)
+        candidates = sorted(
+            ((shared_count, project_id) for project_id, shared_count in shared.items() if shared_count >= min_shared),
+            key=lambda candidate: candidate[0],
+            reverse=True,
+        )
+
+        best = []
+        for shared_count, project_id in candidates:
+            word_similarity = shared_count / len(query_trigrams)
+            if best and len(best) == limit and word_similarity < best[0][0]:
+                # The remaining candidates share fewer trigrams: none can beat the results
+                break
+            result = (word_similarity, shared_count / (len(query_trigrams) + self.sizes[project_id] - shared_count),
+                      -project_id)
+            if len(best) < limit:
+                heapq.heappush(best, result)
+            elif best and result > best[0]:
+                heapq.heapreplace(best, result)
+
+        return [(word_similarity, self.record(-negated_id)) for word_similarity, _, negated_id in sorted(best, reverse=True)]
+
+
+def read_array(data, typecode: str, offset: int, length: int) -> tuple[array, int]:
+    """
+    :return: the array of length items read from data at offset, and the offset of what follows it
+    """
+    items = array(typecode)
+    end = offset + length * items.itemsize
+    items.frombytes(data[offset:end])
+
+    return items, end
+
+
+def load_catalog() -> Catalog:
+    """
+    Loads the catalog, an empty one if it is missing, of another version, or doesn't match the folders file.
+    The file is mapped in memory: only its header, the trigram counts of the names and the ids of the projects of
+    every language are read, the records and the posting lists are read when they are used
+    """
+    import mmap
+
+    try:
+        with open(os.path.join(get_cache_path(), CATALOG_FILE_NAME), "rb") as catalog_file:
+            data = mmap.mmap(catalog_file.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(os.path.join(get_cache_path(), CATALOG_FOLDERS_FILE_NAME)) as folders_file:
+            folders = json.load(folders_file)
+        header_end = data.find(b"\n")
+        header = json.loads(data[:header_end])
+    except (OSError, ValueError):
+        return Catalog()
+
+    if not isinstance(header, dict) or not isinstance(folders, dict) or header.get("version") != CATALOG_VERSION or \
+            header.get("generation") != folders.get("generation") or array("I").itemsize != header.get("itemsize"):
+        return Catalog()
+
+    # The sections follow the header, see store_catalog
+    try:
+        projects_count = header["projects"]
+        sizes, offset = read_array(data, "H", header_end + 1, projects_count)
+        record_offsets, offset = read_array(data, "Q", offset, projects_count + 1)
+        starts, ids_offset = read_array(data, "I", offset, len(header["trigrams"]) // 3 + 1)
+        offset = ids_offset + starts[-1] * starts.itemsize
+        languages = {}
+        for language, language_count in header["languages"].items():
+            languages[language], offset = read_array(data, "I", offset, language_count)
+    except (KeyError, TypeError, ValueError, AttributeError, IndexError):
+        return Catalog()
+    if len(record_offsets) != projects_count + 1 or record_offsets[0] != offset or record_offsets[-1] != len(data):
+        return Catalog()
+
+    return Catalog(
+        folders=folders["folders"],
+        projects=[None] * projects_count,
+        sizes=sizes,
+        languages=languages,
+        stored=StoredCatalog(data=data, trigrams=header["trigrams"], starts=starts, ids_offset=ids_offset,
+                             record_offsets=record_offsets),
+    )
+
+
+def store_catalog(catalog: Catalog) -> None:
+    """
+    Writes the catalog, then its folders: the generation they share tells that they were written together.
+    The catalog file is a JSON header line followed by the trigram counts of the names, the offsets of the records,
+    the index (where the posting list of every trigram starts, then the posting lists), the ids of the projects of
+    every language and the records, a JSON object per project. The arrays are in the byte order of the machine
+    """
+    import uuid
+
+    postings = {}
+    if catalog.stored:
+        # The posting lists that were not read are copied as they are
+        stored = catalog.stored
+        for position in range(len(stored.trigrams) // 3):
+            trigram = stored.trigrams[position * 3:position * 3 + 3]
+            if trigram not in catalog.index:
+                postings[trigram] = stored.data[
+                    stored.ids_offset + stored.starts[position] * stored.starts.itemsize:
+                    stored.ids_offset + stored.starts[position + 1] * stored.starts.itemsize
+                ]
+    postings.update(
+        (trigram, project_ids.tobytes()) for trigram, project_ids in catalog.index.items() if project_ids
+    )
+    index_trigrams = sorted(postings)
+    starts = array("I", [0])
+    for trigram in index_trigrams:
+        starts.append(starts[-1] + len(postings[trigram]) // starts.itemsize)
+
+    records = []
+    for project_id, record in enumerate(catalog.projects):
+        if record is not None:
+            records.append(json.dumps(record).encode())
+        elif catalog.sizes[project_id]:
+            records.append(catalog.stored.record_bytes(project_id))
+        else:
+            records.append(b"")
+
+    generation = uuid.uuid4().hex
+    header = json.dumps({
+        "version": CATALOG_VERSION,
+        "generation": generation,
+        "itemsize": array("I").itemsize,
+        "projects": len(catalog.projects),
+        "trigrams": "".join(index_trigrams),
+        "languages": {language: len(project_ids) for language, project_ids in catalog.languages.items()},
+    }).encode() + b"\n"
+    sections = [
+        catalog.sizes.tobytes(),
+        # Filled in once the offset of the records is known
+        b"",
+        starts.tobytes(),
+        *(postings[trigram] for trigram in index_trigrams),
+        *(project_ids.tobytes() for project_ids in catalog.languages.values()),
+    ]
+    record_offsets = array("Q")
+    record_offsets.append(len(header) + sum(map(len, sections)) + (len(catalog.projects) + 1) * record_offsets.itemsize)
+    for record in records:
+        record_offsets.append(record_offsets[-1] + len(record))
+    sections[1] = record_offsets.tobytes()
+
+    write_cache_file(CATALOG_FILE_NAME, b"".join([header, *sections, *records]))
+    write_cache_file(CATALOG_FOLDERS_FILE_NAME, json.dumps({
+        "version": CATALOG_VERSION, "generation": generation, "folders": catalog.folders
+    }))
+
+
+def find_collisions(project_name: str, projects_dir: str) -> list:
+    """
+    Finds the projects with the same name in the other language folders of the catalog. Only the small folders file
+    is read, and the folders are checked on disk: the projects created since the last refresh are found too
+    :param project_name: (str) the name of the new project
+    :param projects_dir: (str) the folder the new project is created in
+    :return: (list) (language, project folder) of the projects with the same name
+    """
+    try:
+        with open(os.path.join(get_cache_path(), CATALOG_FOLDERS_FILE_NAME)) as folders_file:
+            folders = json.load(folders_file)["folders"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+    collisions = []
+    for language, state in folders.items():
+        project_dir = os.path.join(state["path"], project_name)
+        if os.path.normpath(state["path"]) != os.path.normpath(projects_dir) and os.path.isdir(project_dir):
+            collisions.append((language, project_dir))
+
+    return collisions
+
+
+def language_folders() -> dict:
+    """
+    Gets the projects folder of every language from the cached config: only the folder names are read, the language
+    sections are not validated. On a cache miss, the config is loaded and validated, see NewProject.language_folders
+    :return: (dict) language -> its projects folder, the first language wins when several share a folder
+    """
+    from pathlib import Path
+
+    from newproject.cache import config_cache_key, load_cached_config
+    from newproject.languages import LanguagePluginError, get_language, language_names
+    from newproject.utils import get_config_layers, get_config_path
+
+    cached_config = load_cached_config(cache_key=config_cache_key(
+        config_files=get_config_layers(), json_schema_file=f"{get_config_path()}/schema/json_schema.json"
+    ))
+    if cached_config is None:
+        from newproject.newproject import NewProject
+
+        return NewProject().language_folders()
+
+    config = cached_config[0]
+    dev_dir = f"{Path.home()}/{config['development_dir_path']}"
+    folders = {}
+    for language in language_names():
+        try:
+            registered_language = get_language(language)
+        except LanguagePluginError as plugin_error:
+            logging.debug(plugin_error)
+            continue
+        section = config.get(registered_language.section)
+        projects_dir_name = (section if isinstance(section, dict) else {}).get(
+            "projects_dir_name", registered_language.defaults.get("projects_dir_name")
+        )
+        folder = os.path.join(dev_dir, projects_dir_name) if isinstance(projects_dir_name, str) else None
+        if folder and folder not in folders.values():
+            folders[language] = folder
+
+    return folders
+
+
+def update_catalog(refresh: bool = False) -> Catalog:
+    """
+    Loads the catalog of the development folder and brings it up to date
+    :param refresh: (bool) scans every language folder again
+    :return: (Catalog) the catalog
+    """
+    with span("language_folders"):
+        folders = language_folders()
+    catalog = Catalog() if refresh else load_catalog()
+    with span("refresh_catalog", folders=len(folders)):
+        if catalog.refresh(folders):
+            store_catalog(catalog)
+
+    return catalog
+
+
+def print_projects(records: list, output: str, similarities: list = None) -> None:
+    from newproject.newproject import OUTPUT_MODES, check_choice
+
+    check_choice(value=output, choices=OUTPUT_MODES, option="--output")
+    if output == "json":
+        if similarities is not None:
+            records = [{**record, "similarity": similarity} for record, similarity in zip(records, similarities)]
+        print(json.dumps(records))
+        return
+
+    import time
+
+    from rich.table import Table
+
+    table = Table(box=None, header_style="dodger_blue1")
+    for column in ("name", "language", "created", "git", "venv", "path"):
+        table.add_column(column, overflow="fold" if column == "path" else None)
+    for record in records:
+        table.add_row(
+            f"[green]{record['name']}[/green]",
+            record["language"],
+            time.strftime("%Y-%m-%d", time.localtime(record["created"])),
+            "✓" if record["git"] else "",
+            "✓" if record["venv"] else "",
+            record["path"],
+        )
+
+    console.print(table)
+    console.print(f"\n{len(records)} projects")
+
+
+def list_projects(language: str = "", output: str = "text", refresh: bool = False) -> None:
+    """
+    List the projects of the development folder
+    """
+    print_projects(update_catalog(refresh=refresh).records(language=language), output=output)
+
+
+def search_projects(query: str, limit: int = SEARCH_LIMIT, output: str = "text") -> None:
+    """
+    Find projects by name, even misspelled
+    """
+    if limit < 1:
+        import typer
+
+        raise typer.BadParameter("must be at least 1", param_hint="--limit")
+
+    catalog = update_catalog()
+    with span("search_catalog", query=query):
+        results = catalog.search(query=query, limit=limit)
+
+    print_projects([record for _, record in results], output=output, similarities=[similarity for similarity, _ in results])
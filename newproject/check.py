@@ -6,41 +6,46 @@ import sys
 
 from typing import Final
 
-import jsonschema
-
-from rich.console import Console
-
 import newproject.error_codes
 from newproject.error_logger import log_error
+from newproject.schema_validator import compile_validator
 
 EXIT_FAILURE: Final[int] = 1  # lol C
 
-# rich config
-console = Console()
-
 
 def config_file_validator(config_file, json_schema) -> bool | None:
-    try:
-        jsonschema.validate(instance=config_file, schema=json_schema)
-        return True
-    except jsonschema.ValidationError as validation_error:
-        if validation_error.relative_path:
-            print(f"{validation_error.relative_path[0]}:")
-
-            message_len = len(validation_error.relative_path) - 1
-            if validation_error.validator == "required":
-                print(f"  {validation_error.message[1:-24]} (missing)\n")
-            else:
-                print(f"  {validation_error.relative_path[message_len]}:(type error)\n")
-
-        if validation_error.context:
-            print(validation_error.context)
-        if validation_error.cause:
-            print(validation_error.cause)
-
-        # print(f"newproject: yaml config file error: {validation_error.message}")
-        log_error(error_code=newproject.error_codes.YAML_CONFIG_FILE_GENERIC_ERROR, yaml_error=validation_error.message)
-        sys.exit(EXIT_FAILURE)
+    # Specialised validator compiled from the JSON Schema, jsonschema is only the fallback
+    validate = compile_validator(json_schema)
+    if validate is not None:
+        validation_error = validate(config_file)
+        if validation_error is None:
+            return True
+    else:
+        import jsonschema
+
+        try:
+            jsonschema.validate(instance=config_file, schema=json_schema)
+            return True
+        except jsonschema.ValidationError as jsonschema_validation_error:
+            validation_error = jsonschema_validation_error
+
+    if validation_error.relative_path:
+        print(f"{validation_error.relative_path[0]}:")
+
+        message_len = len(validation_error.relative_path) - 1
+        if validation_error.validator == "required":
+            print(f"  {validation_error.message[1:-24]} (missing)\n")
+        else:
+            print(f"  {validation_error.relative_path[message_len]}:(type error)\n")
+
+    if validation_error.context:
+        print(validation_error.context)
+    if validation_error.cause:
+        print(validation_error.cause)
+
+    # print(f"newproject: yaml config file error: {validation_error.message}")
+    log_error(error_code=newproject.error_codes.YAML_CONFIG_FILE_GENERIC_ERROR, yaml_error=validation_error.message)
+    sys.exit(EXIT_FAILURE)
 
 
 def dev_dir_check(dev_dir: str) -> None | bool:
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import os
+
+from typing import Final
+
+
+class ConfigLayerError(ValueError):
+    pass
+
+
+def merge_config(base: dict, override: dict) -> dict:
+    """
+    Merges a config layer: the sections are merged key by key, the other values (lists included) are replaced
+    :param base: (dict) the config of the lower layers
+    :param override: (dict) the config layer
+    :return: (dict) the merged config, the arguments are not modified
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+
+    return merged
+
+
+# Keys of the language sections whose value is a folder
+PATH_KEYS: Final[tuple] = ("template_dir", "wheelhouse")
+
+
+def resolve_layer_paths(layer_config: dict, layer_file: str) -> None:
+    """
+    Makes the folders of a layer (template directories, wheelhouses) absolute: a relative one is relative to
+    the layer's file
+    """
+    layer_dir = os.path.dirname(os.path.abspath(layer_file))
+    for section in layer_config.values():
+        if not isinstance(section, dict):
+            continue
+        for key in PATH_KEYS:
+            if isinstance(section.get(key), str) and section[key]:
+                section[key] = os.path.join(layer_dir, os.path.expanduser(section[key]))
+
+
+def load_config_layers(layer_files: tuple) -> dict:
+    """
+    Loads and merges the config files
+    :param layer_files: (tuple) the config files, in increasing order of precedence, see utils.get_config_layers
+    :return: (dict) the resolved config
+    :raises FileNotFoundError: if a file doesn't exist
+    :raises ConfigLayerError: if a file is not a YAML mapping
+    """
+    import yaml
+
+    config = {}
+    for layer_file in layer_files:
+        with open(layer_file) as layer_f:
+            try:
+                layer_config = yaml.safe_load(layer_f)
+            except yaml.YAMLError as yaml_error:
+                raise ConfigLayerError(f"{layer_file}: {yaml_error}") from yaml_error
+        if layer_config is None:
+            continue
+        if not isinstance(layer_config, dict):
+            raise ConfigLayerError(f"{layer_file}: the config must be a mapping")
+
+        resolve_layer_paths(layer_config=layer_config, layer_file=layer_file)
+        config = merge_config(config, layer_config)
+
+    return config
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+
+from typing import Final
+
+from newproject.utils import get_cache_path
+
+SOCKET_FILE_NAME: Final[str] = "daemon.sock"
+
+
+def get_socket_path() -> str:
+    """
+    Gets the path of the daemon's Unix domain socket, $NEWPROJECT_SOCKET overrides the default one
+    :return: (str) the socket path
+    """
+    return os.environ.get("NEWPROJECT_SOCKET") or os.path.join(get_cache_path(), SOCKET_FILE_NAME)
+
+
+def send_request(args: list, socket_path: str = "") -> dict:
+    """
+    Forwards the command line arguments of a creation to the daemon
+    :param args: (list) the arguments of newproject, e.g. ["--bash", "project_name"]
+    :param socket_path: (str) the daemon's socket, the default one if empty
+    :return: (dict) the response of the daemon: the output and the exit code of the creation
+    :raises OSError: if no daemon is listening on the socket or the connection fails
+    :raises ValueError: if the daemon couldn't run the creation or its response is not valid
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        client_socket.connect(socket_path or get_socket_path())
+        with client_socket.makefile("rwb") as stream:
+            stream.write(json.dumps({"args": args}).encode() + b"\n")
+            stream.flush()
+            response = json.loads(stream.readline())
+
+    if not isinstance(response, dict) or "error" in response or \
+            not isinstance(response.get("exit_code"), int) or not isinstance(response.get("output"), str):
+        raise ValueError(f"the daemon couldn't run the creation: {response}")
+
+    return response
+
+
+def client() -> None:
+    """
+    Thin client entry point: runs the creation in the daemon if one is running, in process otherwise.
+    The daemon doesn't see the current folder's .newproject.yaml, so the creation runs in process if there is one
+    """
+    from newproject.utils import DIRECTORY_CONFIG_FILE_NAME
+
+    response = None
+    if not os.path.isfile(DIRECTORY_CONFIG_FILE_NAME):
+        try:
+            response = send_request(sys.argv[1:])
+        except (OSError, ValueError):
+            # No daemon, or it failed: the creation runs in process
+            pass
+
+    if response is None:
+        from newproject.newproject import main
+
+        main()
+        return
+
+    sys.stdout.write(response["output"])
+    sys.exit(response["exit_code"])
+
+
+class NewProjectRunner:
+    """
+    Keeps a warm NewProject instance, reloaded when the YAML config files, the JSON Schema or the installed
+    language plugins change
+    """
+
+    def __init__(self):
+        self.new_project = None
+        self.command = None
+        self.config_stamp = None
+
+    @staticmethod
+    def get_config_stamp() -> tuple:
+        from pathlib import Path
+
+        from newproject.languages import plugins_cache_key
+        from newproject.utils import get_config_layer_candidates, get_config_path, get_default_config_file
+
+        # Every candidate config file, so that adding or removing one is noticed too
+        config_files = [
+            get_default_config_file(),
+            *get_config_layer_candidates(home=str(Path.home()), cwd=os.getcwd()),
+            f"{get_config_path()}/schema/json_schema.json",
+        ]
+        stamp = []
+        for file_path in config_files:
+            try:
+                file_stat = os.stat(file_path)
+                stamp.append((file_path, file_stat.st_mtime_ns, file_stat.st_size))
+            except OSError:
+                stamp.append((file_path, None, None))
+        # The installed language plugins
+        stamp.append(tuple(plugins_cache_key().values()))
+
+        return tuple(stamp)
+
+    def load(self) -> None:
+        """
+        (Re)loads the config if it changed since the last creation
+        """
+        import typer
+
+        from newproject.newproject import NewProject, import_typer
+
+        config_stamp = self.get_config_stamp()
+        if self.new_project is None or config_stamp != self.config_stamp:
+            from newproject.languages import find_plugins, get_language
+            from newproject.utils import find_config_layers
+
+            find_config_layers.cache_clear()
+            find_plugins.cache_clear()
+            get_language.cache_clear()
+            import_typer()
+            self.new_project = NewProject()
+            app = typer.Typer(add_completion=False)
+            app.command()(self.new_project.handle)
+            self.command = typer.main.get_command(app)
+            self.config_stamp = config_stamp
+
+    def run(self, args: list) -> tuple[int, str]:
+        """
+        Runs a creation as `newproject <args>` would
+        :param args: (list) the command line arguments
+        :return: the exit code and the output of the creation
+        """
+        import click
+
+        from newproject.report import get_output_mode, reporting
+        from newproject.tracing import get_trace_file, span, tracing
+
+        from newproject.utils import console
+
+        # The console, the subprocesses (see newproject.run_command) and the plain prints all write to the output
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output), console.capture_output(output), \
+                tracing(get_trace_file(args)), span("newproject daemon", args=args):
+            try:
+                with reporting(get_output_mode(args)):
+                    self.load()
+                    exit_code = self.command.main(args=args, prog_name="newproject", standalone_mode=False)
+            except click.ClickException as click_error:
+                click_error.show()
+                exit_code = click_error.exit_code
+            except SystemExit as system_exit:
+                exit_code = system_exit.code
+            except Exception as daemon_error:
+                print(f"newproject: error: {daemon_error}")
+                exit_code = 1
+
+        if not isinstance(exit_code, int):
+            exit_code = 0 if exit_code is None else 1
+
+        return exit_code, output.getvalue()
+
+
+def serve(socket_path: str = "") -> None:
+    """
+    Keep newproject warm and serve project creations over a Unix domain socket
+    """
+    from newproject.error_codes import DAEMON_ALREADY_RUNNING_ERROR
+    from newproject.error_logger import log_error
+
+    socket_path = socket_path or get_socket_path()
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+
+    # A socket left behind by a daemon that didn't shut down cleanly is removed
+    if os.path.exists(socket_path):
+        try:
+            send_request(["--version"], socket_path=socket_path)
+        except (ConnectionError, FileNotFoundError):
+            os.unlink(socket_path)
+        except ValueError:
+            # A daemon answered, with an error
+            pass
+        if os.path.exists(socket_path):
+            log_error(error_code=DAEMON_ALREADY_RUNNING_ERROR, socket_path=socket_path)
+            sys.exit(1)
+
+    runner = NewProjectRunner()
+    runner.load()
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server_socket:
+        server_socket.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        server_socket.listen()
+        print(f"newproject daemon listening on {socket_path}", flush=True)
+        try:
+            serve_forever(server_socket, runner)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def answer_request(stream, runner: NewProjectRunner) -> None:
+    """
+    Runs the creation of a request and writes its response: the exit code and the output of the creation, or an
+    error object if it can't be run, for which the client runs the creation in process
+    :param stream: the connection's binary file
+    :param runner: the warm NewProject runner
+    :raises OSError: if the client is gone
+    """
+    try:
+        request = json.loads(stream.readline())
+        if not isinstance(request, dict) or not isinstance(request.get("args"), list) or \
+                not all(isinstance(arg, str) for arg in request["args"]):
+            raise ValueError("expected {\"args\": [str, ...]}")
+        exit_code, output = runner.run(request["args"])
+        response = {"exit_code": exit_code, "output": output}
+    except ValueError as request_error:
+        response = {"error": f"invalid request: {request_error}"}
+
+    stream.write(json.dumps(response).encode() + b"\n")
+
+
+def serve_forever(server_socket: socket.socket, runner: NewProjectRunner) -> None:
+    """
+    Serves the creation requests one at a time: the output of a creation is captured process-wide
+    :param server_socket: the listening socket
+    :param runner: the warm NewProject runner
+    """
+    while True:
+        try:
+            connection, _ = server_socket.accept()
+        except OSError:
+            # The socket has been closed
+            return
+        try:
+            with connection, connection.makefile("rwb") as stream:
+                answer_request(stream, runner)
+        except OSError:
+            # The client is gone
+            continue
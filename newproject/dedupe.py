@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import stat
+
+from collections import Counter, defaultdict
+from typing import Final, NamedTuple
+
+from newproject.disk_usage import MAX_SCAN_WORKERS, disk_size, format_size
+from newproject.tracing import span
+from newproject.utils import console
+
+# The content-addressed store, in the python projects folder: hardlinks can't cross filesystems, and the catalog
+# ignores the hidden folders
+STORE_DIR_NAME: Final[str] = ".newproject-store"
+HASH_CHUNK_SIZE: Final[int] = 1024 * 1024
+# Write permission bits, removed from the stored files
+WRITE_BITS: Final[int] = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+class VenvFile(NamedTuple):
+    path: str
+    size: int
+    # The permissions of the file once deduplicated: read-only
+    mode: int
+    # Bytes freed when the file is replaced by a hardlink: 0 if its content is shared with another file already
+    freed: int
+
+
+class DedupeResult(NamedTuple):
+    files: int
+    linked: int
+    freed: int
+    collected: int
+
+
+def store_name(digest: str, mode: int) -> str:
+    """
+    :return: (str) the path of a content in the store, relative to the store: files only share an inode, and so
+    their permissions, with the files of the same mode
+    """
+    return os.path.join(digest[:2], f"{digest[2:]}-{mode:o}")
+
+
+def file_digest(path: str) -> str:
+    """
+    :return: (str) the sha256 of a file, "" if it can't be read
+    """
+    sha256 = hashlib.sha256()
+    try:
+        with open(path, "rb") as venv_file:
+            # hashlib releases the GIL on large updates: the files are hashed in parallel
+            while chunk := venv_file.read(HASH_CHUNK_SIZE):
+                sha256.update(chunk)
+    except OSError:
+        return ""
+
+    return sha256.hexdigest()
+
+
+def scan_store(store_dir: str) -> tuple:
+    """
+    :return: (tuple) the (device, inode) of the stored files and the sizes they have
+    """
+    inodes, sizes = set(), set()
+    for root, _, file_names in os.walk(store_dir):
+        for file_name in file_names:
+            try:
+                file_stat = os.stat(os.path.join(root, file_name), follow_symlinks=False)
+            except OSError:
+                continue
+            inodes.add((file_stat.st_dev, file_stat.st_ino))
+            sizes.add(file_stat.st_size)
+
+    return inodes, sizes
+
+
+def scan_venv(venv_dir: str, store_inodes: set) -> list:
+    """
+    :return: (list) the VenvFile of the regular files of a venv that are not in the store yet, empty files excluded
+    """
+    venv_files = []
+    for root, _, file_names in os.walk(venv_dir):
+        for name in file_names:
+            path = os.path.join(root, name)
+            try:
+                file_stat = os.stat(path, follow_symlinks=False)
+            except OSError:
+                continue
+            if not stat.S_ISREG(file_stat.st_mode) or not file_stat.st_size or \
+                    (file_stat.st_dev, file_stat.st_ino) in store_inodes:
+                continue
+            venv_files.append(VenvFile(
+                path, file_stat.st_size, stat.S_IMODE(file_stat.st_mode) & ~WRITE_BITS,
+                disk_size(file_stat) if file_stat.st_nlink == 1 else 0,
+            ))
+
+    return venv_files
+
+
+def link_to_store(stored: str, path: str) -> None:
+    """
+    Atomically replaces a file with a hardlink to a stored file
+    """
+    temp_path = f"{path}.dedupe-{os.getpid()}"
+    os.link(stored, temp_path)
+    try:
+        os.replace(temp_path, path)
+    except OSError:
+        os.unlink(temp_path)
+        raise
+
+
+def add_to_store(stored: str, venv_file: VenvFile) -> None:
+    """
+    Links a file into the store and makes it read-only: the venvs can still replace or delete it,
+    e.g. pip does when it upgrades a package, but a write in place, which the other venvs would see, is refused
+    :raises FileExistsError: if another process stored the content first
+    """
+    os.makedirs(os.path.dirname(stored), exist_ok=True)
+    os.link(venv_file.path, stored)
+    os.chmod(stored, venv_file.mode)
+
+
+def collect_store(store_dir: str) -> int:
+    """
+    Deletes the stored files that no venv links to anymore
+    :return: (int) the bytes freed
+    """
+    collected = 0
+    for root, _, file_names in os.walk(store_dir):
+        for file_name in file_names:
+            path = os.path.join(root, file_name)
+            try:
+                file_stat = os.stat(path, follow_symlinks=False)
+                if file_stat.st_nlink == 1:
+                    os.unlink(path)
+                    collected += disk_size(file_stat)
+            except OSError:
+                pass
+
+    return collected
+
+
+def link_group(stored: str, group_files: list) -> tuple[int, int]:
+    """
+    Replaces identical venv files with hardlinks to their stored file, which is added to the store if it's missing
+    :param stored: (str) the stored file
+    :param group_files: (list) the venv files with its content and mode
+    :return: (tuple) the number of files linked and the bytes freed
+    """
+    if not os.path.exists(stored):
+        if len(group_files) == 1:
+            # Only the size matched a stored file
+            return 0, 0
+        try:
+            add_to_store(stored, group_files[0])
+            group_files = group_files[1:]
+        except FileExistsError:
+            pass
+        except OSError:
+            return 0, 0
+
+    linked = freed = 0
+    for venv_file in group_files:
+        try:
+            if os.path.getsize(stored) != venv_file.size:
+                continue
+            link_to_store(stored, venv_file.path)
+        except OSError:
+            # e.g. the venv is on another filesystem
+            continue
+        linked += 1
+        freed += venv_file.freed
+
+    return linked, freed
+
+
+def dedupe_venvs(venv_dirs: list, store_dir: str) -> DedupeResult:
+    """
+    Replaces the files the venvs have in common with hardlinks into a content-addressed store. Only the files whose
+    size matches another file or a stored one are hashed, in parallel
+    :param venv_dirs: (list) the venvs
+    :param store_dir: (str) the store, on the filesystem of the venvs
+    :return: (DedupeResult) the files looked into, the files linked and the bytes freed, by the links and by
+    deleting the stored files no venv links to anymore
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with span("scan_venvs", venvs=len(venv_dirs)):
+        store_inodes, store_sizes = scan_store(store_dir)
+        venv_files = [venv_file for venv_dir in venv_dirs for venv_file in scan_venv(venv_dir, store_inodes)]
+
+    size_counts = Counter(venv_file.size for venv_file in venv_files)
+    candidates = [
+        venv_file for venv_file in venv_files if size_counts[venv_file.size] > 1 or venv_file.size in store_sizes
+    ]
+    with span("hash_venv_files", files=len(candidates)), ThreadPoolExecutor(max_workers=MAX_SCAN_WORKERS) as executor:
+        digests = list(executor.map(file_digest, [venv_file.path for venv_file in candidates]))
+
+    groups = defaultdict(list)
+    for venv_file, digest in zip(candidates, digests):
+        if digest:
+            groups[store_name(digest, venv_file.mode)].append(venv_file)
+
+    linked = freed = 0
+    with span("link_venv_files", groups=len(groups)):
+        for name, group_files in groups.items():
+            group_linked, group_freed = link_group(os.path.join(store_dir, name), group_files)
+            linked += group_linked
+            freed += group_freed
+
+    return DedupeResult(len(venv_files), linked, freed, collect_store(store_dir))
+
+
+def python_venvs() -> tuple:
+    """
+    :return: (tuple) the python projects folder and the venvs of its projects
+    """
+    from newproject.catalog import scan_folder
+    from newproject.languages import get_language
+    from newproject.newproject import NewProject
+
+    new_project = NewProject()
+    projects_dir = os.path.join(
+        new_project.DEV_DIR, new_project.language_config(get_language("python"))["projects_dir_name"]
+    )
+
+    return projects_dir, [
+        os.path.join(projects_dir, name, "venv")
+        for name in sorted(scan_folder(projects_dir))
+        if os.path.isdir(os.path.join(projects_dir, name, "venv"))
+    ]
+
+
+def dedupe(output: str = "text") -> None:
+    """
+    Replace the files the python venvs have in common with hardlinks
+    """
+    from newproject.newproject import OUTPUT_MODES, check_choice
+
+    check_choice(value=output, choices=OUTPUT_MODES, option="--output")
+
+    projects_dir, venv_dirs = python_venvs()
+    result = dedupe_venvs(venv_dirs, os.path.join(projects_dir, STORE_DIR_NAME))
+    if output == "json":
+        print(json.dumps({"venvs": len(venv_dirs), **result._asdict()}))
+        return
+
+    console.print(f"{len(venv_dirs)} venvs, {result.files} files: {result.linked} replaced by hardlinks, "
+                  f"[green]{format_size(result.freed + result.collected)}[/green] freed")
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import queue
+import stat
+import time
+
+from typing import Final, NamedTuple
+
+from newproject.tracing import span
+from newproject.utils import console
+
+
+class BuildOutput(NamedTuple):
+    """
+    A folder of a project that a tool of its language rebuilds
+    """
+    language: str
+    name: str
+    # A file, relative to the folder, that the tool writes in it: a folder without it is not a build output
+    marker: str
+
+
+# Python venvs, cargo's target and dune's _build: a project of another language can have a source folder
+# with the same name
+BUILD_OUTPUTS: Final[tuple] = (
+    BuildOutput("python", "venv", "pyvenv.cfg"),
+    BuildOutput("rust", "target", "CACHEDIR.TAG"),
+    BuildOutput("ocaml", "_build", "log"),
+)
+BUILD_DIR_NAMES: Final[tuple] = tuple(build_output.name for build_output in BUILD_OUTPUTS)
+
+# The folders are read by a thread pool: the time is spent waiting for the disk, not running python
+MAX_SCAN_WORKERS: Final[int] = 32
+# Entries a scan task reads before handing the folders left to the other tasks
+SCAN_BATCH: Final[int] = 2048
+
+SORT_KEYS: Final[tuple] = ("size", "age")
+DU_LIMIT: Final[int] = 20
+# Days since a build output was last used before prune deletes it
+PRUNE_OLDER_THAN: Final[int] = 30
+
+SIZE_UNITS: Final[dict] = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+class BuildDir(NamedTuple):
+    """
+    A venv or build output of a project
+    """
+    path: str
+    # One of BUILD_DIR_NAMES
+    kind: str
+    language: str
+    project: str
+    # Bytes on disk, the hardlinked files counted once
+    size: int
+    files: int
+    # The last use, see last_use
+    touched: float
+
+
+def disk_size(entry_stat: os.stat_result) -> int:
+    """
+    :return: (int) the bytes allocated to a file, its size where the platform doesn't tell
+    """
+    blocks = getattr(entry_stat, "st_blocks", None)
+    return entry_stat.st_size if blocks is None else blocks * 512
+
+
+def scan_dirs(top_dirs: list) -> tuple:
+    """
+    Reads folders and their subfolders, until SCAN_BATCH entries were read
+    :param top_dirs: (list) the folders
+    :return: (tuple) the size, the number of files, the newest mtime, the folders left to read and
+    (device, inode) -> size of the hardlinked files, which are counted once by measure_dirs
+    """
+    size = files = 0
+    newest = 0.0
+    linked = {}
+    pending = list(top_dirs)
+    read = 0
+    while pending and read < SCAN_BATCH:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                read += 1
+                try:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                newest = max(newest, entry_stat.st_mtime)
+                if stat.S_ISDIR(entry_stat.st_mode):
+                    pending.append(entry.path)
+                    size += disk_size(entry_stat)
+                    continue
+                files += 1
+                if entry_stat.st_nlink > 1:
+                    linked[(entry_stat.st_dev, entry_stat.st_ino)] = disk_size(entry_stat)
+                else:
+                    size += disk_size(entry_stat)
+
+    return size, files, newest, pending, linked
+
+
+def measure_dirs(paths: list, workers: int = MAX_SCAN_WORKERS) -> list:
+    """
+    Measures folders in parallel. Every task reads a batch of entries and hands the folders it didn't read to
+    the other tasks, so a huge folder is spread over the threads as well as many small ones
+    :param paths: (list) the folders
+    :param workers: (int) the maximum number of threads
+    :return: (list) (size, files, newest mtime) of every folder, in the same order
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    totals = [[0, 0, 0.0] for _ in paths]
+    linked = [{} for _ in paths]
+    for index, path in enumerate(paths):
+        try:
+            root_stat = os.stat(path, follow_symlinks=False)
+        except OSError:
+            continue
+        totals[index] = [disk_size(root_stat), 0, root_stat.st_mtime]
+
+    results = queue.SimpleQueue()
+    with span("measure_dirs", dirs=len(paths)), ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit(index: int, dirs: list) -> None:
+            executor.submit(scan_dirs, dirs).add_done_callback(lambda future: results.put((index, future)))
+
+        running = 0
+        for index, path in enumerate(paths):
+            submit(index, [path])
+            running += 1
+        while running:
+            index, future = results.get()
+            running -= 1
+            size, files, newest, pending, batch_linked = future.result()
+            totals[index][0] += size
+            totals[index][1] += files
+            totals[index][2] = max(totals[index][2], newest)
+            linked[index].update(batch_linked)
+            # One task per folder left: the idle threads pick them up
+            for pending_dir in pending:
+                submit(index, [pending_dir])
+                running += 1
+
+    return [(size + sum(linked[index].values()), files, newest) for index, (size, files, newest) in enumerate(totals)]
+
+
+def find_build_dirs(records: list) -> list:
+    """
+    :param records: (list) the project records of the catalog
+    :return: (list) (project record, BuildOutput, path) of the venvs and build outputs of the projects: the folders
+    of the languages that produce them, with their marker file, symlinks excluded
+    """
+    build_dirs = []
+    for record in records:
+        for build_output in BUILD_OUTPUTS:
+            if build_output.language != record["language"]:
+                continue
+            path = os.path.join(record["path"], build_output.name)
+            try:
+                if stat.S_ISDIR(os.stat(path, follow_symlinks=False).st_mode) and \
+                        stat.S_ISREG(os.stat(os.path.join(path, build_output.marker), follow_symlinks=False).st_mode):
+                    build_dirs.append((record, build_output, path))
+            except OSError:
+                pass
+
+    return build_dirs
+
+
+def last_use(project_dir: str, build_output: BuildOutput, newest: float) -> float:
+    """
+    A venv can be used every day without being modified: its last use is the newest of the mtimes in the folder,
+    the atime of its marker file (python reads pyvenv.cfg at every start) and the activity of the project, the mtimes
+    of its other files and folders and of its git index
+    :param project_dir: (str) the project
+    :param build_output: (BuildOutput) the build output of the project
+    :param newest: (float) the newest mtime in the build output
+    :return: (float) the time of the last use
+    """
+    try:
+        touched = max(newest, os.stat(os.path.join(project_dir, build_output.name, build_output.marker)).st_atime)
+    except OSError:
+        touched = newest
+    paths = [os.path.join(project_dir, ".git", "index")]
+    try:
+        with os.scandir(project_dir) as entries:
+            paths += [entry.path for entry in entries if entry.name not in BUILD_DIR_NAMES]
+    except OSError:
+        pass
+    for path in paths:
+        try:
+            touched = max(touched, os.stat(path, follow_symlinks=False).st_mtime)
+        except OSError:
+            pass
+
+    return touched
+
+
+def disk_usage(refresh: bool = False) -> tuple:
+    """
+    Measures the venvs and build outputs of the projects of the catalog
+    :param refresh: (bool) scans every language folder again, see catalog.update_catalog
+    :return: (tuple) the catalog and the BuildDir of every venv and build output
+    """
+    from newproject.catalog import update_catalog
+
+    catalog = update_catalog(refresh=refresh)
+    build_dirs = find_build_dirs(catalog.records())
+    measures = measure_dirs([path for _, _, path in build_dirs])
+
+    return catalog, [
+        BuildDir(path, build_output.name, record["language"], record["name"], size, files,
+                 last_use(record["path"], build_output, newest))
+        for (record, build_output, path), (size, files, newest) in zip(build_dirs, measures)
+    ]
+
+
+def parse_size(size: str) -> int:
+    """
+    :param size: (str) a number of bytes, possibly followed by K, M, G or T (powers of 1024) and B, e.g. 500M
+    :return: (int) the number of bytes
+    :raises typer.BadParameter: if the size is not valid
+    """
+    number = size.strip().upper().removesuffix("B")
+    unit = number[-1:] if number[-1:] in SIZE_UNITS else ""
+    try:
+        value = float(number.removesuffix(unit)) * SIZE_UNITS[unit]
+    except ValueError:
+        value = -1
+    if value < 0:
+        import typer
+
+        raise typer.BadParameter("must be a size, e.g. 500M or 2G", param_hint="--min-size")
+
+    return int(value)
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+    return f"{size:.1f} TB"
+
+
+def format_age(touched: float) -> str:
+    days = int((time.time() - touched) // 86400)
+    return "today" if days <= 0 else f"{days} days ago"
+
+
+def print_build_dirs(build_dirs: list, output: str) -> None:
+    if output == "json":
+        print(json.dumps([build_dir._asdict() for build_dir in build_dirs]))
+        return
+
+    from rich.table import Table
+
+    table = Table(box=None, header_style="dodger_blue1")
+    for column in ("size", "touched", "kind", "language", "path"):
+        table.add_column(column, justify="right" if column == "size" else "left",
+                         overflow="fold" if column == "path" else None)
+    for build_dir in build_dirs:
+        table.add_row(f"[green]{format_size(build_dir.size)}[/green]", format_age(build_dir.touched), build_dir.kind,
+                      build_dir.language, build_dir.path)
+
+    console.print(table)
+
+
+def du(sort: str = "size", limit: int = DU_LIMIT, output: str = "text", refresh: bool = False) -> None:
+    """
+    Show the largest or least recently touched venvs and build outputs of the projects
+    """
+    from newproject.newproject import OUTPUT_MODES, check_choice
+
+    check_choice(value=sort, choices=SORT_KEYS, option="--sort")
+    check_choice(value=output, choices=OUTPUT_MODES, option="--output")
+
+    _, build_dirs = disk_usage(refresh=refresh)
+    if sort == "size":
+        build_dirs.sort(key=lambda build_dir: build_dir.size, reverse=True)
+    else:
+        build_dirs.sort(key=lambda build_dir: build_dir.touched)
+    print_build_dirs(build_dirs[:limit] if limit > 0 else build_dirs, output=output)
+    if output == "text":
+        console.print(f"\n{len(build_dirs)} venvs and build outputs, "
+                      f"{format_size(sum(build_dir.size for build_dir in build_dirs))} in total")
+
+
+def remove_build_dir(path: str) -> str:
+    """
+    :return: (str) the error, "" if the folder was removed
+    """
+    import shutil
+
+    try:
+        shutil.rmtree(path)
+    except OSError as remove_error:
+        return str(remove_error)
+
+    return ""
+
+
+def prune(older_than: int = PRUNE_OLDER_THAN, min_size: str = "0", yes: bool = False,
+          output: str = "text", refresh: bool = False) -> None:
+    """
+    Show the venvs and build outputs not used for --older-than days and larger than --min-size, delete them with --yes
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from newproject.catalog import store_catalog
+    from newproject.newproject import OUTPUT_MODES, check_choice
+
+    check_choice(value=output, choices=OUTPUT_MODES, option="--output")
+    min_bytes = parse_size(min_size)
+
+    catalog, build_dirs = disk_usage(refresh=refresh)
+    deadline = time.time() - older_than * 86400
+    stale = sorted(
+        (build_dir for build_dir in build_dirs if build_dir.touched < deadline and build_dir.size >= min_bytes),
+        key=lambda build_dir: build_dir.size,
+        reverse=True,
+    )
+
+    errors = [""] * len(stale)
+    if yes:
+        with span("prune", dirs=len(stale)), ThreadPoolExecutor(max_workers=MAX_SCAN_WORKERS) as executor:
+            errors = list(executor.map(remove_build_dir, [build_dir.path for build_dir in stale]))
+        # The catalog only notices a removed venv when its language folder changes
+        removed_venvs = {build_dir.path for build_dir, error in zip(stale, errors) if not error and build_dir.kind == "venv"}
+        for record in catalog.records():
+            if os.path.join(record["path"], "venv") in removed_venvs:
+                record["venv"] = False
+        if removed_venvs:
+            store_catalog(catalog)
+
+    pruned = [build_dir for build_dir, error in zip(stale, errors) if not error]
+    print_build_dirs(pruned, output=output)
+    if output == "text":
+        for build_dir, error in zip(stale, errors):
+            if error:
+                console.print(f"[dark_orange3]newproject: warning:[/dark_orange3] can't delete {build_dir.path}: {error}")
+        verb = "Freed" if yes else "Would free"
+        console.print(f"\n{verb} {format_size(sum(build_dir.size for build_dir in pruned))} "
+                      f"({len(pruned)} venvs and build outputs)")
+        if not yes and pruned:
+            console.print("Run again with --yes to delete them")
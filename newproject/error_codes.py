@@ -18,3 +18,9 @@ GIT_ERROR: Final[int] = 312
 GIT_NOT_INSTALLED: Final[int] = 313
 IDE_NOT_FOUND_ERROR: Final[int] = 314
 CREATE_OR_WRITE_ERROR: Final[int] = 315
+DAEMON_ALREADY_RUNNING_ERROR: Final[int] = 316
+MANIFEST_FILE_ERROR: Final[int] = 317
+TEMPLATE_ERROR: Final[int] = 318
+LANGUAGE_PLUGIN_ERROR: Final[int] = 319
+PREINSTALL_ERROR: Final[int] = 320
+INITIAL_COMMIT_ERROR: Final[int] = 321
@@ -1,18 +1,19 @@
 #!/usr/bin/env python3
 
+import functools
 import logging
 
-from rich.console import Console
-
 import newproject.error_codes
-from newproject.utils import select_config_file
+from newproject.report import record_error
+from newproject.utils import console, get_config_layers
 
-# rich config
-console = Console()
 
-# Logging config
-logging.basicConfig(level=logging.DEBUG, format="%(levelname)s %(message)s")
-logger = logging.getLogger(__name__)
+@functools.cache
+def configure_logging() -> None:
+    """
+    Logging config, applied on first use instead of at import time
+    """
+    logging.basicConfig(level=logging.DEBUG, format="%(levelname)s %(message)s")
 
 
 def log_error(error_code: int,
@@ -28,15 +29,27 @@ def log_error(error_code: int,
               readme_error: Exception = None,
               already_existent_project: str = "",
               unsuccessful_command: str = "",
-              command_error: Exception = None
+              command_error: Exception = None,
+              socket_path: str = "",
+              manifest_file: str = "",
+              manifest_error: Exception = None,
+              template_error: Exception = None,
+              plugin_error: Exception = None,
+              preinstall_error: Exception = None,
+              commit_error: Exception = None
               ) -> None:
+    configure_logging()
+    record_error(error_code)
+
     match error_code:
         case newproject.error_codes.DEVELOPMENT_DIR_NOT_FOUND_ERROR | \
              newproject.error_codes.PROJECTS_FOLDER_NOT_FOUND_ERROR:
             console.print(f"newproject: error: [red3]{folder}[/red3] does not exist.")
-            console.print(
-                f"Check the YAML file: [dark_orange3][underline]{select_config_file()}[/underline][/dark_orange3]"
+            config_files = ", ".join(
+                f"[dark_orange3][underline]{config_file}[/underline][/dark_orange3]"
+                for config_file in reversed(get_config_layers())
             )
+            console.print(f"Check the YAML files: {config_files}")
         case newproject.error_codes.INVALID_PROJECT_NAME:
             console.print(
                 f"newproject: error: invalid project name. Invalid character: [cyan2]{invalid_character}[/cyan2]"
@@ -77,3 +90,16 @@ def log_error(error_code: int,
             logging.error(command_error)
         case newproject.error_codes.COMMAND_NOT_FOUND_ERROR:
             console.print(f"newproject: error: [dodger_blue1]{unsuccessful_command}[/dodger_blue1]: command not found.")
+        case newproject.error_codes.DAEMON_ALREADY_RUNNING_ERROR:
+            console.print(f"newproject: error: a daemon is already listening on [red3]{socket_path}[/red3]")
+        case newproject.error_codes.MANIFEST_FILE_ERROR:
+            logging.error(manifest_error)
+            console.print(f"newproject: error: can't read the manifest [red3]{manifest_file}[/red3]")
+        case newproject.error_codes.TEMPLATE_ERROR:
+            console.print(f"newproject: error: template error: [red1]{template_error}[/red1]")
+        case newproject.error_codes.LANGUAGE_PLUGIN_ERROR:
+            console.print(f"newproject: error: can't load the language plugin [red1]{plugin_error}[/red1]")
+        case newproject.error_codes.PREINSTALL_ERROR:
+            console.print(f"newproject: error: can't preinstall the packages: [red1]{preinstall_error}[/red1]")
+        case newproject.error_codes.INITIAL_COMMIT_ERROR:
+            console.print(f"newproject: error: can't create the initial commit: [red1]{commit_error}[/red1]")
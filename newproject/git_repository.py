@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+import re
+import stat
+import struct
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+from typing import Final
+
+from newproject.tracing import span
+from newproject.writer import make_dir, write_file
+
+DEFAULT_BRANCH: Final[str] = "master"
+
+DESCRIPTION_CONTENT: Final[str] = "Unnamed repository; edit this file 'description' to name the repository.\n"
+EXCLUDE_CONTENT: Final[str] = """# git ls-files --others --exclude-from=.git/info/exclude
+# Lines that start with '#' are comments.
+# For a project mostly in C, the following would be a good set of
+# exclude patterns (uncomment them if you want to use them):
+# *.[oa]
+# *~
+"""
+
+# Environment variables that change what `git init` does
+GIT_ENVIRONMENT_VARIABLES: Final[tuple] = (
+    "GIT_DIR", "GIT_WORK_TREE", "GIT_TEMPLATE_DIR", "GIT_DEFAULT_HASH", "GIT_CONFIG_COUNT", "GIT_CONFIG_PARAMETERS"
+)
+# Config keys (section.key) that change what `git init` does
+GIT_INIT_CONFIG_KEYS: Final[tuple] = (
+    "init.templatedir", "init.defaultobjectformat", "core.sharedrepository", "core.hookspath"
+)
+
+SECTION_PATTERN = re.compile(r'^\[\s*([\w.-]+)(?:\s+"(.*)")?\s*]')
+BRANCH_NAME_PATTERN = re.compile(r"^[\w.-]+(/[\w.-]+)*$")
+
+INITIAL_COMMIT_MESSAGE: Final[str] = "Initial commit"
+# Hash of the objects of the repository, see the extensions.objectformat config key
+OBJECT_FORMATS: Final[dict] = {"sha1": hashlib.sha1, "sha256": hashlib.sha256}
+INDEX_VERSION: Final[int] = 2
+
+
+def get_git_config_files() -> list:
+    """
+    Gets the git config files that apply to a new repository, in increasing order of precedence
+    :return: (list) the paths of the system, XDG and global git config files
+    """
+    config_files = []
+    if not os.environ.get("GIT_CONFIG_NOSYSTEM"):
+        config_files.append("/etc/gitconfig")
+
+    if os.environ.get("GIT_CONFIG_GLOBAL"):
+        config_files.append(os.environ["GIT_CONFIG_GLOBAL"])
+    else:
+        xdg_config_home = os.environ.get("XDG_CONFIG_HOME") or f"{Path.home()}/.config"
+        config_files.append(os.path.join(xdg_config_home, "git", "config"))
+        config_files.append(f"{Path.home()}/.gitconfig")
+
+    return config_files
+
+
+def parse_git_config(content: str) -> dict:
+    """
+    Parses the content of a git config file
+    :param content: (str) the content of the file
+    :return: (dict) "section.key" (or "section.subsection.key") -> value, the section and key lowercased
+    """
+    config = {}
+    section = ""
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+
+        section_match = SECTION_PATTERN.match(line)
+        if section_match:
+            name, subsection = section_match.groups()
+            section = name.lower() if subsection is None else f"{name.lower()}.{subsection}"
+            line = line[section_match.end():].strip()
+            if not line or line[0] in "#;":
+                continue
+
+        key, separator, value = line.partition("=")
+        value = re.split(r"\s[#;]", value, maxsplit=1)[0].strip() if separator else "true"
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        config[f"{section}.{key.strip().lower()}"] = value
+
+    return config
+
+
+def read_git_config() -> dict:
+    """
+    Reads the user's git config
+    :return: (dict) "section.key" -> value, see parse_git_config
+    """
+    config = {}
+    for config_file in get_git_config_files():
+        try:
+            with open(config_file) as config_f:
+                config.update(parse_git_config(config_f.read()))
+        except (OSError, UnicodeDecodeError):
+            continue
+
+    return config
+
+
+def get_default_branch(git_config: dict) -> str:
+    return git_config.get("init.defaultbranch") or DEFAULT_BRANCH
+
+
+def requires_git_binary(project_dir: str, git_config: dict) -> bool:
+    """
+    Checks if initializing the repository needs the git binary, i.e. the user's environment or config
+    asks for something init_repository doesn't do (templates, includes, another object format...)
+    :param project_dir: (str) the project directory
+    :param git_config: (dict) the user's git config
+    :return: (bool) True if `git init` must be used
+    """
+    if any(os.environ.get(variable) for variable in GIT_ENVIRONMENT_VARIABLES):
+        return True
+    if any(key in git_config for key in GIT_INIT_CONFIG_KEYS):
+        return True
+    if any(key.startswith(("include.", "includeif.")) for key in git_config):
+        return True
+    default_branch = get_default_branch(git_config)
+    if not BRANCH_NAME_PATTERN.match(default_branch) or default_branch.endswith(".lock") or ".." in default_branch:
+        # Let git report the invalid branch name
+        return True
+
+    # Reinitializing an existing repository
+    return os.path.exists(os.path.join(project_dir, ".git"))
+
+
+def init_repository(project_dir: str, git_config: dict) -> str:
+    """
+    Writes the layout of an empty git repository, like `git init` without templates does
+    :param project_dir: (str) the project directory, which must exist
+    :param git_config: (dict) the user's git config
+    :return: (str) the path of the repository (.git folder)
+    """
+    git_dir = os.path.join(os.path.abspath(project_dir), ".git")
+    make_dir(git_dir)
+    for folder in ["branches", "hooks", "info", "objects/info", "objects/pack", "refs/heads", "refs/tags"]:
+        make_dir(os.path.join(git_dir, folder), parents=True)
+
+    core_config = [
+        "[core]",
+        "\trepositoryformatversion = 0",
+        "\tfilemode = true" if os.name == "posix" else "\tfilemode = false",
+        "\tbare = false",
+        "\tlogallrefupdates = true",
+    ]
+    if sys.platform.startswith("win32"):
+        core_config += ["\tsymlinks = false", "\tignorecase = true"]
+    elif sys.platform.startswith("darwin"):
+        core_config += ["\tignorecase = true", "\tprecomposeunicode = true"]
+
+    files = {
+        "HEAD": f"ref: refs/heads/{get_default_branch(git_config)}\n",
+        "config": "\n".join(core_config) + "\n",
+        "description": DESCRIPTION_CONTENT,
+        "info/exclude": EXCLUDE_CONTENT,
+    }
+    for file_name, content in files.items():
+        write_file(os.path.join(git_dir, file_name), content)
+
+    return git_dir
+
+
+class CommitError(Exception):
+    pass
+
+
+def commit_identity(git_config: dict, role: str) -> str:
+    """
+    :param git_config: (dict) the user's git config
+    :param role: (str) AUTHOR or COMMITTER: GIT_AUTHOR_NAME... override the config, like for git commit
+    :return: (str) "name <email>"
+    :raises CommitError: if the name or the email is not set
+    """
+    name = os.environ.get(f"GIT_{role}_NAME") or git_config.get("user.name", "")
+    email = os.environ.get(f"GIT_{role}_EMAIL") or git_config.get("user.email", "")
+    if not name or not email or any(character in f"{name}{email}" for character in "<>\n"):
+        raise CommitError("set user.name and user.email in your git config")
+
+    return f"{name} <{email}>"
+
+
+def read_scaffold(project_dir: str, paths: tuple) -> list:
+    """
+    :param project_dir: (str) the project directory
+    :param paths: (tuple) the paths created in the project, the folders are left out
+    :return: (list) (path relative to the project, git mode, content, os.stat_result) of the files, sorted like
+    the entries of a git index
+    """
+    files = {}
+    for path in paths:
+        relative_path = os.path.relpath(path, project_dir).replace(os.sep, "/")
+        if relative_path.startswith("../") or relative_path == ".git" or relative_path.startswith(".git/"):
+            continue
+        path_stat = os.lstat(path)
+        if stat.S_ISLNK(path_stat.st_mode):
+            files[relative_path] = (0o120000, os.fsencode(os.readlink(path)), path_stat)
+        elif stat.S_ISREG(path_stat.st_mode):
+            with open(path, "rb") as scaffold_file:
+                content = scaffold_file.read()
+            files[relative_path] = (0o100755 if path_stat.st_mode & stat.S_IXUSR else 0o100644, content, path_stat)
+
+    return sorted(
+        ((relative_path, *entry) for relative_path, entry in files.items()), key=lambda entry: entry[0].encode()
+    )
+
+
+def fast_import_stream(files: list, branch: str, author: str, committer: str, message: str) -> bytes:
+    """
+    Builds the git fast-import stream of a commit without parents: every blob, then the commit, which lists them
+    :param files: (list) the files, see read_scaffold
+    :param branch: (str) the branch, e.g. master
+    :return: (bytes) the stream
+    """
+    when = f"{int(time.time())} {time.strftime('%z')}"
+    stream = []
+    for mark, (_, _, content, _) in enumerate(files, start=1):
+        stream += [b"blob\n", f"mark :{mark}\ndata {len(content)}\n".encode(), content, b"\n"]
+    encoded_message = message.encode()
+    stream += [
+        f"commit refs/heads/{branch}\n".encode(),
+        f"author {author} {when}\ncommitter {committer} {when}\n".encode(),
+        f"data {len(encoded_message)}\n".encode(), encoded_message, b"\n",
+        *(f"M {mode:o} :{mark} ".encode() + relative_path.encode() + b"\n"
+          for mark, (relative_path, mode, _, _) in enumerate(files, start=1)),
+        b"\ndone\n",
+    ]
+
+    return b"".join(stream)
+
+
+def index_content(files: list, object_format: str) -> bytes:
+    """
+    Builds the index (version 2) of the committed files, with their stat data: git status sees them unchanged
+    without hashing them again
+    :param files: (list) the files, see read_scaffold
+    :param object_format: (str) sha1 or sha256
+    :return: (bytes) the content of .git/index
+    """
+    hash_function = OBJECT_FORMATS[object_format]
+    index = [b"DIRC", struct.pack(">LL", INDEX_VERSION, len(files))]
+    for relative_path, mode, content, path_stat in files:
+        object_id = hash_function(f"blob {len(content)}\0".encode() + content).digest()
+        encoded_path = relative_path.encode()
+        entry = struct.pack(
+            ">10L", *(int(value) & 0xFFFFFFFF for value in (
+                path_stat.st_ctime, path_stat.st_ctime_ns % 1_000_000_000,
+                path_stat.st_mtime, path_stat.st_mtime_ns % 1_000_000_000,
+                path_stat.st_dev, path_stat.st_ino, mode, path_stat.st_uid, path_stat.st_gid, path_stat.st_size,
+            ))
+        ) + object_id + struct.pack(">H", min(len(encoded_path), 0xFFF)) + encoded_path
+        # Padded with 1 to 8 NUL bytes to a multiple of 8
+        index.append(entry + b"\0" * (8 - len(entry) % 8))
+    content = b"".join(index)
+
+    return content + hash_function(content).digest()
+
+
+def initial_commit(project_dir: str, paths: tuple, git_config: dict, message: str = INITIAL_COMMIT_MESSAGE) -> int:
+    """
+    Commits the scaffold of a new project with a single git fast-import, whatever the number of files,
+    then writes the index, so that the working tree is clean
+    :param project_dir: (str) the project directory, with an empty repository
+    :param paths: (tuple) the paths created in the project, see plan.InitialCommit
+    :param git_config: (dict) the user's git config
+    :param message: (str) the commit message
+    :return: (int) the number of committed files
+    :raises CommitError: if the identity is not set or fast-import fails
+    """
+    git_dir = os.path.join(project_dir, ".git")
+    author, committer = commit_identity(git_config, "AUTHOR"), commit_identity(git_config, "COMMITTER")
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as head_file:
+            head = head_file.read().strip()
+        with open(os.path.join(git_dir, "config")) as repository_config:
+            object_format = parse_git_config(repository_config.read()).get("extensions.objectformat", "sha1").lower()
+    except OSError as read_error:
+        raise CommitError(f"{git_dir}: {read_error}") from read_error
+    if not head.startswith("ref: refs/heads/") or object_format not in OBJECT_FORMATS:
+        raise CommitError(f"{git_dir}: unsupported repository (HEAD {head}, {object_format} objects)")
+
+    files = read_scaffold(project_dir=project_dir, paths=paths)
+    stream = fast_import_stream(
+        files=files, branch=head.removeprefix("ref: refs/heads/"), author=author, committer=committer, message=message
+    )
+    command = ["git", "-C", project_dir, "fast-import", "--quiet", "--done"]
+    with span("fast_import", command=command, files=len(files)) as fast_import_span:
+        result = subprocess.run(command, input=stream, capture_output=True)
+        fast_import_span.set(exit_code=result.returncode)
+    if result.returncode:
+        raise CommitError(result.stderr.decode(errors="replace").strip())
+
+    index_lock = os.path.join(git_dir, "index.lock")
+    with open(index_lock, "wb") as index_file:
+        index_file.write(index_content(files, object_format=object_format))
+    os.replace(index_lock, os.path.join(git_dir, "index"))
+
+    return len(files)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+import functools
+import hashlib
+import json
+import os
+import sys
+
+from typing import Final, NamedTuple
+
+from newproject.cache import write_cache_file
+from newproject.utils import get_cache_path
+
+# Entry point group of the third-party languages, e.g. in a plugin's pyproject.toml:
+# [project.entry-points."newproject.languages"]
+# zig = "newproject_zig:LANGUAGE"
+ENTRY_POINT_GROUP: Final[str] = "newproject.languages"
+
+PLUGINS_CACHE_FILE_NAME: Final[str] = "plugins_cache.json"
+PLUGINS_CACHE_VERSION: Final[int] = 1
+
+# Languages created from their config section: the files are written by newproject
+FILE_KIND: Final[str] = "file"
+# Languages generated by a dedicated command, e.g. cargo new
+COMMAND_KIND: Final[str] = "command"
+# Basic web projects: html, css and javascript files
+WEB_KIND: Final[str] = "web"
+
+# JSON Schema of the config section of a language of each kind, when json_schema.json doesn't describe it
+KIND_SCHEMAS: Final[dict] = {
+    FILE_KIND: {
+        "type": "object",
+        "properties": {
+            "projects_dir_name": {"type": "string"},
+            "file_content": {"type": "string"},
+            "gitignore_content": {"type": "string"},
+            "template_dir": {"type": "string"},
+        },
+        "required": ["projects_dir_name", "file_content", "gitignore_content"],
+    },
+    COMMAND_KIND: {
+        "type": "object",
+        "properties": {"projects_dir_name": {"type": "string"}},
+        "required": ["projects_dir_name"],
+    },
+    WEB_KIND: {
+        "type": "object",
+        "properties": {
+            "projects_dir_name": {"type": "string"},
+            "html_file_content": {"type": "string"},
+            "css_file_content": {"type": "string"},
+            "javascript_file_content": {"type": "string"},
+            "gitignore_content": {"type": "string"},
+            "template_dir": {"type": "string"},
+        },
+        "required": [
+            "projects_dir_name", "html_file_content", "css_file_content", "javascript_file_content", "gitignore_content"
+        ],
+    },
+}
+
+
+class Language(NamedTuple):
+    """
+    A language newproject can create projects in. Plugins expose one through an entry point of ENTRY_POINT_GROUP
+    """
+    # The command line option, e.g. clang for --clang
+    name: str
+    # One of FILE_KIND, COMMAND_KIND and WEB_KIND
+    kind: str
+    # The config section of the language, the name if empty
+    config_name: str = ""
+    # The help of the command line option
+    help: str = ""
+    # FILE_KIND: the created file, {project_name} is replaced by the name of the project
+    file_name: str = ""
+    # COMMAND_KIND: the generator, without the project folder
+    command: tuple = ()
+    # FILE_KIND: creates a python venv in the project
+    venv: bool = False
+    # The default config section, overridden by the config files: plugins can't add theirs to the default config
+    defaults: dict = {}
+    # The JSON Schema of the config section, the one of json_schema.json or of the kind if None
+    schema: dict = None
+
+    @property
+    def section(self) -> str:
+        return self.config_name or self.name
+
+
+# The built-in languages, in order of precedence when several are created at once
+BUILTIN_LANGUAGES: Final[dict] = {language.name: language for language in (
+    Language("python", FILE_KIND, help="create a python project", file_name="{project_name}.py", venv=True),
+    Language("java", FILE_KIND, help="create a java project", file_name="Main.java"),
+    Language("go", FILE_KIND, help="create a go project", file_name="main.go"),
+    Language("bash", FILE_KIND, help="create a bash project", file_name="{project_name}.sh"),
+    Language("cpp", FILE_KIND, help="create a cpp project", file_name="main.cpp"),
+    Language("clang", FILE_KIND, config_name="c_lang", help="create a c project", file_name="main.c"),
+    Language("php", FILE_KIND, help="create a php project", file_name="index.php"),
+    Language("lua", FILE_KIND, help="create a lua project", file_name="main.lua"),
+    Language("rust", COMMAND_KIND, help="create a rust project", command=("cargo", "new")),
+    Language("ruby", COMMAND_KIND, help="create a ruby project", command=("bundler", "gem")),
+    Language("ocaml", COMMAND_KIND, help="create an ocaml project", command=("dune", "init", "project")),
+    Language("vlang", COMMAND_KIND, help="create a vlang project", command=("v", "new")),
+    Language("web", WEB_KIND, help="create a basic web project"),
+)}
+
+
+class LanguagePluginError(Exception):
+    pass
+
+
+def plugins_cache_key() -> dict:
+    """
+    Builds the key of the plugins cache: sys.path and the mtimes of its folders, which change when a distribution
+    is installed in or removed from them
+    :return: (dict) the cache key
+    """
+    dir_mtimes = []
+    for path_dir in sys.path:
+        try:
+            dir_mtimes.append(os.stat(path_dir or ".").st_mtime_ns)
+        except OSError:
+            dir_mtimes.append(None)
+
+    return {
+        "version": PLUGINS_CACHE_VERSION,
+        "path": hashlib.sha256(json.dumps(sys.path).encode()).hexdigest(),
+        "mtimes": hashlib.sha256(json.dumps(dir_mtimes).encode()).hexdigest(),
+    }
+
+
+def scan_plugins() -> dict:
+    """
+    Reads the entry points of the installed distributions, without importing the plugins
+    :return: (dict) language -> the entry point's object reference, e.g. "newproject_zig:LANGUAGE"
+    """
+    from importlib.metadata import entry_points
+
+    return {entry_point.name: entry_point.value for entry_point in entry_points(group=ENTRY_POINT_GROUP)}
+
+
+@functools.cache
+def find_plugins() -> dict:
+    """
+    Finds the plugin languages, once per process: from the plugins cache, scanning the installed distributions
+    again when sys.path or one of its folders changed. Built-in languages can't be replaced
+    :return: (dict) language -> the entry point's object reference
+    """
+    cache_key = plugins_cache_key()
+    cache_file = os.path.join(get_cache_path(), PLUGINS_CACHE_FILE_NAME)
+    try:
+        with open(cache_file) as plugins_cache:
+            cache = json.load(plugins_cache)
+    except (OSError, ValueError):
+        cache = None
+
+    if isinstance(cache, dict) and cache.get("key") == cache_key and isinstance(cache.get("plugins"), dict):
+        plugins = cache["plugins"]
+    else:
+        plugins = scan_plugins()
+        write_cache_file(PLUGINS_CACHE_FILE_NAME, json.dumps({"key": cache_key, "plugins": plugins}))
+
+    return {name: value for name, value in plugins.items() if name not in BUILTIN_LANGUAGES and name.isidentifier()}
+
+
+def language_names() -> tuple:
+    """
+    :return: (tuple) the built-in languages, in order of precedence, then the plugin ones
+    """
+    return *BUILTIN_LANGUAGES, *sorted(find_plugins())
+
+
+@functools.cache
+def get_language(name: str) -> Language:
+    """
+    Gets a language, importing its plugin if it is not built in
+    :param name: (str) the language, named as its command line option
+    :return: (Language) the language
+    :raises KeyError: if the language is unknown
+    :raises LanguagePluginError: if the plugin can't be loaded or is not a valid language
+    """
+    if name in BUILTIN_LANGUAGES:
+        return BUILTIN_LANGUAGES[name]
+
+    reference = find_plugins()[name]
+    try:
+        # The same resolution as importlib.metadata.EntryPoint.load: module:attribute.path
+        import importlib
+
+        module_name, _, attributes = reference.partition(":")
+        language = importlib.import_module(module_name.strip())
+        for attribute in filter(None, attributes.strip().split(".")):
+            language = getattr(language, attribute)
+        if callable(language) and not isinstance(language, Language):
+            language = language()
+    except Exception as plugin_error:
+        raise LanguagePluginError(f"{name} ({reference}): {plugin_error!r}") from plugin_error
+
+    if not isinstance(language, Language) or language.name != name or language.kind not in KIND_SCHEMAS:
+        raise LanguagePluginError(f"{name} ({reference}): not a valid newproject.languages.Language")
+
+    return language
+
+
+def section_fingerprint(language: Language) -> str:
+    """
+    :param language: (Language) the language
+    :return: (str) the fingerprint of the defaults and schema of the language: a cached config section is
+    validated again when a plugin changes them
+    """
+    return hashlib.sha256(
+        json.dumps([language.kind, language.defaults, language.schema], sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def section_schema(language: Language, json_schema: dict) -> dict:
+    """
+    :param language: (Language) the language
+    :param json_schema: (dict) the JSON Schema of the config
+    :return: (dict) the JSON Schema of the config section of the language
+    """
+    if language.schema is not None:
+        return language.schema
+
+    return json_schema.get("properties", {}).get(language.section) or KIND_SCHEMAS[language.kind]
+
+
+def core_schema(json_schema: dict) -> dict:
+    """
+    :param json_schema: (dict) the JSON Schema of the config
+    :return: (dict) the JSON Schema of the config without the language sections, which are validated when used
+    """
+    sections = {language.section for language in BUILTIN_LANGUAGES.values()}
+
+    return {
+        **json_schema,
+        "properties": {key: value for key, value in json_schema.get("properties", {}).items() if key not in sections},
+        "required": [key for key in json_schema.get("required", []) if key not in sections],
+    }
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import json
+
+from typing import Final
+
+# The keys of a manifest entry and whether they are required: their values are strings
+ENTRY_KEYS: Final[dict] = {"language": True, "name": True, "ide": False}
+
+
+def load_manifest(manifest_file: str) -> list:
+    """
+    Loads the entries of a manifest of projects to create: a YAML list, or one JSON object per line (.jsonl)
+    :param manifest_file: (str) path of the manifest
+    :return: (list) the entries, dicts with the language, name and optionally ide keys
+    :raises OSError: if the manifest can't be read
+    :raises ValueError: if the manifest is not a list of entries
+    """
+    with open(manifest_file) as manifest_f:
+        if manifest_file.endswith(".jsonl"):
+            entries = [json.loads(line) for line in manifest_f if line.strip()]
+        else:
+            import yaml
+
+            try:
+                entries = yaml.safe_load(manifest_f)
+            except yaml.YAMLError as yaml_error:
+                raise ValueError(yaml_error) from yaml_error
+
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise ValueError("the manifest must be a list of {language, name, ide?} entries")
+
+    return entries
+
+
+def check_entry(entry: dict) -> None:
+    """
+    Checks the keys of a manifest entry, not the language or the project name themselves
+    :param entry: (dict) the entry
+    :raises ValueError: if a key is missing or is not a non-empty string
+    """
+    for key, required in ENTRY_KEYS.items():
+        if key not in entry and not required:
+            continue
+        if not isinstance(entry.get(key), str) or not entry[key]:
+            raise ValueError(f"invalid manifest entry: {entry}: {key} must be a non-empty string")
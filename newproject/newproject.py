@@ -1,28 +1,50 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
 import errno
+import inspect
 import json
 import logging
 import os
+import shutil
 import subprocess
 import sys
 from pathlib import Path
-from shutil import which
-from typing import Final
-
-import typer
-import yaml
-from rich.console import Console
-from typing_extensions import Annotated
+from typing import TYPE_CHECKING, Annotated, Final, get_type_hints
 
 import newproject.error_codes
 from newproject._version import __version__
-from newproject.check import config_file_validator, dev_dir_check, projects_path_check, project_name_check
-from newproject.utils import get_config_path, select_config_file
-from newproject.error_logger import log_error
-
-# rich
-console = Console()
+from newproject.cache import config_cache_key, load_cached_config, store_cached_config
+from newproject.check import EXIT_FAILURE, config_file_validator, dev_dir_check, projects_path_check, project_name_check
+from newproject.config_layers import ConfigLayerError, load_config_layers, merge_config
+from newproject.utils import console, get_config_layers, get_config_path
+from newproject.error_logger import configure_logging, log_error
+from newproject.git_repository import (
+    CommitError, init_repository, initial_commit, read_git_config, requires_git_binary
+)
+from newproject.languages import (
+    COMMAND_KIND, FILE_KIND, WEB_KIND, Language, LanguagePluginError, core_schema, get_language, language_names,
+    section_fingerprint, section_schema
+)
+from newproject.manifest import check_entry, load_manifest
+from newproject.plan import (
+    CreateVenv, DedupeVenv, DryRunExecutor, Executor, GenerateScaffold, GitInit, InitialCommit, MakeDir, OpenIde,
+    OperationError, PlanStep, Preinstall, RenderTemplate, RunCommand, StepExecutor, WriteFile
+)
+from newproject.report import (
+    OUTPUT_MODES, creation_record, get_output_mode, record_command, record_project_dir, reporting
+)
+from newproject.tools import which
+from newproject.tracing import get_trace_file, span, tracing
+from newproject.templates import (
+    TemplateError, compile_config_templates, compile_template_dir, materialize_template, render_template
+)
+from newproject.venv_template import clone_venv, get_golden_venv
+from newproject.writer import DURABILITY_POLICIES, make_dir, write_batch, write_file
+
+if TYPE_CHECKING:
+    import typer
 
 # Outputs
 DONE: Final[str] = "✓ Done.\n"
@@ -30,55 +52,196 @@ PROJECT_STRUCTURE_GEN: Final[str] = "[dodger_blue1]Creating the project structur
 HAPPY_CODING: Final[str] = "[gold1]⫸ Happy Coding![/gold1]"
 CREATING_NEW_PROJECT: Final[str] = "[dodger_blue1]Creating your new project...[/dodger_blue1]\n"
 
+# Maximum number of projects created at the same time
+MAX_CONCURRENT_CREATIONS: Final[int] = 8
+
+# Commands that are not project creations
+SUBCOMMANDS: Final[tuple] = ("daemon", "dedupe", "doctor", "du", "list", "prune", "search")
+
 
 class NewProject:
     def __init__(self):
-        # Config file and JSON Schema
-        self.YAML_CONFIG_FILE: Final[str] = select_config_file()
-        self.JSON_SCHEMA_FILE: Final[str] = f"{get_config_path()}/schema/json_schema.json"
+        with span("NewProject.__init__"):
+            self.load_config()
 
-        # Loads YAML config file
-        try:
-            with open(self.YAML_CONFIG_FILE) as config_file:
-                self.newproject_config = yaml.safe_load(config_file)
-        except FileNotFoundError:
-            log_error(error_code=newproject.error_codes.YAML_CONFIG_FILE_NOT_FOUND_ERROR)
-            sys.exit(errno.ENOENT)
-
-        # Loads JSON Schema file
-        try:
-            with open(self.JSON_SCHEMA_FILE) as json_schema_f:
-                self.json_schema = json.load(json_schema_f)
-        except FileNotFoundError:
-            log_error(error_code=newproject.error_codes.JSON_SCHEMA_FILE_NOT_FOUND_ERROR)
-            sys.exit(errno.ENOENT)
+    def load_config(self) -> None:
+        """
+        Loads and validates the config, each phase is traced (see --trace)
+        """
+        # Config files, in increasing order of precedence, and JSON Schema
+        self.CONFIG_FILES: Final[tuple] = get_config_layers()
+        self.JSON_SCHEMA_FILE: Final[str] = f"{get_config_path()}/schema/json_schema.json"
+        # Only loaded on a cache miss or to validate a language section, see load_json_schema
+        self.json_schema = None
+
+        # Loads the already validated config from this process or from the cache, if no file changed
+        with span("load_cached_config") as cache_span:
+            config_key = config_cache_key(config_files=self.CONFIG_FILES, json_schema_file=self.JSON_SCHEMA_FILE)
+            cached_config = load_cached_config(cache_key=config_key)
+            is_cached_config = cached_config is not None
+            cache_span.set(hit=is_cached_config)
+        # The key of the cached config, under which the validated language sections are cached too
+        self.config_key = config_key
+        if is_cached_config:
+            self.newproject_config, self.templates, self.cached_sections = cached_config
+        else:
+            self.cached_sections = {}
+            self.load_config_files()
 
         # Default Development folder
         dev_dir = f"{Path.home()}/{self.newproject_config['development_dir_path']}"
-        if dev_dir_check(dev_dir=dev_dir):
+        with span("dev_dir_check", dev_dir=dev_dir):
+            is_dev_dir = dev_dir_check(dev_dir=dev_dir)
+        if is_dev_dir:
             self.DEV_DIR: Final[str] = f"{Path.home()}/{self.newproject_config['development_dir_path']}"
         else:
             sys.exit(errno.ENOENT)
 
-        if config_file_validator(
-                config_file=self.newproject_config, json_schema=self.json_schema
-        ):
-            # Project folder names
-            self.PROJECTS_DIR_NAMES: Final[dict] = {
-                "bash": self.newproject_config["bash"]["projects_dir_name"],
-                "c_lang": self.newproject_config["c_lang"]["projects_dir_name"],
-                "cpp": self.newproject_config["cpp"]["projects_dir_name"],
-                "go": self.newproject_config["go"]["projects_dir_name"],
-                "java": self.newproject_config["java"]["projects_dir_name"],
-                "lua": self.newproject_config["lua"]["projects_dir_name"],
-                "ocaml": self.newproject_config["ocaml"]["projects_dir_name"],
-                "php": self.newproject_config["php"]["projects_dir_name"],
-                "python": self.newproject_config["python"]["projects_dir_name"],
-                "ruby": self.newproject_config["ruby"]["projects_dir_name"],
-                "rust": self.newproject_config["rust"]["projects_dir_name"],
-                "vlang": self.newproject_config["vlang"]["projects_dir_name"],
-                "web": self.newproject_config["web"]["projects_dir_name"],
-            }
+        if not is_cached_config:
+            # The language sections are only validated when their language is used, see language_config
+            with span("config_file_validator"):
+                is_valid_config = config_file_validator(
+                    config_file=self.newproject_config, json_schema=core_schema(self.json_schema)
+                )
+            if not is_valid_config:
+                return
+            self.compile_and_cache_config()
+
+        # The validated config sections of the languages used by this instance
+        self.language_configs = {}
+
+        # Carries out the creation plans, see handle's --dry-run
+        self.step_executor: Final[StepExecutor] = StepExecutor(
+            handlers=self.operation_handlers(), header=CREATING_NEW_PROJECT, footer=HAPPY_CODING
+        )
+        self.executor: Executor = self.step_executor
+        # When the written files are synced to disk, see handle's --durability
+        self.durability = "none"
+        # Commits the scaffold of the new projects, see handle's --initial-commit
+        self.initial_commit = False
+
+    def load_config_files(self) -> None:
+        """
+        Loads the YAML config files, each one overrides the keys it sets, and the JSON Schema
+        """
+        with span("load_yaml_config", files=self.CONFIG_FILES):
+            try:
+                self.newproject_config = load_config_layers(layer_files=self.CONFIG_FILES)
+            except FileNotFoundError:
+                log_error(error_code=newproject.error_codes.YAML_CONFIG_FILE_NOT_FOUND_ERROR)
+                sys.exit(errno.ENOENT)
+            except ConfigLayerError as layer_error:
+                log_error(error_code=newproject.error_codes.YAML_CONFIG_FILE_GENERIC_ERROR, yaml_error=layer_error)
+                sys.exit(EXIT_FAILURE)
+
+        self.load_json_schema()
+
+    def compile_and_cache_config(self) -> None:
+        """
+        Compiles the templates of the validated config once, then caches them with it. Those of the language
+        sections are compiled with the section
+        """
+        with span("compile_config_templates"):
+            try:
+                self.templates = compile_config_templates({
+                    key: value for key, value in self.newproject_config.items() if not isinstance(value, dict)
+                })
+            except TemplateError as template_error:
+                log_error(error_code=newproject.error_codes.TEMPLATE_ERROR, template_error=template_error)
+                sys.exit(EXIT_FAILURE)
+        with span("store_cached_config"):
+            store_cached_config(
+                cache_key=self.config_key, config=self.newproject_config, templates=self.templates,
+                sections=self.cached_sections
+            )
+
+    def load_json_schema(self) -> None:
+        with span("load_json_schema", file=self.JSON_SCHEMA_FILE):
+            try:
+                with open(self.JSON_SCHEMA_FILE) as json_schema_f:
+                    self.json_schema = json.load(json_schema_f)
+            except FileNotFoundError:
+                log_error(error_code=newproject.error_codes.JSON_SCHEMA_FILE_NOT_FOUND_ERROR)
+                sys.exit(errno.ENOENT)
+
+    def language_config(self, language: Language) -> dict:
+        """
+        Gets the config section of a language, validated and with its templates compiled on first use, then cached
+        with the config: the sections of the other languages are never loaded, and a warm start loads no schema
+        :param language: (Language) the language
+        :return: (dict) the config section, the plugin's defaults overridden by the config files
+        """
+        if language.name in self.language_configs:
+            return self.language_configs[language.name]
+
+        fingerprint = section_fingerprint(language)
+        cached_section = self.cached_sections.get(language.name)
+        if isinstance(cached_section, dict) and cached_section.get("fingerprint") == fingerprint:
+            # Its templates were cached with the config's
+            self.language_configs[language.name] = cached_section["section"]
+            return cached_section["section"]
+
+        with span("language_config", language=language.name):
+            section = self.newproject_config.get(language.section)
+            if language.defaults:
+                section = merge_config(language.defaults, section if isinstance(section, dict) else {})
+
+            if self.json_schema is None:
+                self.load_json_schema()
+            is_valid_section = config_file_validator(
+                config_file={language.section: section},
+                json_schema={
+                    "type": "object",
+                    "properties": {language.section: section_schema(language, self.json_schema)},
+                    "required": [language.section],
+                },
+            )
+            if not is_valid_section:
+                sys.exit(EXIT_FAILURE)
+
+            try:
+                self.templates = {**self.templates, **compile_config_templates({language.section: section})}
+            except TemplateError as template_error:
+                log_error(error_code=newproject.error_codes.TEMPLATE_ERROR, template_error=template_error)
+                sys.exit(EXIT_FAILURE)
+
+            self.cached_sections = {**self.cached_sections, language.name: {"fingerprint": fingerprint, "section": section}}
+            with span("store_cached_config"):
+                store_cached_config(cache_key=self.config_key, config=self.newproject_config, templates=self.templates,
+                                    sections=self.cached_sections)
+
+        self.language_configs[language.name] = section
+
+        return section
+
+    def language_folders(self) -> dict:
+        """
+        Gets the projects folder of every language, loading every language's config section
+        :return: (dict) language -> its projects folder, the first language wins when several share a folder
+        """
+        language_folders = {}
+        for language in language_names():
+            try:
+                registered_language = get_language(language)
+            except LanguagePluginError as plugin_error:
+                logging.debug(plugin_error)
+                continue
+            folder = os.path.join(self.DEV_DIR, self.language_config(registered_language)["projects_dir_name"])
+            if folder not in language_folders.values():
+                language_folders[language] = folder
+
+        return language_folders
+
+    @staticmethod
+    def warn_name_collisions(project_name: str, projects_dir: str) -> None:
+        """
+        Warns about the projects with the same name in the other language folders, see catalog.find_collisions
+        """
+        from newproject.catalog import find_collisions
+
+        for language, project_dir in find_collisions(project_name=project_name, projects_dir=projects_dir):
+            console.print(f"[dark_orange3]newproject: warning:[/dark_orange3] there is a {language} project with "
+                          f"the same name: [underline]{project_dir}[/underline]")
 
     @staticmethod
     def open_in_ide(ide_command: str, project_dir: str) -> None:
@@ -89,12 +252,31 @@ class NewProject:
         """
         if ide_command in ["code", "pycharm", "idea"] and which(f"{ide_command}") is not None:
             try:
-                subprocess.run([f"{ide_command}", project_dir])
+                run_command([f"{ide_command}", project_dir])
             except Exception as open_in_ide_error:
                 logging.error(open_in_ide_error)
         elif ide_command:
             log_error(error_code=newproject.error_codes.IDE_NOT_FOUND_ERROR, ide_command=ide_command)
 
+    @staticmethod
+    def init_git(project_dir: str, git_config: dict) -> bool:
+        """
+        Runs git init, natively unless the user's git config needs the git binary
+        :param project_dir: (str) project directory
+        :param git_config: (dict) the user's git config
+        :return: (bool) False if git is needed but not installed
+        """
+        if not requires_git_binary(project_dir=project_dir, git_config=git_config):
+            with span("init_repository", project_dir=project_dir):
+                git_dir = init_repository(project_dir=project_dir, git_config=git_config)
+            console.print(f"Initialized empty Git repository in {git_dir}/", highlight=False, soft_wrap=True)
+        elif which("git") is not None:
+            run_command(["git", "init", project_dir])
+        else:
+            return False
+
+        return True
+
     def git_init_command(self, project_dir: str, content: str) -> None:
         """
         Initialize a local git repository
@@ -104,31 +286,43 @@ class NewProject:
         console.print(
             "[dodger_blue1]Initializing [underline]git[/underline] repository[/dodger_blue1]"
         )
-        if which("git") is not None:
-            try:
-                subprocess.run(["git", "init", project_dir])
+        try:
+            if not self.init_git(project_dir=project_dir, git_config=read_git_config()):
+                log_error(error_code=newproject.error_codes.GIT_NOT_INSTALLED)
+                return
 
-                # Creating .gitignore file
-                try:
-                    with open(f"{project_dir}/.gitignore", "w") as gitignore_f:
-                        if content != "":
-                            gitignore_f.write(content)
-                        else:
-                            gitignore_f.write(
-                                self.newproject_config["default_gitignore_content"]
-                            )
+            # Creating .gitignore file
+            try:
+                write_file(f"{project_dir}/.gitignore", content or self.newproject_config["default_gitignore_content"])
+                console.print("▶ [underline].gitignore[/underline] created.")
 
-                        console.print("▶ [underline].gitignore[/underline] created.")
+                console.print(DONE)
 
-                        print(DONE)
+            except Exception as gitignore_error:
+                log_error(error_code=newproject.error_codes.GITIGNORE_ERROR, gitignore_error=gitignore_error)
 
-                except Exception as gitignore_error:
-                    log_error(error_code=newproject.error_codes.GITIGNORE_ERROR, gitignore_error=gitignore_error)
+        except Exception as git_error:
+            log_error(error_code=newproject.error_codes.GIT_ERROR, git_error=git_error)
 
-            except Exception as git_error:
-                log_error(error_code=newproject.error_codes.GIT_ERROR, git_error=git_error)
-        else:
+    @staticmethod
+    def commit_scaffold(project_dir: str, files: tuple) -> None:
+        """
+        Creates the initial commit of a new project
+        :param project_dir: (str) project directory
+        :param files: (tuple) the paths created in the project
+        """
+        if not os.path.isdir(os.path.join(project_dir, ".git")):
+            # git init failed and was reported
+            return
+        if which("git") is None:
             log_error(error_code=newproject.error_codes.GIT_NOT_INSTALLED)
+            return
+
+        try:
+            committed = initial_commit(project_dir=project_dir, paths=files, git_config=read_git_config())
+            console.print(f"▶ initial commit of {committed} files.")
+        except (CommitError, OSError) as commit_error:
+            log_error(error_code=newproject.error_codes.INITIAL_COMMIT_ERROR, commit_error=commit_error)
 
     @staticmethod
     def create_and_write_file(new_project_dir: str, file_name: str, content: str) -> None:
@@ -141,16 +335,42 @@ class NewProject:
         # Creating the file structure
         console.print(PROJECT_STRUCTURE_GEN)
         try:
-            with open(f"{new_project_dir}/{file_name}", "w") as project_file:
-                project_file.write(content)
-                console.print(f"▶ [underline]{file_name}[/underline] created.")
-            print(DONE)
+            write_file(f"{new_project_dir}/{file_name}", content)
+            console.print(f"▶ [underline]{file_name}[/underline] created.")
+            console.print(DONE)
         except Exception as create_and_write_file_error:
             log_error(error_code=newproject.error_codes.CREATE_OR_WRITE_ERROR,
                       create_or_write_error=create_and_write_file_error,
                       not_writable_file=file_name
                       )
 
+    @staticmethod
+    def create_from_template(
+            new_project_dir: str, template_dir: str, template_variables: dict, compiled_template: tuple = None
+    ) -> None:
+        """
+        Creates the files and folders of a template directory
+        :param new_project_dir: (str) the directory of the new project
+        :param template_dir: (str) the template directory
+        :param template_variables: (dict) the values of the template variables
+        :param compiled_template: (tuple) the template directory compiled by compile_template_dir
+        """
+        console.print(PROJECT_STRUCTURE_GEN)
+        try:
+            files_count = materialize_template(
+                template_dir=template_dir,
+                project_dir=new_project_dir,
+                variables=template_variables,
+                compiled=compiled_template,
+            )
+            console.print(f"▶ {files_count} files created from [underline]{template_dir}[/underline].")
+            console.print(DONE)
+        except Exception as template_error:
+            log_error(error_code=newproject.error_codes.CREATE_OR_WRITE_ERROR,
+                      create_or_write_error=template_error,
+                      not_writable_file=template_dir
+                      )
+
     @staticmethod
     def create_python_venv(new_project_path: str) -> None:
         """
@@ -164,26 +384,338 @@ class NewProject:
             # MacOS and Linux
             if sys.platform.startswith("darwin") or sys.platform.startswith("linux"):
                 with console.status("[dodger_blue1]Generating...[/dodger_blue1]", spinner="aesthetic"):
-                    subprocess.run(["python3", "-m", "venv", f"{new_project_path}/venv"])
+                    run_command(["python3", "-m", "venv", f"{new_project_path}/venv"])
             # Windows
             elif sys.platform.startswith("win32"):
                 with console.status("[dodger_blue1]Generating...[/dodger_blue1]", spinner="aesthetic"):
                     if which("virtualenv") is not None:
-                        subprocess.run(["virtualenv", f"{new_project_path}/venv"])
+                        run_command(["virtualenv", f"{new_project_path}/venv"])
                     else:
-                        subprocess.run(["python3", "-m", "venv", f"{new_project_path}/venv"])
-            print(DONE)
+                        run_command(["python3", "-m", "venv", f"{new_project_path}/venv"])
+            console.print(DONE)
         except Exception as venv_exception:
             log_error(error_code=newproject.error_codes.PYTHON_VENV_ERROR, venv_error=venv_exception)
 
+    @staticmethod
+    def clone_python_venv(new_project_path: str) -> None:
+        """
+        Create a python venv by cloning the cached golden venv of the base interpreter.
+        Falls back to create_python_venv if the venv can't be cloned
+        :param new_project_path: (str) path of the new python project
+        """
+        if not (sys.platform.startswith("darwin") or sys.platform.startswith("linux")):
+            NewProject.create_python_venv(new_project_path=new_project_path)
+            return
+
+        console.print(
+            "[dodger_blue1]Generating the [underline]venv[/underline]...[/dodger_blue1]"
+        )
+        try:
+            with console.status("[dodger_blue1]Generating...[/dodger_blue1]", spinner="aesthetic"):
+                with span("get_golden_venv"):
+                    golden_venv, origin = get_golden_venv()
+                with span("clone_venv", golden_venv=golden_venv):
+                    clone_venv(golden_venv=golden_venv, origin=origin, venv_dir=f"{new_project_path}/venv")
+            console.print(DONE)
+        except Exception as clone_error:
+            logging.debug(clone_error)
+            shutil.rmtree(f"{new_project_path}/venv", ignore_errors=True)
+            NewProject.create_python_venv(new_project_path=new_project_path)
+
+    @staticmethod
+    def preinstall_packages(venv_dir: str, requirements: tuple, wheelhouse: str) -> None:
+        """
+        Installs the preinstalled packages in a new venv from the wheelhouse
+        :param venv_dir: (str) the venv
+        :param requirements: (tuple) the packages, see wheelhouse.preinstall
+        :param wheelhouse: (str) the folder of the wheels
+        """
+        console.print(
+            f"[dodger_blue1]Installing [underline]{' '.join(map(str, requirements))}[/underline]...[/dodger_blue1]"
+        )
+        from newproject.wheelhouse import WheelhouseError, preinstall
+
+        try:
+            preinstall(venv_dir=venv_dir, requirements=list(requirements), wheelhouse=wheelhouse)
+            console.print(DONE)
+        except WheelhouseError as preinstall_error:
+            log_error(error_code=newproject.error_codes.PREINSTALL_ERROR, preinstall_error=preinstall_error)
+
+    @staticmethod
+    def dedupe_venv(venv_dir: str, store_dir: str) -> None:
+        """
+        Replaces the files of a new venv with hardlinks into the store. The venv is usable either way:
+        the errors are only logged
+        :param venv_dir: (str) the venv
+        :param store_dir: (str) the content-addressed store of the python projects folder
+        """
+        from newproject.dedupe import dedupe_venvs
+
+        try:
+            result = dedupe_venvs(venv_dirs=[venv_dir], store_dir=store_dir)
+            logging.debug(result)
+        except Exception as dedupe_error:
+            logging.debug(dedupe_error)
+
     @staticmethod
     def create_readme(new_project_dir, project_name):
         try:
-            with open(f"{new_project_dir}/README.md", "w") as readme:
-                readme.write(f"# {project_name}")
+            write_file(f"{new_project_dir}/README.md", f"# {project_name}")
         except Exception as readme_error:
             log_error(error_code=newproject.error_codes.README_ERROR, readme_error=readme_error)
 
+    def operation_handlers(self) -> dict:
+        """
+        :return: (dict) the functions that carry out the operations of a creation plan, see plan.StepExecutor
+        """
+        return {
+            MakeDir: (lambda operation: make_dir(operation.path), False),
+            WriteFile: (self.write_plan_file, False),
+            RunCommand: (self.run_plan_command, False),
+            GenerateScaffold: (self.generate_scaffold, False),
+            GitInit: (lambda operation: self.git_init_command(
+                project_dir=operation.project_dir, content=operation.gitignore_content
+            ), False),
+            # The venv shows a spinner
+            CreateVenv: (lambda operation: self.clone_python_venv(new_project_path=operation.project_dir), True),
+            InitialCommit: (lambda operation: self.commit_scaffold(
+                project_dir=operation.project_dir, files=operation.files
+            ), False),
+            Preinstall: (lambda operation: self.preinstall_packages(
+                venv_dir=operation.venv_dir, requirements=operation.requirements, wheelhouse=operation.wheelhouse
+            ), False),
+            DedupeVenv: (lambda operation: self.dedupe_venv(venv_dir=operation.venv_dir, store_dir=operation.store_dir),
+                         False),
+            RenderTemplate: (lambda operation: self.create_from_template(
+                new_project_dir=operation.project_dir,
+                template_dir=operation.template_dir,
+                template_variables=operation.variables,
+                compiled_template=operation.compiled,
+            ), False),
+            OpenIde: (lambda operation: self.open_in_ide(
+                ide_command=operation.ide_command, project_dir=operation.project_dir
+            ), False),
+        }
+
+    @staticmethod
+    def write_plan_file(operation: WriteFile) -> None:
+        """
+        Carries out a WriteFile operation: one line per file, the files are synced with the rest of the plan
+        :param operation: (WriteFile) the operation
+        """
+        try:
+            write_file(operation.path, operation.content)
+            if not operation.quiet:
+                console.print(f"▶ [underline]{os.path.basename(operation.path)}[/underline] created.")
+        except Exception as write_error:
+            log_error(error_code=newproject.error_codes.CREATE_OR_WRITE_ERROR,
+                      create_or_write_error=write_error,
+                      not_writable_file=operation.path
+                      )
+
+    @staticmethod
+    def run_plan_command(operation: RunCommand) -> None:
+        """
+        Carries out a RunCommand operation
+        :param operation: (RunCommand) the operation
+        :raises OperationError: if the command can't be run
+        """
+        try:
+            run_command(operation.command)
+            console.print(DONE)
+        except Exception as command_exception:
+            log_error(error_code=newproject.error_codes.COMMAND_ERROR,
+                      unsuccessful_command=operation.command[0],
+                      command_error=command_exception)
+            raise OperationError(operation.command[0]) from command_exception
+
+    @staticmethod
+    def cached_scaffold(operation: GenerateScaffold, git_config: dict) -> dict | None:
+        """
+        :param operation: (GenerateScaffold) the operation
+        :param git_config: (dict) the user's git config
+        :return: (dict) the snapshot of the generator for the project, or None if it must run on the project itself,
+        see scaffold_cache.get_scaffold. The errors of the cache are ignored: the generator runs
+        """
+        from newproject.scaffold_cache import get_scaffold
+
+        try:
+            with span("get_scaffold", command=operation.command_args):
+                return get_scaffold(command_args=operation.command_args, project_dir=operation.project_dir,
+                                    git_config=git_config)
+        except Exception as scaffold_error:
+            logging.debug(scaffold_error)
+            return None
+
+    def generate_scaffold(self, operation: GenerateScaffold) -> None:
+        """
+        Carries out a GenerateScaffold operation: rebuilds the generator's output from the scaffold cache,
+        or runs the generator if its output can't be cached
+        :param operation: (GenerateScaffold) the operation
+        :raises OperationError: if the generator can't be run
+        """
+        from newproject.scaffold_cache import materialize_scaffold
+
+        command = [*operation.command_args, operation.project_dir]
+        project_name = os.path.basename(operation.project_dir)
+        git_config = read_git_config()
+        snapshot = self.cached_scaffold(operation=operation, git_config=git_config)
+        if snapshot is None:
+            self.run_plan_command(RunCommand(command))
+            return
+
+        try:
+            with span("materialize_scaffold", project_dir=operation.project_dir):
+                files_count = materialize_scaffold(snapshot=snapshot, project_dir=operation.project_dir,
+                                                   project_name=project_name)
+        except FileExistsError:
+            raise
+        except Exception as scaffold_error:
+            logging.debug(scaffold_error)
+            shutil.rmtree(operation.project_dir, ignore_errors=True)
+            self.run_plan_command(RunCommand(command))
+            return
+        console.print(f"▶ {files_count} files created from the [underline]{operation.command_args[0]}[/underline] "
+                      "scaffold cache.")
+
+        # The generator's repository, its .gitignore is part of the snapshot
+        if snapshot["git"]:
+            try:
+                if not self.init_git(project_dir=operation.project_dir, git_config=git_config):
+                    log_error(error_code=newproject.error_codes.GIT_NOT_INSTALLED)
+            except Exception as git_error:
+                log_error(error_code=newproject.error_codes.GIT_ERROR, git_error=git_error)
+        console.print(DONE)
+
+    def execute_plan(self, plan: list, new_project_dir: str) -> None:
+        """
+        Passes a creation plan to the executor
+        :param plan: (list) the plan steps
+        :param new_project_dir: (str) the directory of the new project
+        """
+        record_project_dir(new_project_dir)
+        try:
+            with span("execute_plan", project_dir=new_project_dir, steps=len(plan)), \
+                    write_batch(durability=self.durability, root=os.path.dirname(new_project_dir)):
+                self.executor.execute(plan)
+        except FileExistsError:
+            log_error(error_code=newproject.error_codes.PROJECT_ALREADY_EXISTS_ERROR,
+                      already_existent_project=new_project_dir)
+            sys.exit(errno.EEXIST)
+        except OperationError:
+            return
+        except OSError as sync_error:
+            # A folder of the plan can't be created, or the written files can't be synced
+            log_error(error_code=newproject.error_codes.CREATE_OR_WRITE_ERROR,
+                      create_or_write_error=sync_error,
+                      not_writable_file=sync_error.filename or new_project_dir
+                      )
+            sys.exit(EXIT_FAILURE)
+
+    @staticmethod
+    def plan_common_steps(new_project_dir: str, project_name: str, gitignore_content: str) -> list:
+        """
+        :return: (list) the plan steps of every file-based creation: the project folder, the README and git init
+        """
+        if os.path.exists(new_project_dir):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), new_project_dir)
+
+        return [
+            # Creating the project folder, the other steps only depend on it
+            PlanStep("project_dir", MakeDir(new_project_dir)),
+            # Creating the README for the new project
+            PlanStep("readme", WriteFile(f"{new_project_dir}/README.md", f"# {project_name}", quiet=True),
+                     after=("project_dir",)),
+            # git init
+            PlanStep("git", GitInit(new_project_dir, gitignore_content), after=("project_dir",)),
+        ]
+
+    @staticmethod
+    def plan_template_step(new_project_dir: str, template_dir: str, compiled_template: tuple,
+                           template_variables: dict) -> PlanStep:
+        # The template's README.md and .gitignore, if any, replace the default ones
+        return PlanStep(
+            "template",
+            RenderTemplate(template_dir, new_project_dir, template_variables, compiled_template),
+            after=("readme", "git"),
+        )
+
+    @staticmethod
+    def plan_commit_step(plan: list, new_project_dir: str) -> PlanStep:
+        # The files created by the other steps are committed once they are all done
+        return PlanStep(
+            "commit",
+            InitialCommit(new_project_dir, tuple(path for plan_step in plan for path in plan_step.operation.paths())),
+            after=tuple(plan_step.name for plan_step in plan),
+        )
+
+    @staticmethod
+    def plan_ide_step(plan: list, ide: str, new_project_dir: str) -> PlanStep:
+        # The IDE is opened once everything else is done
+        return PlanStep("ide", OpenIde(ide, new_project_dir), after=tuple(plan_step.name for plan_step in plan))
+
+    def plan_project(
+            self,
+            projects_dir_name: str,
+            project_name: str,
+            file_name: str,
+            file_content: str,
+            gitignore_content: str,
+            ide: str = "",
+            template_dir: str = "",
+            template_variables: dict = None,
+            venv: bool = False,
+            dedupe_venv: bool = False,
+            preinstall: list = None,
+            wheelhouse: str = "",
+    ) -> list:
+        """
+        Plans the creation of a new project, see create_project
+        :return: (list) the plan steps
+        """
+        projects_folder_path = os.path.join(self.DEV_DIR, projects_dir_name)
+        with span("projects_path_check", projects_path=projects_folder_path):
+            projects_path_check(projects_folder_to_check=projects_folder_path)
+
+        new_project_dir = f"{projects_folder_path}/{project_name}"
+        compiled_template = self.compile_template(template_dir) if template_dir else None
+
+        plan = self.plan_common_steps(
+            new_project_dir=new_project_dir, project_name=project_name, gitignore_content=gitignore_content
+        )
+        if venv:
+            # Generating a python venv for the project
+            plan.append(PlanStep("venv", CreateVenv(new_project_dir), after=("project_dir",)))
+            if preinstall:
+                plan.append(PlanStep("preinstall", Preinstall(
+                    os.path.join(new_project_dir, "venv"), tuple(preinstall), wheelhouse
+                ), after=("venv",)))
+            if dedupe_venv:
+                from newproject.dedupe import STORE_DIR_NAME
+
+                plan.append(PlanStep("dedupe", DedupeVenv(
+                    os.path.join(new_project_dir, "venv"), os.path.join(projects_folder_path, STORE_DIR_NAME)
+                ), after=("preinstall",) if preinstall else ("venv",)))
+
+        # Creating the file structure
+        if template_dir:
+            plan.append(self.plan_template_step(
+                new_project_dir=new_project_dir,
+                template_dir=template_dir,
+                compiled_template=compiled_template,
+                template_variables=template_variables or self.get_template_variables(project_name=project_name),
+            ))
+        else:
+            plan.append(PlanStep("file", WriteFile(f"{new_project_dir}/{file_name}", file_content),
+                                 after=("project_dir",)))
+
+        if self.initial_commit:
+            plan.append(self.plan_commit_step(plan=plan, new_project_dir=new_project_dir))
+        if ide:
+            plan.append(self.plan_ide_step(plan=plan, ide=ide, new_project_dir=new_project_dir))
+
+        return plan
+
     def create_project(
             self,
             projects_dir_name: str,
@@ -192,6 +724,12 @@ class NewProject:
             file_content: str,
             gitignore_content: str,
             ide: str = "",
+            template_dir: str = "",
+            template_variables: dict = None,
+            venv: bool = False,
+            dedupe_venv: bool = False,
+            preinstall: list = None,
+            wheelhouse: str = "",
     ):
         """
         Create a new project
@@ -201,104 +739,153 @@ class NewProject:
         :param file_content: (str) content to write to file
         :param gitignore_content: (str) the content of the .gitignore file
         :param ide: (str) the name of the IDE where you want to open the new project
+        :param template_dir: (str) the template directory that replaces the file, if any
+        :param template_variables: (dict) the values of the template variables of the template directory
+        :param venv: (bool) creates a python venv in the project
+        :param dedupe_venv: (bool) replaces the files of the venv with hardlinks into the store, see dedupe
+        :param preinstall: (list) the packages installed in the venv from the wheelhouse, see wheelhouse.preinstall
+        :param wheelhouse: (str) the folder of the wheels of the preinstalled packages
         """
-        projects_folder_path = os.path.join(self.DEV_DIR, projects_dir_name)
-        projects_path_check(projects_folder_to_check=projects_folder_path)
-
-        # Creating the project folder
-        new_project_dir = f"{projects_folder_path}/{project_name}"
-
+        new_project_dir = f"{os.path.join(self.DEV_DIR, projects_dir_name)}/{project_name}"
         try:
-            console.print(CREATING_NEW_PROJECT)
+            with span("plan", project_dir=new_project_dir):
+                plan = self.plan_project(
+                    projects_dir_name=projects_dir_name,
+                    project_name=project_name,
+                    file_name=file_name,
+                    file_content=file_content,
+                    gitignore_content=gitignore_content,
+                    ide=ide,
+                    template_dir=template_dir,
+                    template_variables=template_variables,
+                    venv=venv,
+                    dedupe_venv=dedupe_venv,
+                    preinstall=preinstall,
+                    wheelhouse=wheelhouse,
+                )
+        except FileExistsError:
+            log_error(error_code=newproject.error_codes.PROJECT_ALREADY_EXISTS_ERROR,
+                      already_existent_project=new_project_dir)
+            sys.exit(errno.EEXIST)
+
+        self.execute_plan(plan=plan, new_project_dir=new_project_dir)
 
-            os.mkdir(new_project_dir)
+    def plan_project_with_commands(
+            self, projects_dir_name: str, project_name: str, command_args: tuple, ide: str = ""
+    ) -> list:
+        """
+        Plans the creation of a new project via dedicated commands, see create_project_with_commands
+        :return: (list) the plan steps
+        """
+        projects_path = os.path.join(self.DEV_DIR, projects_dir_name)
 
-            if projects_dir_name == self.PROJECTS_DIR_NAMES["python"]:
-                # Generating a python venv for the project
-                self.create_python_venv(new_project_path=new_project_dir)
+        with span("projects_path_check", projects_path=projects_path):
+            projects_path_check(projects_folder_to_check=projects_path)
+        new_project_dir = f"{projects_path}/{project_name}"
 
-            # Creating the file structure
-            self.create_and_write_file(
-                new_project_dir=new_project_dir,
-                file_name=file_name,
-                content=file_content,
+        if os.path.isdir(new_project_dir):
+            raise FileExistsError(
+                errno.ENOENT, os.strerror(errno.ENOENT), new_project_dir
             )
 
-            # Creating the README for the new project
-            self.create_readme(new_project_dir=new_project_dir, project_name=project_name)
-
-            # git init
-            self.git_init_command(project_dir=new_project_dir, content=gitignore_content)
+        commands = list(command_args)
+        if which(commands[0]) is None:
+            log_error(error_code=newproject.error_codes.COMMAND_NOT_FOUND_ERROR,
+                      unsuccessful_command=commands[0])
+            sys.exit(127)
 
-            # Open in IDE
-            self.open_in_ide(ide_command=ide, project_dir=new_project_dir)
+        # Creating the project folder and file structure for the project
+        # The generator's output is rebuilt from the scaffold cache when possible
+        plan = [PlanStep("command", GenerateScaffold(commands, new_project_dir))]
+        if ide:
+            plan.append(self.plan_ide_step(plan=plan, ide=ide, new_project_dir=new_project_dir))
 
-            console.print(HAPPY_CODING)
-
-        except FileExistsError:
-            log_error(error_code=newproject.error_codes.PROJECT_ALREADY_EXISTS_ERROR,
-                      already_existent_project=new_project_dir)
-            sys.exit(errno.EEXIST)
+        return plan
 
     def create_project_with_commands(
             self,
             projects_dir_name: str,
             project_name: str,
+            command_args: tuple,
             ide: str = "",
     ):
         """
         Create a new project via dedicated commands.
         :param projects_dir_name: (str) the name of the specified programming language's directory
         :param project_name: (str) the name of the new project
+        :param command_args: (tuple) the generator, e.g. ("cargo", "new"), without the project folder
         :param ide: (str) the name of the IDE where you want to open the new project
         """
-        projects_path = os.path.join(self.DEV_DIR, projects_dir_name)
-
-        projects_path_check(projects_folder_to_check=projects_path)
-        # Creating the project folder
-        new_project_dir = f"{projects_path}/{project_name}"
-
+        new_project_dir = f"{os.path.join(self.DEV_DIR, projects_dir_name)}/{project_name}"
         try:
-            if os.path.isdir(new_project_dir):
-                raise FileExistsError(
-                    errno.ENOENT, os.strerror(errno.ENOENT), new_project_dir
+            with span("plan", project_dir=new_project_dir):
+                plan = self.plan_project_with_commands(
+                    projects_dir_name=projects_dir_name, project_name=project_name, command_args=command_args, ide=ide
                 )
-            # Creating the project folder and file structure for the project
-            console.print(CREATING_NEW_PROJECT)
-
-            commands = []
-
-            if projects_dir_name == self.PROJECTS_DIR_NAMES["rust"]:
-                commands = ["cargo", "new", new_project_dir]
-            elif projects_dir_name == self.PROJECTS_DIR_NAMES["ruby"]:
-                commands = ["bundler", "gem", new_project_dir]
-            elif projects_dir_name == self.PROJECTS_DIR_NAMES["ocaml"]:
-                commands = ["dune", "init", "project", new_project_dir]
-            elif projects_dir_name == self.PROJECTS_DIR_NAMES["vlang"]:
-                commands = ["v", "new", new_project_dir]
-
-            if which(commands[0]) is not None:
-                try:
-                    subprocess.run(commands)
-                    print(DONE)
-
-                    # Open in IDE
-                    self.open_in_ide(ide_command=ide, project_dir=new_project_dir)
-
-                    console.print(HAPPY_CODING)
-                except Exception as command_exception:
-                    log_error(error_code=newproject.error_codes.COMMAND_ERROR,
-                              unsuccessful_command=commands[0],
-                              command_error=command_exception)
-            else:
-                log_error(error_code=newproject.error_codes.COMMAND_NOT_FOUND_ERROR,
-                          unsuccessful_command=commands[0])
-                sys.exit(127)
         except FileExistsError:
             log_error(error_code=newproject.error_codes.PROJECT_ALREADY_EXISTS_ERROR,
                       already_existent_project=new_project_dir)
             sys.exit(errno.EEXIST)
 
+        self.execute_plan(plan=plan, new_project_dir=new_project_dir)
+
+    def plan_web_project(
+            self,
+            projects_dir_name: str,
+            project_name: str,
+            html_file_content: str,
+            css_file_content: str,
+            javascript_file_content: str,
+            gitignore_content: str,
+            ide: str = "",
+            template_dir: str = "",
+            template_variables: dict = None,
+    ) -> list:
+        """
+        Plans the creation of a basic new web project, see create_web_project
+        :return: (list) the plan steps
+        """
+        projects_path = os.path.join(self.DEV_DIR, projects_dir_name)
+
+        with span("projects_path_check", projects_path=projects_path):
+            projects_path_check(projects_folder_to_check=projects_path)
+        new_project_dir = f"{projects_path}/{project_name}"
+        compiled_template = self.compile_template(template_dir) if template_dir else None
+
+        plan = self.plan_common_steps(
+            new_project_dir=new_project_dir, project_name=project_name, gitignore_content=gitignore_content
+        )
+
+        # Creating the file structure
+        if template_dir:
+            plan.append(self.plan_template_step(
+                new_project_dir=new_project_dir,
+                template_dir=template_dir,
+                compiled_template=compiled_template,
+                template_variables=template_variables or self.get_template_variables(project_name=project_name),
+            ))
+        else:
+            plan += [
+                PlanStep("styles", MakeDir(f"{new_project_dir}/styles"), after=("project_dir",)),
+                PlanStep("scripts", MakeDir(f"{new_project_dir}/scripts"), after=("project_dir",)),
+                # Creating HTML file
+                PlanStep("html", WriteFile(f"{new_project_dir}/index.html", html_file_content),
+                         after=("project_dir",)),
+                # Creating CSS file
+                PlanStep("css", WriteFile(f"{new_project_dir}/styles/style.css", css_file_content),
+                         after=("styles",)),
+                # Creating Javascript file
+                PlanStep("javascript", WriteFile(f"{new_project_dir}/scripts/index.js", javascript_file_content),
+                         after=("scripts",)),
+            ]
+
+        if self.initial_commit:
+            plan.append(self.plan_commit_step(plan=plan, new_project_dir=new_project_dir))
+        if ide:
+            plan.append(self.plan_ide_step(plan=plan, ide=ide, new_project_dir=new_project_dir))
+
+        return plan
+
     def create_web_project(
             self,
             projects_dir_name: str,
@@ -308,6 +895,8 @@ class NewProject:
             javascript_file_content: str,
             gitignore_content: str,
             ide: str = "",
+            template_dir: str = "",
+            template_variables: dict = None,
     ):
         """
         Create a basic new web project
@@ -318,81 +907,281 @@ class NewProject:
         :param javascript_file_content: (str) the content of the javascript file
         :param gitignore_content: (str) the content of the .gitignore file
         :param ide: (str) the name of the IDE where you want to open the new project
+        :param template_dir: (str) the template directory that replaces the html, css and javascript files, if any
+        :param template_variables: (dict) the values of the template variables of the template directory
         """
-
-        projects_path = os.path.join(self.DEV_DIR, projects_dir_name)
-
-        projects_path_check(projects_folder_to_check=projects_path)
-        # Creating the project folder
-        new_project_dir = f"{projects_path}/{project_name}"
-
+        new_project_dir = f"{os.path.join(self.DEV_DIR, projects_dir_name)}/{project_name}"
         try:
-            console.print(CREATING_NEW_PROJECT)
+            with span("plan", project_dir=new_project_dir):
+                plan = self.plan_web_project(
+                    projects_dir_name=projects_dir_name,
+                    project_name=project_name,
+                    html_file_content=html_file_content,
+                    css_file_content=css_file_content,
+                    javascript_file_content=javascript_file_content,
+                    gitignore_content=gitignore_content,
+                    ide=ide,
+                    template_dir=template_dir,
+                    template_variables=template_variables,
+                )
+        except FileExistsError:
+            log_error(error_code=newproject.error_codes.PROJECT_ALREADY_EXISTS_ERROR,
+                      already_existent_project=new_project_dir)
+            sys.exit(errno.EEXIST)
 
-            os.mkdir(new_project_dir)
-            os.mkdir(f"{new_project_dir}/styles")
-            os.mkdir(f"{new_project_dir}/scripts")
+        self.execute_plan(plan=plan, new_project_dir=new_project_dir)
 
-            # Creating the file structure
+    def project_creation(self, language: str, project_name: str, ide: str = "") -> tuple:
+        """
+        Gets the create function of a language and its arguments: only this language's config section is loaded
+        :param language: (str) the language, named as its command line option (e.g. clang)
+        :param project_name: (str) the name of the new project
+        :param ide: (str) the name of the IDE where you want to open the new project
+        :return: (tuple) the create function followed by its arguments
+        :raises KeyError: if the language is unknown
+        """
+        try:
+            registered_language = get_language(language)
+        except LanguagePluginError as plugin_error:
+            log_error(error_code=newproject.error_codes.LANGUAGE_PLUGIN_ERROR, plugin_error=plugin_error)
+            sys.exit(EXIT_FAILURE)
+        section = registered_language.section
+        language_config = self.language_config(registered_language)
+        self.warn_name_collisions(
+            project_name=project_name, projects_dir=os.path.join(self.DEV_DIR, language_config["projects_dir_name"])
+        )
 
-            # Creating HTML file
-            self.create_and_write_file(
-                new_project_dir=new_project_dir,
-                file_name="index.html",
-                content=html_file_content,
+        if registered_language.kind == COMMAND_KIND:
+            return (
+                self.create_project_with_commands,
+                language_config["projects_dir_name"],
+                project_name,
+                registered_language.command,
+                ide,
             )
-            # Creating CSS file
-            self.create_and_write_file(
-                new_project_dir=f"{new_project_dir}/styles",
-                file_name="style.css",
-                content=css_file_content,
+
+        template_variables = self.get_template_variables(project_name=project_name, language=language)
+        if registered_language.kind == FILE_KIND:
+            return (
+                self.create_project,
+                language_config["projects_dir_name"],
+                project_name,
+                registered_language.file_name.format(project_name=project_name),
+                self.render(f"{section}.file_content", template_variables),
+                self.render_gitignore(section, template_variables),
+                ide,
+                self.get_template_dir(language),
+                template_variables,
+                registered_language.venv,
+                language_config.get("dedupe_venv", False),
+                language_config.get("preinstall"),
+                language_config.get("wheelhouse", ""),
             )
-            # Creating Javascript file
-            self.create_and_write_file(
-                new_project_dir=f"{new_project_dir}/scripts",
-                file_name="index.js",
-                content=javascript_file_content,
+        if registered_language.kind == WEB_KIND:
+            return (
+                self.create_web_project,
+                language_config["projects_dir_name"],
+                project_name,
+                self.render(f"{section}.html_file_content", template_variables),
+                self.render(f"{section}.css_file_content", template_variables),
+                self.render(f"{section}.javascript_file_content", template_variables),
+                self.render_gitignore(section, template_variables),
+                ide,
+                self.get_template_dir(language),
+                template_variables,
             )
+        raise KeyError(language)
 
-            # Creating the README for the new project
-            self.create_readme(
-                new_project_dir=new_project_dir, project_name=project_name
-            )
+    @staticmethod
+    def get_template_variables(project_name: str, language: str = "") -> dict:
+        """
+        Gets the values of the template variables of a new project
+        :param project_name: (str) the name of the new project
+        :param language: (str) the language, named as its command line option (e.g. clang)
+        :return: (dict) template variable -> value
+        """
+        import datetime
+        import getpass
 
-            # git init
-            self.git_init_command(
-                project_dir=new_project_dir, content=gitignore_content
-            )
+        today = datetime.date.today()
+        author = read_git_config().get("user.name")
+        if not author:
+            try:
+                author = getpass.getuser()
+            except (KeyError, OSError):
+                author = ""
+
+        return {
+            "project_name": project_name,
+            "language": language,
+            "author": author,
+            "date": today.isoformat(),
+            "year": str(today.year),
+        }
 
-            # Open in IDE
-            self.open_in_ide(ide_command=ide, project_dir=new_project_dir)
+    def render(self, template_key: str, template_variables: dict) -> str:
+        """
+        Renders a compiled template of the config
+        :param template_key: (str) "section.key" of the template, e.g. python.file_content
+        :param template_variables: (dict) the values of the template variables
+        :return: (str) the rendered template
+        """
+        return render_template(self.templates[template_key], template_variables)
 
-            console.print(HAPPY_CODING)
+    def render_gitignore(self, config_name: str, template_variables: dict) -> str:
+        """
+        Renders the .gitignore of a language, the default one if the language has none
+        """
+        return (
+            self.render(f"{config_name}.gitignore_content", template_variables)
+            or self.render("default_gitignore_content", template_variables)
+        )
 
-        except FileExistsError:
-            log_error(error_code=newproject.error_codes.PROJECT_ALREADY_EXISTS_ERROR,
-                      already_existent_project=new_project_dir)
-            sys.exit(errno.EEXIST)
+    @staticmethod
+    def compile_template(template_dir: str) -> tuple:
+        """
+        Compiles a template directory before the project is created: the errors are reported up front
+        :param template_dir: (str) the template directory
+        :return: (tuple) the compiled template directory, see compile_template_dir
+        """
+        try:
+            return compile_template_dir(template_dir)
+        except TemplateError as template_error:
+            log_error(error_code=newproject.error_codes.TEMPLATE_ERROR, template_error=template_error)
+            sys.exit(EXIT_FAILURE)
+        except OSError as template_error:
+            log_error(error_code=newproject.error_codes.CREATE_OR_WRITE_ERROR,
+                      create_or_write_error=template_error,
+                      not_writable_file=template_dir
+                      )
+            sys.exit(EXIT_FAILURE)
+
+    def get_template_dir(self, language: str) -> str:
+        """
+        Gets the template directory of a language, already made absolute by config_layers.load_config_layers:
+        relative paths are relative to the YAML config file that sets them
+        :param language: (str) the language, named as its command line option (e.g. clang)
+        :return: (str) the template directory or "" if the language has none
+        """
+        return self.language_config(get_language(language)).get("template_dir", "")
+
+    @staticmethod
+    def create_concurrently(creations: list) -> None:
+        """
+        Run independent creations on a bounded pool of threads. The output of every creation
+        is printed in one block once it is done
+        :param creations: (list) (language, creation) pairs, a creation being the create function followed by its arguments
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        failure_exit_code = 0
+        with ThreadPoolExecutor(max_workers=min(len(creations), MAX_CONCURRENT_CREATIONS)) as executor:
+            futures = [executor.submit(run_captured, creation, language) for language, creation in creations]
+            for future in as_completed(futures):
+                output, exit_code = future.result()
+                sys.stdout.write(output)
+                sys.stdout.flush()
+                failure_exit_code = failure_exit_code or exit_code
+
+        if failure_exit_code:
+            sys.exit(failure_exit_code)
+
+    def create_from_manifest(self, manifest_file: str, ide: str = "") -> None:
+        """
+        Create every project listed in a manifest, then print a summary of the creations
+        :param manifest_file: (str) the YAML or JSONL manifest, with {language, name, ide?} entries
+        :param ide: (str) the IDE used by the entries that don't specify one
+        """
+        try:
+            entries = load_manifest(manifest_file=manifest_file)
+        except (OSError, ValueError) as manifest_error:
+            log_error(error_code=newproject.error_codes.MANIFEST_FILE_ERROR,
+                      manifest_file=manifest_file,
+                      manifest_error=manifest_error)
+            sys.exit(EXIT_FAILURE)
+
+        results = []
+        for entry in entries:
+            language, project_name = str(entry.get("language", "")), str(entry.get("name", ""))
+            try:
+                check_entry(entry)
+                if language not in language_names():
+                    raise ValueError(f"invalid manifest entry: {entry}: unknown language {language}")
+
+                project_name_check(project_name)
+                run_creation(self.project_creation(
+                    language=language, project_name=project_name, ide=entry.get("ide", ide)
+                ), language=language)
+                results.append((language, project_name, None))
+            except SystemExit as creation_exit:
+                results.append((language, project_name, f"exit code {creation_exit.code}"))
+            except ValueError as entry_error:
+                results.append((language, project_name, str(entry_error)))
+            except Exception as creation_error:
+                # One entry never stops the others, nor the summary
+                results.append((language, project_name, repr(creation_error)))
+
+        print_manifest_summary(results=results)
+        if any(error is not None for _, _, error in results):
+            sys.exit(EXIT_FAILURE)
+
+    def create_projects(self, project_names: dict, ide: str = "") -> None:
+        """
+        Create the projects of the language options, concurrently if there are several
+        :param project_names: (dict) language -> project name, empty for the languages not asked for
+        :param ide: (str) the IDE to open the projects in
+        """
+        unknown_languages = set(project_names) - set(language_names())
+        if unknown_languages:
+            raise TypeError(f"handle() got unknown languages: {', '.join(sorted(unknown_languages))}")
+
+        creations = []
+        # In order of precedence
+        for language in language_names():
+            project_name = project_names.get(language, "")
+            if project_name:
+                # Checks if the project_name doesn't contain: spaces, &&, ||
+                project_name_check(project_name)
+                creations.append((
+                    language, self.project_creation(language=language, project_name=project_name, ide=ide)
+                ))
+
+        if len(creations) == 1:
+            language, creation = creations[0]
+            run_creation(creation, language=language)
+        elif creations:
+            self.create_concurrently(creations=creations)
+        else:
+            console.print("[bold red]No option provided[/bold red]")
 
     def handle(
             self,
-            bash: Annotated[str, typer.Option(help="create a bash project")] = "",
-            clang: Annotated[str, typer.Option(help="create a c project")] = "",
-            cpp: Annotated[str, typer.Option(help="create a cpp project")] = "",
-            go: Annotated[str, typer.Option(help="create a go project")] = "",
-            java: Annotated[str, typer.Option(help="create a java project")] = "",
-            lua: Annotated[str, typer.Option(help="create a lua project")] = "",
-            ocaml: Annotated[str, typer.Option(help="create an ocaml project")] = "",
-            php: Annotated[str, typer.Option(help="create a php project")] = "",
-            python: Annotated[str, typer.Option(help="create a python project")] = "",
-            ruby: Annotated[str, typer.Option(help="create a ruby project")] = "",
-            rust: Annotated[str, typer.Option(help="create a rust project")] = "",
-            vlang: Annotated[str, typer.Option(help="create a vlang project")] = "",
-            web: Annotated[str, typer.Option(help="create a basic web project")] = "",
             code: Annotated[bool, typer.Option(help="open the project in VS Code")] = False,
             idea: Annotated[bool, typer.Option(help="open the project in Intellij IDEA")] = False,
             pycharm: Annotated[bool, typer.Option(help="open the project in PyCharm")] = False,
-            version: Annotated[bool, typer.Option(help="show the newproject-cli version")] = False
+            from_manifest: Annotated[
+                str, typer.Option(help="create every project listed in a YAML or JSONL manifest")
+            ] = "",
+            dry_run: Annotated[bool, typer.Option(help="print what would be created, without creating it")] = False,
+            output: Annotated[
+                str, typer.Option(help="text, or json to print one JSON object with the result of the run")
+            ] = "text",
+            quiet: Annotated[bool, typer.Option(help="print nothing, the exit code tells the result")] = False,
+            durability: Annotated[
+                str, typer.Option(help="when the files are synced to disk: none, batch (once, at the end) or strict "
+                                       "(every file)")
+            ] = "none",
+            initial_commit: Annotated[
+                bool, typer.Option(help="commit the created files with a single git fast-import, except for the projects "
+                                        "created by a command, e.g. rust")
+            ] = False,
+            # Recorded by main and the daemon, which start tracing before the config is loaded
+            trace: Annotated[
+                str, typer.Option(help="write a Chrome trace of the creation's phases to this file")
+            ] = "",
+            version: Annotated[bool, typer.Option(help="show the newproject-cli version")] = False,
+            # One option per language, e.g. --python project_name, see import_typer
+            **project_names: str,
     ):
         """
         Create a new project via terminal
@@ -403,143 +1192,202 @@ class NewProject:
         if version:
             version_callback(value=True)
 
-        ide_name = ""
-        if code:
-            ide_name = "code"
-        elif pycharm:
-            ide_name = "pycharm"
-        elif idea:
-            ide_name = "idea"
+        check_choice(value=output, choices=OUTPUT_MODES, option="--output")
+        check_choice(value=durability, choices=DURABILITY_POLICIES, option="--durability")
+
+        # Does nothing when main or the daemon already collect the result, from before the config was loaded
+        with reporting("json" if output == "json" else "quiet" if quiet else "text"):
+            ide_name = ""
+            if code:
+                ide_name = "code"
+            elif pycharm:
+                ide_name = "pycharm"
+            elif idea:
+                ide_name = "idea"
+
+            self.executor = DryRunExecutor() if dry_run else self.step_executor
+            self.durability = durability
+            self.initial_commit = initial_commit
+
+            if from_manifest:
+                self.create_from_manifest(manifest_file=from_manifest, ide=ide_name)
+                return
+
+            self.create_projects(project_names=project_names, ide=ide_name)
+
+
+def run_command(command: list) -> None:
+    """
+    Runs a command. If the console output is being captured, the command's output is captured too
+    :param command: (list) the command and its arguments
+    """
+    with span("run_command", command=command) as command_span:
+        if not console.is_capturing_output():
+            result = subprocess.run(command)
+        else:
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            console.file.write(result.stdout)
+            record_command(command=command, exit_code=result.returncode, output=result.stdout)
+        command_span.set(exit_code=result.returncode)
+
+
+def run_creation(creation: tuple, language: str = "") -> None:
+    """
+    Runs a creation
+    :param creation: (tuple) the create function followed by its arguments, see NewProject.project_creation
+    :param language: (str) the language of the project, for the result of --output json
+    """
+    create_func, *args = creation
+    with span(create_func.__name__, project_name=args[1]), creation_record(language=language, project_name=args[1]):
+        create_func(*args)
+
+
+def run_captured(creation: tuple, language: str = "") -> tuple[str, int]:
+    """
+    Runs a creation, capturing its output
+    :param creation: (tuple) the create function followed by its arguments
+    :param language: (str) the language of the project
+    :return: the output and the exit code of the creation
+    """
+    exit_code = 0
+    with console.capture_output() as output:
+        try:
+            run_creation(creation, language=language)
+        except SystemExit as creation_exit:
+            exit_code = creation_exit.code
+
+    return output.getvalue(), exit_code
+
+
+def print_manifest_summary(results: list) -> None:
+    """
+    Prints the outcome of every manifest entry
+    :param results: (list) (language, project name, error or None) for every entry
+    """
+    console.print("\n[dodger_blue1]Summary[/dodger_blue1]")
+    for language, project_name, error in results:
+        if error is None:
+            console.print(f"[green]✓[/green] {project_name} ({language})")
+        else:
+            console.print(f"[red3]𝙓[/red3] {project_name} ({language}): {error}")
 
-        project_mapping = {
-            python: (
-                self.create_project,
-                self.PROJECTS_DIR_NAMES["python"],
-                python,
-                f"{python}.py",
-                self.newproject_config["python"]["file_content"],
-                self.newproject_config["python"]["gitignore_content"],
-                ide_name,
-            ),
-            java: (
-                self.create_project,
-                self.PROJECTS_DIR_NAMES["java"],
-                java,
-                "Main.java",
-                self.newproject_config["java"]["file_content"],
-                self.newproject_config["java"]["gitignore_content"],
-                ide_name,
-            ),
-            go: (
-                self.create_project,
-                self.PROJECTS_DIR_NAMES["go"],
-                go,
-                "main.go",
-                self.newproject_config["go"]["file_content"],
-                self.newproject_config["go"]["gitignore_content"],
-                ide_name,
-            ),
-            bash: (
-                self.create_project,
-                self.PROJECTS_DIR_NAMES["bash"],
-                bash,
-                f"{bash}.sh",
-                self.newproject_config["bash"]["file_content"],
-                self.newproject_config["bash"]["gitignore_content"],
-                ide_name,
-            ),
-            cpp: (
-                self.create_project,
-                self.PROJECTS_DIR_NAMES["cpp"],
-                cpp,
-                "main.cpp",
-                self.newproject_config["cpp"]["file_content"],
-                self.newproject_config["cpp"]["gitignore_content"],
-                ide_name,
-            ),
-            clang: (
-                self.create_project,
-                self.PROJECTS_DIR_NAMES["c_lang"],
-                clang,
-                "main.c",
-                self.newproject_config["c_lang"]["file_content"],
-                self.newproject_config["c_lang"]["gitignore_content"],
-                ide_name,
-            ),
-            php: (
-                self.create_project,
-                self.PROJECTS_DIR_NAMES["php"],
-                php,
-                "index.php",
-                self.newproject_config["php"]["file_content"],
-                self.newproject_config["php"]["gitignore_content"],
-                ide_name,
-            ),
-            lua: (
-                self.create_project,
-                self.PROJECTS_DIR_NAMES["lua"],
-                lua,
-                "main.lua",
-                self.newproject_config["lua"]["file_content"],
-                self.newproject_config["lua"]["gitignore_content"],
-                ide_name,
-            ),
-            rust: (
-                self.create_project_with_commands,
-                self.PROJECTS_DIR_NAMES["rust"],
-                rust,
-                ide_name,
-            ),
-            ruby: (
-                self.create_project_with_commands,
-                self.PROJECTS_DIR_NAMES["ruby"],
-                ruby,
-                ide_name,
-            ),
-            ocaml: (
-                self.create_project_with_commands,
-                self.PROJECTS_DIR_NAMES["ocaml"],
-                ocaml,
-                ide_name,
-            ),
-            vlang: (
-                self.create_project_with_commands,
-                self.PROJECTS_DIR_NAMES["vlang"],
-                vlang,
-                ide_name,
-            ),
-            web: (
-                self.create_web_project,
-                self.PROJECTS_DIR_NAMES["web"],
-                web,
-                self.newproject_config["web"]["html_file_content"],
-                self.newproject_config["web"]["css_file_content"],
-                self.newproject_config["web"]["javascript_file_content"],
-                self.newproject_config["web"]["gitignore_content"],
-                ide_name,
-            ),
-        }
+    failures = sum(error is not None for _, _, error in results)
+    console.print(f"{len(results) - failures} created, {failures} failed")
 
-        for flag, func_and_proj_info in project_mapping.items():
-            if flag:
-                create_func, *args = func_and_proj_info
-                # Checks if the project_name doesn't contain: spaces, &&, ||
-                project_name_check(flag)
 
-                create_func(*args)
-                break
-        else:
-            console.print("[bold red]No option provided[/bold red]")
+def check_choice(value: str, choices: tuple, option: str) -> None:
+    """
+    :raises typer.BadParameter: if value is not one of the choices of the option
+    """
+    if value not in choices:
+        # handle can be called without the command line parser, e.g. by the tests
+        import typer
+
+        raise typer.BadParameter(f"must be one of: {', '.join(choices)}", param_hint=option)
 
 
 def version_callback(value: bool):
     if value:
+        # handle can be called without the command line parser, e.g. by the tests
+        import typer
+
         print(f"newproject-cli version: {__version__}")
         raise typer.Exit()
 
 
+def import_typer() -> None:
+    """
+    Imports typer, which is only needed to parse the command line
+    """
+    global typer
+    import typer
+
+    # The annotations of handle are postponed: typer reads the Option metadata from the resolved ones
+    NewProject.handle.__annotations__ = get_type_hints(NewProject.handle, include_extras=True)
+    # Built from handle's own parameters: the signature of a previous import_typer (e.g. before the daemon
+    # reloaded) is dropped first
+    NewProject.handle.__signature__ = None
+    NewProject.handle.__signature__ = handle_signature()
+
+
+def handle_signature() -> inspect.Signature:
+    """
+    Builds the signature typer parses the command line with: handle's, with an option for every language
+    of the registry in place of **project_names. Only the names of the plugins are needed, they are not imported
+    """
+    from newproject.languages import BUILTIN_LANGUAGES
+
+    signature = inspect.signature(NewProject.handle)
+    self_parameter, *parameters = (
+        parameter.replace(annotation=NewProject.handle.__annotations__.get(parameter.name, parameter.annotation))
+        for parameter in signature.parameters.values() if parameter.kind != inspect.Parameter.VAR_KEYWORD
+    )
+    language_parameters = [
+        inspect.Parameter(
+            language,
+            inspect.Parameter.KEYWORD_ONLY,
+            default="",
+            annotation=Annotated[str, typer.Option(help=(
+                BUILTIN_LANGUAGES[language].help if language in BUILTIN_LANGUAGES
+                else f"create a {language} project (plugin)"
+            ))],
+        )
+        # Sorted, before the other options
+        for language in sorted(language_names())
+    ]
+
+    return signature.replace(parameters=[
+        self_parameter,
+        *language_parameters,
+        *(parameter.replace(kind=inspect.Parameter.KEYWORD_ONLY) for parameter in parameters),
+    ])
+
+
+def subcommands_app() -> typer.Typer:
+    """
+    Builds the app of the newproject subcommands, e.g. `newproject daemon`
+    """
+    from newproject.catalog import list_projects, search_projects
+    from newproject.daemon import serve
+    from newproject.dedupe import dedupe
+    from newproject.disk_usage import du, prune
+    from newproject.tools import doctor
+
+    app = typer.Typer(add_completion=False)
+
+    @app.callback()
+    def subcommands():
+        """
+        newproject commands
+        """
+
+    app.command("daemon")(serve)
+    app.command("dedupe")(dedupe)
+    app.command("doctor")(doctor)
+    app.command("du")(du)
+    app.command("list")(list_projects)
+    app.command("prune")(prune)
+    app.command("search")(search_projects)
+
+    return app
+
+
 def main():
-    typer.run(NewProject().handle)
+    # Fast path: no need to load the config or the command line parser
+    if sys.argv[1:] == ["--version"]:
+        print(f"newproject-cli version: {__version__}")
+        return
+
+    configure_logging()
+    import_typer()
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        subcommands_app()(prog_name="newproject")
+    else:
+        # The trace and the result start before the config is loaded, so they can't wait for typer to parse
+        # --trace and --output
+        with tracing(get_trace_file(sys.argv[1:])), reporting(get_output_mode(sys.argv[1:])), \
+                span("newproject", args=sys.argv[1:]):
+            typer.run(NewProject().handle)
 
 
 if __name__ == "__main__":
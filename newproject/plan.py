@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+import os
+
+from abc import ABC, abstractmethod
+from typing import Final, NamedTuple
+
+from newproject.report import record_paths, record_plan
+from newproject.steps import Step, run_steps
+from newproject.utils import console
+
+
+class MakeDir(NamedTuple):
+    path: str
+
+    def describe(self) -> str:
+        return f"mkdir     {self.path}"
+
+    def paths(self) -> tuple:
+        return (self.path,)
+
+
+class WriteFile(NamedTuple):
+    path: str
+    content: str
+    # Quiet writes (e.g. the README) don't print a line
+    quiet: bool = False
+
+    def describe(self) -> str:
+        return f"write     {self.path} ({len(self.content.encode())} bytes)"
+
+    def paths(self) -> tuple:
+        return (self.path,)
+
+
+class RunCommand(NamedTuple):
+    command: list
+
+    def describe(self) -> str:
+        return f"run       {' '.join(self.command)}"
+
+    def paths(self) -> tuple:
+        return ()
+
+
+class GenerateScaffold(NamedTuple):
+    """
+    Runs a generator (cargo new, bundler gem...) on the project folder, or rebuilds its output from the scaffold cache
+    """
+    command_args: list
+    project_dir: str
+
+    def describe(self) -> str:
+        return f"generate  {' '.join(self.command_args)} {self.project_dir}"
+
+    def paths(self) -> tuple:
+        return (self.project_dir,)
+
+
+class GitInit(NamedTuple):
+    project_dir: str
+    gitignore_content: str
+
+    def describe(self) -> str:
+        return f"git-init  {self.project_dir} (.gitignore: {len(self.gitignore_content.encode())} bytes)"
+
+    def paths(self) -> tuple:
+        return os.path.join(self.project_dir, ".git"), os.path.join(self.project_dir, ".gitignore")
+
+
+class InitialCommit(NamedTuple):
+    """
+    Commits the files created by the plan, see git_repository.initial_commit
+    """
+    project_dir: str
+    # The paths created by the plan: its files are committed
+    files: tuple
+
+    def describe(self) -> str:
+        return f"commit    {self.project_dir} (git fast-import)"
+
+    def paths(self) -> tuple:
+        return ()
+
+
+class CreateVenv(NamedTuple):
+    project_dir: str
+
+    def describe(self) -> str:
+        return f"venv      {os.path.join(self.project_dir, 'venv')}"
+
+    def paths(self) -> tuple:
+        return (os.path.join(self.project_dir, "venv"),)
+
+
+class Preinstall(NamedTuple):
+    """
+    Installs packages in a venv from a local wheelhouse, see wheelhouse.preinstall
+    """
+    venv_dir: str
+    requirements: tuple
+    wheelhouse: str
+
+    def describe(self) -> str:
+        return f"install   {' '.join(self.requirements)} -> {self.venv_dir} (from {self.wheelhouse})"
+
+    def paths(self) -> tuple:
+        return ()
+
+
+class DedupeVenv(NamedTuple):
+    """
+    Replaces the files of a venv with hardlinks into the content-addressed store, see dedupe.dedupe_venvs
+    """
+    venv_dir: str
+    store_dir: str
+
+    def describe(self) -> str:
+        return f"dedupe    {self.venv_dir} -> {self.store_dir}"
+
+    def paths(self) -> tuple:
+        return ()
+
+
+class RenderTemplate(NamedTuple):
+    template_dir: str
+    project_dir: str
+    variables: dict
+    # The template directory compiled by templates.compile_template_dir
+    compiled: tuple
+
+    def describe(self) -> str:
+        dirs, files = self.compiled
+        return f"template  {self.template_dir} -> {self.project_dir} ({len(dirs)} folders, {len(files)} files)"
+
+    def paths(self) -> tuple:
+        dirs, files = self.compiled
+        return (
+            *(os.path.join(self.project_dir, relative_dir) for relative_dir in dirs),
+            *(os.path.join(self.project_dir, relative_file) for relative_file, _ in files),
+        )
+
+
+class OpenIde(NamedTuple):
+    ide_command: str
+    project_dir: str
+
+    def describe(self) -> str:
+        return f"open-ide  {self.ide_command} {self.project_dir}"
+
+    def paths(self) -> tuple:
+        return ()
+
+
+# The operations worth running in a thread, see steps.Step's slow
+SLOW_OPERATIONS: Final[tuple] = (
+    RunCommand, GenerateScaffold, CreateVenv, Preinstall, DedupeVenv, RenderTemplate, OpenIde, InitialCommit
+)
+
+
+class PlanStep(NamedTuple):
+    """
+    An operation of a creation plan, done once the steps named in `after` are done
+    """
+    name: str
+    operation: NamedTuple
+    after: tuple = ()
+
+
+class OperationError(Exception):
+    """
+    An operation failed and its error has been reported: the rest of the creation is abandoned
+    """
+
+
+class Executor(ABC):
+    """
+    Carries out a creation plan
+    """
+
+    @abstractmethod
+    def execute(self, plan: list) -> None:
+        """
+        :param plan: (list) the plan steps, every step listed after the ones it depends on
+        """
+
+
+class DryRunExecutor(Executor):
+    """
+    Prints the plan without touching the filesystem
+    """
+
+    def execute(self, plan: list) -> None:
+        console.print("[dodger_blue1]Dry run, nothing is created:[/dodger_blue1]")
+        for plan_step in plan:
+            console.print(plan_step.operation.describe(), markup=False, highlight=False, soft_wrap=True)
+        console.print()
+        record_plan([plan_step.operation.describe() for plan_step in plan])
+
+
+class StepExecutor(Executor):
+    """
+    Runs the plan as a step graph: the independent operations overlap the slow ones
+    """
+
+    def __init__(self, handlers: dict, header: str = "", footer: str = ""):
+        """
+        :param handlers: (dict) operation type -> (function called with the operation, whether its output is live)
+        :param header: (str) printed before the plan is run
+        :param footer: (str) printed once the plan is done
+        """
+        self.handlers = handlers
+        self.header = header
+        self.footer = footer
+
+    def to_step(self, plan_step: PlanStep) -> Step:
+        handler, live = self.handlers[type(plan_step.operation)]
+        return Step(plan_step.name, self.run_operation, {"handler": handler, "operation": plan_step.operation},
+                    after=plan_step.after, live=live, slow=isinstance(plan_step.operation, SLOW_OPERATIONS))
+
+    @staticmethod
+    def run_operation(handler, operation: NamedTuple) -> None:
+        handler(operation)
+        record_paths(operation.paths())
+
+    def execute(self, plan: list) -> None:
+        if self.header:
+            console.print(self.header)
+
+        run_steps([self.to_step(plan_step) for plan_step in plan])
+
+        if self.footer:
+            console.print(self.footer)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+import contextlib
+import contextvars
+import functools
+import sys
+import time
+
+from typing import Final
+
+from newproject.utils import console
+
+OUTPUT_MODES: Final[tuple] = ("text", "json")
+
+# The result of the current run, None when it is not collected
+_report = None
+# The records of the creation and of the step running in the current thread or task
+_creation = contextvars.ContextVar("creation", default=None)
+_step = contextvars.ContextVar("step", default=None)
+
+
+def get_output_mode(args: list) -> str:
+    """
+    Finds the output mode in the command line arguments, before they are parsed:
+    the config is loaded before typer runs and its errors are part of the result
+    :param args: (list) the command line arguments
+    :return: (str) "json", "quiet" or "text"
+    """
+    for index, arg in enumerate(args):
+        if arg == "--":
+            break
+        if (arg == "--output" and args[index + 1:index + 2] == ["json"]) or arg == "--output=json":
+            return "json"
+        if arg == "--quiet":
+            return "quiet"
+
+    return "text"
+
+
+def is_reporting() -> bool:
+    return _report is not None
+
+
+@functools.cache
+def error_names() -> dict:
+    import newproject.error_codes
+
+    return {value: name for name, value in vars(newproject.error_codes).items() if name.isupper()}
+
+
+def exit_code_of(system_exit: SystemExit) -> int:
+    if system_exit.code is None:
+        return 0
+    return system_exit.code if isinstance(system_exit.code, int) else 1
+
+
+def innermost_record() -> dict | None:
+    return _step.get() or _creation.get() or _report
+
+
+@contextlib.contextmanager
+def reporting(output_mode: str):
+    """
+    Collects the result of the block without printing anything, then prints it as one JSON object
+    if output_mode is json. Does nothing in text mode or if a result is already being collected
+    :param output_mode: (str) "json", "quiet" or "text"
+    """
+    global _report
+
+    if output_mode == "text" or _report is not None:
+        yield
+        return
+
+    _report = {"projects": [], "errors": []}
+    start = time.monotonic()
+    exit_code = 0
+    console.quiet = True
+    try:
+        yield
+    except SystemExit as system_exit:
+        exit_code = exit_code_of(system_exit)
+        raise
+    finally:
+        report, _report = _report, None
+        console.quiet = False
+        if output_mode == "json":
+            import json
+
+            report["exit_code"] = exit_code
+            report["duration_ms"] = (time.monotonic() - start) * 1000
+            sys.stdout.write(json.dumps(report) + "\n")
+            sys.stdout.flush()
+
+
+@contextlib.contextmanager
+def creation_record(language: str, project_name: str):
+    """
+    Records a creation: its status, duration, paths, steps and errors
+    """
+    if _report is None:
+        yield
+        return
+
+    record = {
+        "language": language,
+        "project_name": project_name,
+        "project_dir": "",
+        "status": "ok",
+        "exit_code": 0,
+        "duration_ms": 0.0,
+        "paths": [],
+        # The operations of a dry run
+        "plan": [],
+        "steps": [],
+        "commands": [],
+        "errors": [],
+    }
+    _report["projects"].append(record)
+    token = _creation.set(record)
+    start = time.monotonic()
+    try:
+        yield
+    except SystemExit as system_exit:
+        record["exit_code"] = exit_code_of(system_exit)
+        raise
+    finally:
+        _creation.reset(token)
+        record["duration_ms"] = (time.monotonic() - start) * 1000
+        if record["exit_code"] or record["errors"] or any(step["status"] != "ok" for step in record["steps"]):
+            record["status"] = "failed"
+
+
+@contextlib.contextmanager
+def step_record(name: str):
+    """
+    Records a step of the current creation: its status, duration, commands and errors
+    """
+    creation = _creation.get()
+    if _report is None or creation is None:
+        yield
+        return
+
+    record = {"name": name, "status": "ok", "duration_ms": 0.0, "commands": [], "errors": []}
+    token = _step.set(record)
+    start = time.monotonic()
+    try:
+        yield
+    except BaseException:
+        record["status"] = "failed"
+        raise
+    finally:
+        _step.reset(token)
+        record["duration_ms"] = (time.monotonic() - start) * 1000
+        if record["errors"]:
+            record["status"] = "failed"
+        creation["steps"].append(record)
+
+
+def record_error(error_code: int) -> None:
+    """
+    Records an error code in the current step, creation, or run
+    """
+    record = innermost_record()
+    if record is not None:
+        record["errors"].append({"code": error_code, "name": error_names().get(error_code, "")})
+
+
+def record_command(command: list, exit_code: int, output: str) -> None:
+    """
+    Records a command run by the current step or creation, with its captured output
+    """
+    record = _step.get() or _creation.get()
+    if record is not None:
+        record["commands"].append({"command": command, "exit_code": exit_code, "output": output})
+
+
+def record_project_dir(project_dir: str) -> None:
+    creation = _creation.get()
+    if creation is not None:
+        creation["project_dir"] = project_dir
+
+
+def record_paths(paths: tuple) -> None:
+    """
+    Records the paths created by the current step, unless it failed
+    """
+    creation, step = _creation.get(), _step.get()
+    if creation is not None and not (step and step["errors"]):
+        creation["paths"].extend(paths)
+
+
+def record_plan(operations: list) -> None:
+    """
+    Records the operations planned by a dry run
+    """
+    creation = _creation.get()
+    if creation is not None:
+        creation["plan"] = operations
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+
+from typing import Final
+
+from newproject.tracing import span
+from newproject.utils import get_cache_path
+from newproject.writer import make_dir, write_file
+
+SCAFFOLDS_DIR_NAME: Final[str] = "scaffolds"
+SCAFFOLD_CACHE_VERSION: Final[int] = 1
+
+# Names the snapshots can be rebuilt for: lowercase words separated by _ or -
+SNAPSHOT_NAME_PATTERN = re.compile(r"^[a-z][a-z0-9]*(?:[_-][a-z][a-z0-9]*)*$")
+# The generators run on a probe name with the same separators as the project name: nprobea_nprobeb...
+PROBE_PREFIX: Final[str] = "nprobe"
+PLACEHOLDER_PATTERN = re.compile(r"\x00(\d+)\x00")
+
+# Config files of the generators that change what they generate
+GENERATOR_CONFIG_FILES: Final[dict] = {
+    "cargo": ("~/.cargo/config.toml", "~/.cargo/config"),
+}
+# Generators that ask questions, which a snapshot would answer once for every project: bundler gem on first use
+# (test framework, CI, license...), v new every time (description, version, license). They run on the project
+# itself, in the user's terminal
+INTERACTIVE_GENERATORS: Final[tuple] = ("bundler", "v")
+
+# The names a generator refuses or warns about, which a snapshot would accept: the generator runs on them.
+# cargo: the Rust keywords, the built-in crates, its build folders and the reserved Windows file names
+RUST_KEYWORDS: Final[frozenset] = frozenset((
+    "abstract as async await become box break const continue crate do dyn else enum extern false final fn for gen if "
+    "impl in let loop macro match mod move mut override priv pub ref return self static struct super trait true try "
+    "type typeof unsafe unsized use virtual where while yield"
+).split())
+REJECTED_NAMES: Final[dict] = {
+    "cargo": RUST_KEYWORDS | {
+        "alloc", "core", "proc_macro", "std", "test",
+        "build", "deps", "examples", "incremental",
+        "aux", "con", "nul", "prn", *(f"com{index}" for index in range(1, 10)), *(f"lpt{index}" for index in range(1, 10)),
+    },
+}
+# Files that make a generator behave differently in the folders below them, e.g. cargo adds the package to the
+# workspace: the generator runs in them
+WORKSPACE_FILES: Final[dict] = {
+    "cargo": ("Cargo.toml", "[workspace]"),
+}
+# Repositories in which the generators don't initialize one
+REPOSITORY_DIR_NAMES: Final[tuple] = (".git", ".hg")
+
+
+def name_forms(name: str) -> list:
+    """
+    The spellings of a project name that generators use, e.g. in file names, module names and constants
+    :param name: (str) a name matching SNAPSHOT_NAME_PATTERN
+    :return: (list) the spellings, always in the same order
+    """
+    def camel(words: str) -> str:
+        return "".join(word.capitalize() for word in re.split(r"[_-]", words))
+
+    snake = name.replace("-", "_")
+    return [
+        name,
+        snake,
+        name.replace("_", "-"),
+        name.replace("-", "/"),
+        name.upper(),
+        snake.upper(),
+        name.capitalize(),
+        camel(name),
+        # Ruby modules: foo_bar-baz -> FooBar::Baz
+        "::".join(camel(part) for part in name.split("-")),
+    ]
+
+
+def probe_name(project_name: str) -> str:
+    """
+    :return: (str) the probe name with the separators of the project name
+    """
+    words = re.split(r"[_-]", project_name)
+    separators = re.findall(r"[_-]", project_name)
+    probe = f"{PROBE_PREFIX}a"
+    for index, separator in enumerate(separators, start=1):
+        probe += f"{separator}{PROBE_PREFIX}{chr(ord('a') + index)}"
+
+    return probe if len(words) <= 26 else ""
+
+
+def get_tool_version(tool: str) -> str:
+    """
+    :return: (str) the version of a generator: from the tools cache for the known tools, see tools.resolve_tools
+    """
+    from newproject.tools import KNOWN_TOOLS, resolve_tools
+
+    if tool in KNOWN_TOOLS:
+        return resolve_tools(with_versions=True)[tool]["version"] or ""
+
+    command = [tool, "--version"]
+    with span("get_tool_version", command=command) as version_span:
+        result = subprocess.run(command, capture_output=True, text=True, check=True, stdin=subprocess.DEVNULL)
+        version_span.set(exit_code=result.returncode)
+
+    return result.stdout.strip()
+
+
+def config_fingerprint(config_file: str) -> list | None:
+    try:
+        config_stat = os.stat(os.path.expanduser(config_file))
+    except OSError:
+        return None
+
+    return [config_stat.st_mtime_ns, config_stat.st_size]
+
+
+def scaffold_key(command_args: list, project_name: str, git_config: dict, tool_version: str) -> str:
+    """
+    Builds the key of the snapshot of a generator: the generator, its version and arguments, the shape of the
+    project name, and what else ends up in the generated files (author, year, the generator's config)
+    :param command_args: (list) the generator command, without the project folder
+    :param project_name: (str) the name of the project
+    :param git_config: (dict) the user's git config, see git_repository.read_git_config
+    :param tool_version: (str) the version of the generator, see get_tool_version
+    :return: (str) the key
+    """
+    tool = command_args[0]
+    key = {
+        "version": SCAFFOLD_CACHE_VERSION,
+        "command": command_args,
+        "tool_version": tool_version,
+        "probe": probe_name(project_name),
+        "author": [git_config.get("user.name", ""), git_config.get("user.email", "")],
+        "year": time.strftime("%Y"),
+        "config": [config_fingerprint(config_file) for config_file in GENERATOR_CONFIG_FILES.get(tool, ())],
+    }
+
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def parameterize(content: str, probe_values: list) -> str:
+    """
+    Replaces the spellings of the probe name with numbered placeholders
+    """
+    for index, value in sorted(enumerate(probe_values), key=lambda item: -len(item[1])):
+        content = content.replace(value, f"\x00{index}\x00")
+
+    return content
+
+
+def snapshot_generator(command_args: list, probe: str) -> dict:
+    """
+    Runs a generator on the probe name in a scratch folder and records what it generated, the probe name
+    parameterized. The snapshot is not cacheable if the probe name is left in it, e.g. in a spelling
+    that name_forms doesn't know
+    :param command_args: (list) the generator command, without the project folder
+    :param probe: (str) the probe name
+    :return: (dict) the snapshot
+    :raises subprocess.CalledProcessError: if the generator fails
+    """
+    probe_values = name_forms(probe)
+    with tempfile.TemporaryDirectory(prefix="scaffold-") as scratch_dir:
+        probe_dir = os.path.join(scratch_dir, probe)
+        command = [*command_args, probe_dir]
+        with span("snapshot_generator", command=command) as generator_span:
+            # The snapshotted generators don't ask questions, see INTERACTIVE_GENERATORS: one that would gets an
+            # end of file instead of waiting for an answer
+            result = subprocess.run(command, cwd=scratch_dir, capture_output=True, check=True, stdin=subprocess.DEVNULL)
+            generator_span.set(exit_code=result.returncode)
+
+        snapshot = {"cacheable": False, "git": os.path.isdir(os.path.join(probe_dir, ".git")), "dirs": [], "files": []}
+        if not os.path.isdir(probe_dir):
+            return snapshot
+
+        for root, dir_names, file_names in os.walk(probe_dir):
+            dir_names[:] = sorted(dir_name for dir_name in dir_names if dir_name != ".git")
+            relative_root = os.path.relpath(root, probe_dir)
+            for dir_name in dir_names:
+                snapshot["dirs"].append(parameterize(os.path.normpath(os.path.join(relative_root, dir_name)), probe_values))
+            for file_name in sorted(file_names):
+                file_path = os.path.join(root, file_name)
+                if os.path.islink(file_path):
+                    return snapshot
+                try:
+                    with open(file_path, encoding="utf-8", newline="") as generated_file:
+                        content = generated_file.read()
+                except UnicodeDecodeError:
+                    return snapshot
+                if "\x00" in content:
+                    # It would be read as a placeholder
+                    return snapshot
+                snapshot["files"].append({
+                    "path": parameterize(os.path.normpath(os.path.join(relative_root, file_name)), probe_values),
+                    "mode": os.stat(file_path).st_mode & 0o777,
+                    "content": parameterize(content, probe_values),
+                })
+
+    recorded = json.dumps(snapshot)
+    snapshot["cacheable"] = PROBE_PREFIX not in recorded.lower() and scratch_dir not in recorded
+
+    return snapshot
+
+
+def store_snapshot(snapshot_file: str, snapshot: dict) -> None:
+    """
+    Atomically writes a snapshot. Errors are ignored: the cache is only an optimization
+    """
+    try:
+        os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(snapshot_file), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as temp_file:
+                json.dump(snapshot, temp_file)
+            os.replace(temp_path, snapshot_file)
+        except OSError:
+            os.unlink(temp_path)
+            raise
+    except OSError:
+        pass
+
+
+def is_rejected_name(tool: str, project_name: str) -> bool:
+    """
+    :return: (bool) True if the generator would refuse the name or warn about it
+    """
+    return project_name.replace("-", "_") in REJECTED_NAMES.get(tool, ())
+
+
+def in_workspace(tool: str, projects_dir: str) -> bool:
+    """
+    Looks for a repository, or a workspace of the generator, in the projects folder and its parents: the generator
+    doesn't create the same files in them, e.g. cargo doesn't run git init in a repository
+    :param tool: (str) the generator
+    :param projects_dir: (str) the folder of the new project
+    :return: (bool) True if the folder is in a repository or a workspace
+    """
+    workspace_file, workspace_marker = WORKSPACE_FILES.get(tool, ("", ""))
+    folder = os.path.abspath(projects_dir)
+    while True:
+        if any(os.path.exists(os.path.join(folder, dir_name)) for dir_name in REPOSITORY_DIR_NAMES):
+            return True
+        if workspace_file:
+            try:
+                with open(os.path.join(folder, workspace_file), encoding="utf-8", errors="replace") as manifest:
+                    if any(line.strip() == workspace_marker for line in manifest):
+                        return True
+            except OSError:
+                pass
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return False
+        folder = parent
+
+
+def get_scaffold(command_args: list, project_dir: str, git_config: dict) -> dict | None:
+    """
+    Gets the snapshot of a generator for a project, generating it on a miss. The generator runs on the project
+    itself, so that its own checks apply, for the names it would refuse and in repositories and workspaces, and so
+    that the user answers its questions, see INTERACTIVE_GENERATORS
+    :param command_args: (list) the generator command, without the project folder
+    :param project_dir: (str) the project folder
+    :param git_config: (dict) the user's git config
+    :return: (dict) the snapshot or None if the generator must run on the project itself
+    :raises subprocess.CalledProcessError: if the generator fails on the probe name
+    """
+    tool, project_name = command_args[0], os.path.basename(project_dir)
+    if tool in INTERACTIVE_GENERATORS or not SNAPSHOT_NAME_PATTERN.match(project_name) or not probe_name(project_name) or \
+            is_rejected_name(tool, project_name) or in_workspace(tool, os.path.dirname(project_dir)):
+        return None
+    tool_version = get_tool_version(tool)
+    if not tool_version:
+        # Not installed, or its version is unknown: its snapshots can't be told apart
+        return None
+
+    key = scaffold_key(command_args=command_args, project_name=project_name, git_config=git_config,
+                       tool_version=tool_version)
+    snapshot_file = os.path.join(get_cache_path(), SCAFFOLDS_DIR_NAME, f"{key}.json")
+    try:
+        with open(snapshot_file) as snapshot_f:
+            snapshot = json.load(snapshot_f)
+    except (OSError, ValueError):
+        snapshot = snapshot_generator(command_args=command_args, probe=probe_name(project_name))
+        # Uncacheable snapshots are stored too: the generator is not probed again until its version changes
+        store_snapshot(snapshot_file=snapshot_file, snapshot=snapshot)
+
+    return snapshot if snapshot["cacheable"] else None
+
+
+def materialize_scaffold(snapshot: dict, project_dir: str, project_name: str) -> int:
+    """
+    Rebuilds a generated project from its snapshot
+    :param snapshot: (dict) the snapshot, see get_scaffold
+    :param project_dir: (str) the project folder, which must not exist
+    :param project_name: (str) the name of the project
+    :return: (int) the number of files written
+    :raises FileExistsError: if the project folder exists
+    """
+    values = name_forms(project_name)
+
+    def substitute(content: str) -> str:
+        return PLACEHOLDER_PATTERN.sub(lambda match: values[int(match.group(1))], content)
+
+    make_dir(project_dir)
+    for relative_dir in snapshot["dirs"]:
+        make_dir(os.path.join(project_dir, substitute(relative_dir)), parents=True, exist_ok=True)
+    for generated_file in snapshot["files"]:
+        file_path = os.path.join(project_dir, substitute(generated_file["path"]))
+        write_file(file_path, substitute(generated_file["content"]), encoding="utf-8", newline="")
+        os.chmod(file_path, generated_file["mode"])
+
+    return len(snapshot["files"])
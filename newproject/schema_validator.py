@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import functools
+import hashlib
+import json
+import os
+
+from typing import Callable, Final
+
+from newproject.cache import write_cache_file
+from newproject.utils import get_cache_path
+
+# Bumped whenever the generated code changes, so that stale validators are not reused
+GENERATOR_VERSION: Final[int] = 2
+
+# Keywords that don't affect validation
+ANNOTATION_KEYWORDS: Final[frozenset] = frozenset(
+    {"$schema", "$id", "$comment", "title", "description", "default", "examples"}
+)
+SUPPORTED_KEYWORDS: Final[frozenset] = ANNOTATION_KEYWORDS | {"type", "properties", "required", "items"}
+
+# JSON Schema type -> Python check, the same semantics as jsonschema's draft 7 type checker
+TYPE_CHECKS: Final[dict] = {
+    "string": "isinstance({0}, str)",
+    "object": "isinstance({0}, dict)",
+    "array": "isinstance({0}, list)",
+    "boolean": "isinstance({0}, bool)",
+    "null": "{0} is None",
+    "integer": "(isinstance({0}, int) and not isinstance({0}, bool)"
+               " or isinstance({0}, float) and {0}.is_integer())",
+    "number": "isinstance({0}, (int, float)) and not isinstance({0}, bool)",
+}
+
+
+class SchemaValidationError:
+    """
+    A validation error with the attributes of jsonschema.ValidationError used by check.config_file_validator
+    """
+
+    def __init__(self, message: str, relative_path: tuple, validator: str, matches_type: bool):
+        self.message = message
+        self.relative_path = relative_path
+        self.validator = validator
+        self.matches_type = matches_type
+        self.context = []
+        self.cause = None
+
+
+def schema_types(schema: dict) -> list | None:
+    """
+    :return: (list) the types allowed by a schema node or None if it doesn't restrict the type
+    """
+    if "type" not in schema:
+        return None
+    return [schema["type"]] if isinstance(schema["type"], str) else list(schema["type"])
+
+
+def is_supported(schema) -> bool:
+    """
+    Checks if a schema only uses the keywords the code generator can compile
+    :param schema: the schema node to check
+    :return: (bool) True if the schema can be compiled
+    """
+    if not isinstance(schema, dict) or not set(schema) <= SUPPORTED_KEYWORDS:
+        return False
+    types = schema_types(schema)
+    if types is not None and not set(types) <= set(TYPE_CHECKS):
+        return False
+    if not isinstance(schema.get("required", []), list):
+        return False
+
+    if "items" in schema and not is_supported(schema["items"]):
+        # Only a schema for every item, not a list of schemas (tuple validation)
+        return False
+
+    return all(is_supported(sub_schema) for sub_schema in schema.get("properties", {}).values())
+
+
+def generate_validator_source(json_schema: dict) -> str | None:
+    """
+    Compiles a JSON Schema into the source of a Python module defining validate(instance).
+    validate returns the same error jsonschema.validate would raise (the best match), or None
+    :param json_schema: (dict) the JSON Schema to compile
+    :return: (str) the source of the validator or None if the schema uses unsupported keywords
+    """
+    if not is_supported(json_schema):
+        return None
+
+    functions = []
+
+    def generate_node(schema: dict) -> str:
+        function_name = f"_validate_{len(functions)}"
+        functions.append("")
+        index = len(functions) - 1
+        lines = [f"def {function_name}(instance, path):"]
+
+        types = schema_types(schema)
+        # Errors of the "required" keyword are less relevant when the instance matches the type of the schema
+        required_matches_type = types is not None and "object" in types
+
+        # Keywords are checked in schema order, like jsonschema does
+        for keyword in schema:
+            if keyword == "type":
+                check = " or ".join(f"({TYPE_CHECKS[schema_type].format('instance')})" for schema_type in types)
+                expected = ", ".join(repr(schema_type) for schema_type in types)
+                lines.append(f"    if not ({check}):")
+                lines.append(f"        yield (f'{{instance!r}} is not of type ' {expected!r}, path, 'type', False)")
+            elif keyword == "properties":
+                lines.append("    if isinstance(instance, dict):")
+                for property_name, sub_schema in schema["properties"].items():
+                    sub_function_name = generate_node(sub_schema)
+                    lines.append(f"        if {property_name!r} in instance:")
+                    lines.append(
+                        f"            yield from {sub_function_name}(instance[{property_name!r}], "
+                        f"path + ({property_name!r},))"
+                    )
+            elif keyword == "items":
+                sub_function_name = generate_node(schema["items"])
+                lines.append("    if isinstance(instance, list):")
+                lines.append("        for item_index, item in enumerate(instance):")
+                lines.append(f"            yield from {sub_function_name}(item, path + (item_index,))")
+            elif keyword == "required":
+                lines.append("    if isinstance(instance, dict):")
+                for property_name in schema["required"]:
+                    message = f"{property_name!r} is a required property"
+                    lines.append(f"        if {property_name!r} not in instance:")
+                    lines.append(f"            yield ({message!r}, path, 'required', {required_matches_type})")
+
+        lines.append("    return")
+        lines.append("    yield")
+        functions[index] = "\n".join(lines)
+
+        return function_name
+
+    root_function_name = generate_node(json_schema)
+
+    return "\n\n\n".join([
+        f"# Generated by newproject.schema_validator (generator version {GENERATOR_VERSION}), do not edit",
+        *functions,
+        f'''def validate(instance):
+    best = None
+    for message, path, validator, matches_type in {root_function_name}(instance, ()):
+        # Same relevance as jsonschema.exceptions.best_match: shallowest error first,
+        # then errors whose instance doesn't match the type of the schema
+        relevance = (-len(path), not matches_type)
+        if best is None or relevance > best[0]:
+            best = (relevance, message, path, validator, matches_type)
+    if best is None:
+        return None
+    return SchemaValidationError(*best[1:])
+''',
+    ])
+
+
+@functools.cache
+def load_validator(schema_digest: str, json_schema_content: str) -> Callable | None:
+    """
+    Loads the compiled validator of a schema, generating it on first run
+    :param schema_digest: (str) the hash of the schema, which names the generated module in the cache
+    :param json_schema_content: (str) the JSON Schema
+    :return: the validate function or None if the schema can't be compiled
+    """
+    file_name = f"validator_{GENERATOR_VERSION}_{schema_digest}.py"
+    file_path = os.path.join(get_cache_path(), file_name)
+
+    try:
+        with open(file_path) as validator_file:
+            source = validator_file.read()
+    except OSError:
+        source = generate_validator_source(json.loads(json_schema_content))
+        if source is None:
+            return None
+        write_cache_file(file_name, source)
+
+    namespace = {"SchemaValidationError": SchemaValidationError}
+    exec(compile(source, file_path, "exec"), namespace)
+
+    return namespace["validate"]
+
+
+def compile_validator(json_schema: dict) -> Callable | None:
+    """
+    Gets the specialised validator function of a JSON Schema
+    :param json_schema: (dict) the JSON Schema
+    :return: the validate function or None if the schema can't be compiled
+    """
+    json_schema_content = json.dumps(json_schema)
+    schema_digest = hashlib.sha256(json_schema_content.encode()).hexdigest()
+
+    return load_validator(schema_digest, json_schema_content)
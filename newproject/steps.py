@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+from typing import Callable, NamedTuple
+
+from newproject.report import step_record
+from newproject.tracing import span
+from newproject.utils import console
+
+
+class Step(NamedTuple):
+    """
+    A step of a creation: func(**kwargs), run once the steps named in `after` are done.
+    The output of the step is printed in one block when it's done, unless it's `live` (e.g. it shows a spinner)
+    """
+    name: str
+    func: Callable
+    kwargs: dict
+    after: tuple = ()
+    live: bool = False
+    # Runs a subprocess or writes many files: worth running in a thread, next to the other steps
+    slow: bool = False
+
+
+def run_step(step: Step) -> str:
+    """
+    Runs a step in the current thread
+    :return: (str) the captured output of the step
+    """
+    with span(f"step {step.name}"), step_record(step.name):
+        if step.live:
+            step.func(**step.kwargs)
+            return ""
+
+        with console.capture_output() as output:
+            step.func(**step.kwargs)
+
+        return output.getvalue()
+
+
+def write_output(output: str) -> None:
+    if output:
+        console.file.write(output)
+        console.file.flush()
+
+
+def failed_dependency(step: Step, errors: dict) -> BaseException | None:
+    """
+    :param errors: (dict) name -> error of the failed steps
+    :return: the error of the first failed step the step depends on, None if there is none
+    """
+    return next((errors[dependency] for dependency in step.after if dependency in errors), None)
+
+
+def run_step_sequence(steps: list) -> dict:
+    """
+    Runs the steps one after another, in the current thread
+    :param steps: (list) the steps, every step listed after the ones it depends on
+    :return: (dict) name -> error of the failed steps
+    """
+    errors = {}
+    for step in steps:
+        error = failed_dependency(step, errors)
+        if error is None:
+            try:
+                write_output(run_step(step))
+            except Exception as step_error:
+                error = step_error
+        if error is not None:
+            errors[step.name] = error
+
+    return errors
+
+
+def run_step_graph(steps: list) -> dict:
+    """
+    Runs the steps in a thread pool as soon as the steps they depend on are done, so that independent steps overlap.
+    The output of the steps is written by the current thread
+    :param steps: (list) the steps, every step listed after the ones it depends on
+    :return: (dict) name -> error of the failed steps
+    """
+    import contextvars
+    import queue
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    done = queue.SimpleQueue()
+    finished, errors = set(), {}
+    waiting = list(steps)
+    running = 0
+    with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+        while waiting or running:
+            ready = [step for step in waiting if all(dependency in finished for dependency in step.after)]
+            if not ready and not running:
+                raise KeyError(f"unknown steps in {[step.after for step in waiting]}")
+            for step in ready:
+                waiting.remove(step)
+                error = failed_dependency(step, errors)
+                if error is not None:
+                    errors[step.name] = error
+                    finished.add(step.name)
+                    continue
+                # In the context of the creation: its captured output and its record, see report.creation_record
+                executor.submit(contextvars.copy_context().run, run_step, step).add_done_callback(
+                    lambda future, name=step.name: done.put((name, future))
+                )
+                running += 1
+            if not running:
+                # Only failed steps were ready: the steps that depend on them are ready now
+                continue
+
+            name, future = done.get()
+            running -= 1
+            finished.add(name)
+            if future.exception() is not None:
+                errors[name] = future.exception()
+            else:
+                write_output(future.result())
+
+    return errors
+
+
+def run_steps(steps: list) -> None:
+    """
+    Runs the steps of a creation: in a thread pool if one of them is slow, so that the others overlap it, one after
+    another otherwise, since a thread pool costs more than the fast steps it would overlap
+    :param steps: (list) the steps, every step listed after the ones it depends on
+    :raises: the error of the first failed step. A failed step fails the steps that depend on it, the others are run
+    """
+    if any(step.slow for step in steps):
+        errors = run_step_graph(steps)
+    else:
+        errors = run_step_sequence(steps)
+
+    for step in steps:
+        if step.name in errors:
+            raise errors[step.name]
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+import contextvars
+import functools
+import os
+import re
+import shutil
+
+from typing import Final
+
+from newproject.writer import add_written, make_dir, write_file
+
+# Maximum number of template files written at the same time
+MAX_TEMPLATE_WRITERS: Final[int] = 8
+
+# Variables available in templates as {{ name }}, \{{ is a literal {{. Only a name is a variable: {{}} (C++ v{{}})
+# and the expressions of other template engines ({{ user.name }}, {{ x | upper }}) are written as is
+TEMPLATE_VARIABLES: Final[tuple] = ("project_name", "language", "author", "date", "year")
+VARIABLE_PATTERN = re.compile(r"\\\{\{|\{\{\s*([A-Za-z_]\w*)\s*}}")
+
+# Config values that are templates
+CONFIG_TEMPLATE_KEYS: Final[tuple] = (
+    "file_content", "gitignore_content", "html_file_content", "css_file_content", "javascript_file_content"
+)
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def compile_template(content: str, source: str = "") -> list:
+    """
+    Compiles a template into its literal parts and variable names, alternated: even indexes are literals
+    :param content: (str) the template
+    :param source: (str) where the template comes from, for error messages
+    :return: (list) the compiled template
+    :raises TemplateError: if the template uses an unknown variable name, e.g. a misspelled one
+    """
+    parts = [""]
+    position = 0
+    for match in VARIABLE_PATTERN.finditer(content):
+        parts[-1] += content[position:match.start()]
+        position = match.end()
+
+        variable = match.group(1)
+        if variable is None:
+            # Escaped braces
+            parts[-1] += "{{"
+        elif variable in TEMPLATE_VARIABLES:
+            parts += [variable, ""]
+        else:
+            raise TemplateError(f"{source}: unknown variable {{{{ {variable} }}}}")
+    parts[-1] += content[position:]
+
+    return parts
+
+
+def render_template(parts: list, variables: dict) -> str:
+    """
+    Renders a compiled template
+    :param parts: (list) the compiled template
+    :param variables: (dict) the values of the template variables
+    :return: (str) the rendered template
+    """
+    if len(parts) == 1:
+        return parts[0]
+
+    return "".join(part if index % 2 == 0 else variables[part] for index, part in enumerate(parts))
+
+
+def compile_config_templates(config: dict) -> dict:
+    """
+    Compiles the templates of the config
+    :param config: (dict) the validated config
+    :return: (dict) "section.key" (or "key" at the top level) -> compiled template
+    :raises TemplateError: if a template uses an unknown variable
+    """
+    templates = {}
+    if isinstance(config.get("default_gitignore_content"), str):
+        templates["default_gitignore_content"] = compile_template(
+            config["default_gitignore_content"], source="default_gitignore_content"
+        )
+    for section_name, section in config.items():
+        if not isinstance(section, dict):
+            continue
+        for key in CONFIG_TEMPLATE_KEYS:
+            if isinstance(section.get(key), str):
+                templates[f"{section_name}.{key}"] = compile_template(section[key], source=f"{section_name}.{key}")
+
+    return templates
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_template_file(file_path: str, mtime_ns: int, size: int) -> list | None:
+    """
+    Compiles a template file, memoized on its mtime and size
+    :return: (list) the compiled template or None if the file is not text, in which case it is copied as is
+    """
+    try:
+        with open(file_path, encoding="utf-8", newline="") as template_file:
+            return compile_template(template_file.read(), source=file_path)
+    except UnicodeDecodeError:
+        return None
+
+
+def scan_template(template_dir: str) -> tuple[list, list]:
+    """
+    Walks a template directory once
+    :param template_dir: (str) the template directory
+    :return: the relative paths of the folders (parents first) and of the files of the template
+    :raises FileNotFoundError: if the template directory doesn't exist
+    """
+    if not os.path.isdir(template_dir):
+        raise FileNotFoundError(f"template directory not found: {template_dir}")
+
+    dirs, files = [], []
+    for root, dir_names, file_names in os.walk(template_dir):
+        relative_root = os.path.relpath(root, template_dir)
+        dir_names.sort()
+        for dir_name in dir_names:
+            dirs.append(os.path.normpath(os.path.join(relative_root, dir_name)))
+        for file_name in sorted(file_names):
+            files.append(os.path.normpath(os.path.join(relative_root, file_name)))
+
+    return dirs, files
+
+
+def compile_template_dir(template_dir: str) -> tuple[list, list]:
+    """
+    Walks and compiles a template directory, so that errors are found before anything is created
+    :param template_dir: (str) the template directory
+    :return: the relative paths of the folders, and (relative path, compiled template or None) for every file
+    :raises FileNotFoundError: if the template directory doesn't exist
+    :raises TemplateError: if a file uses an unknown variable
+    """
+    dirs, files = scan_template(template_dir)
+    compiled_files = []
+    for relative_file in files:
+        file_path = os.path.join(template_dir, relative_file)
+        file_stat = os.stat(file_path)
+        compiled_files.append((relative_file, compile_template_file(file_path, file_stat.st_mtime_ns, file_stat.st_size)))
+
+    return dirs, compiled_files
+
+
+def write_template_file(src: str, dst: str, parts: list | None, variables: dict) -> None:
+    if parts is None:
+        shutil.copyfile(src, dst)
+        add_written(dst)
+    else:
+        write_file(dst, render_template(parts, variables), encoding="utf-8", newline="")
+    # Keeps scripts executable
+    shutil.copymode(src, dst)
+
+
+def materialize_template(template_dir: str, project_dir: str, variables: dict, compiled: tuple = None) -> int:
+    """
+    Creates the folders of a template in one pass, then renders its files with a bounded pool of threads
+    :param template_dir: (str) the template directory
+    :param project_dir: (str) the project directory, which must exist
+    :param variables: (dict) the values of the template variables
+    :param compiled: (tuple) the template directory compiled by compile_template_dir, compiled here if None
+    :return: (int) the number of files written
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    dirs, files = compiled or compile_template_dir(template_dir)
+    for relative_dir in dirs:
+        make_dir(os.path.join(project_dir, relative_dir), parents=True, exist_ok=True)
+
+    if files:
+        # The writers add their files to the write batch of this thread
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=min(len(files), MAX_TEMPLATE_WRITERS)) as executor:
+            # list() re-raises the first error
+            list(executor.map(
+                lambda *args: context.copy().run(write_template_file, *args),
+                [os.path.join(template_dir, relative_file) for relative_file, _ in files],
+                [os.path.join(project_dir, relative_file) for relative_file, _ in files],
+                [parts for _, parts in files],
+                [variables] * len(files),
+            ))
+
+    return len(files)
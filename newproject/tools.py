@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+
+from typing import Final
+
+from newproject.cache import write_cache_file
+from newproject.tracing import span
+from newproject.utils import console, get_cache_path
+
+TOOLS_CACHE_FILE_NAME: Final[str] = "tools_cache.json"
+TOOLS_CACHE_VERSION: Final[int] = 1
+
+# Tools used by the creations -> the arguments that print their version, None if asking would start the tool
+KNOWN_TOOLS: Final[dict] = {
+    "git": ("--version",),
+    "python3": ("--version",),
+    "virtualenv": ("--version",),
+    "code": ("--version",),
+    "pycharm": None,
+    "idea": None,
+    "cargo": ("--version",),
+    "bundler": ("--version",),
+    "dune": ("--version",),
+    "v": ("--version",),
+}
+
+# Maximum number of tools probed at the same time
+MAX_TOOL_PROBES: Final[int] = 8
+# Seconds a tool has to print its version
+VERSION_TIMEOUT: Final[float] = 10
+
+# The tools resolved by this process and their cache key
+_resolved = None
+
+
+def tools_cache_key() -> dict:
+    """
+    Builds the key of the tools cache: $PATH and the mtimes of its folders, which change when a tool is added
+    to or removed from them
+    :return: (dict) the cache key
+    """
+    dir_mtimes = []
+    for path_dir in os.environ.get("PATH", os.defpath).split(os.pathsep):
+        try:
+            dir_mtimes.append(os.stat(path_dir).st_mtime_ns)
+        except OSError:
+            dir_mtimes.append(None)
+
+    return {
+        "version": TOOLS_CACHE_VERSION,
+        "path": hashlib.sha256(os.environ.get("PATH", os.defpath).encode()).hexdigest(),
+        "mtimes": hashlib.sha256(json.dumps(dir_mtimes).encode()).hexdigest(),
+    }
+
+
+def get_version(tool_path: str, version_args: tuple | None) -> str:
+    """
+    :return: (str) the first line the tool prints when asked for its version, "" if it can't be asked
+    """
+    if version_args is None:
+        return ""
+
+    try:
+        result = subprocess.run([tool_path, *version_args], capture_output=True, text=True,
+                                stdin=subprocess.DEVNULL, timeout=VERSION_TIMEOUT)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    output = (result.stdout.strip() or result.stderr.strip()).splitlines()
+
+    return output[0] if output else ""
+
+
+def probe_tool(tool: str, with_version: bool) -> dict:
+    """
+    Finds a tool in $PATH and, if asked, its version
+    :param tool: (str) one of KNOWN_TOOLS
+    :param with_version: (bool) runs the tool to get its version
+    :return: (dict) the path of the tool, None if it is not installed, and its version, None if it was not asked
+    """
+    tool_path = shutil.which(tool)
+    if tool_path is None:
+        return {"path": None, "version": ""}
+
+    return {"path": tool_path, "version": get_version(tool_path, KNOWN_TOOLS[tool]) if with_version else None}
+
+
+def probe_tools(with_versions: bool) -> dict:
+    """
+    Probes every known tool, in parallel
+    :param with_versions: (bool) runs the tools to get their versions
+    :return: (dict) tool -> its path and version, see probe_tool
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with span("probe_tools", tools=len(KNOWN_TOOLS), with_versions=with_versions), \
+            ThreadPoolExecutor(max_workers=min(len(KNOWN_TOOLS), MAX_TOOL_PROBES)) as executor:
+        return dict(zip(KNOWN_TOOLS, executor.map(probe_tool, KNOWN_TOOLS, [with_versions] * len(KNOWN_TOOLS))))
+
+
+def load_cached_tools(cache_key: dict) -> dict | None:
+    try:
+        with open(os.path.join(get_cache_path(), TOOLS_CACHE_FILE_NAME)) as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(cache, dict) or cache.get("key") != cache_key or not isinstance(cache.get("tools"), dict):
+        return None
+    if set(cache["tools"]) != set(KNOWN_TOOLS):
+        return None
+
+    return cache["tools"]
+
+
+def resolve_tools(with_versions: bool = False, refresh: bool = False) -> dict:
+    """
+    Gets the paths of the known tools: from this process, then from the tools cache, probing them again
+    when $PATH or one of its folders changed. The creations only need the paths: the versions are only
+    probed, and then cached, when they are asked for
+    :param with_versions: (bool) gets the versions too
+    :param refresh: (bool) probes the tools even if they are cached
+    :return: (dict) tool -> its path and version, see probe_tool
+    """
+    global _resolved
+
+    cache_key = tools_cache_key()
+    tools = None
+    if not refresh:
+        if _resolved is not None and _resolved[0] == cache_key:
+            tools = _resolved[1]
+        else:
+            tools = load_cached_tools(cache_key)
+
+    if tools is None or (with_versions and any(found["version"] is None for found in tools.values())):
+        tools = probe_tools(with_versions=with_versions)
+        write_cache_file(TOOLS_CACHE_FILE_NAME, json.dumps({"key": cache_key, "tools": tools}))
+
+    _resolved = (cache_key, tools)
+
+    return tools
+
+
+def which(command: str) -> str | None:
+    """
+    shutil.which, resolved from the tools cache for the known tools
+    :param command: (str) the command
+    :return: (str) the path of the command or None if it is not installed
+    """
+    if command not in KNOWN_TOOLS:
+        return shutil.which(command)
+
+    return resolve_tools()[command]["path"]
+
+
+def doctor(refresh: bool = False) -> None:
+    """
+    Show the tools newproject found and their versions
+    """
+    from rich.table import Table
+
+    tools = resolve_tools(with_versions=True, refresh=refresh)
+
+    table = Table(box=None, header_style="dodger_blue1")
+    table.add_column("tool")
+    table.add_column("path")
+    table.add_column("version")
+    for tool, found in tools.items():
+        if found["path"] is None:
+            table.add_row(tool, "[red3]not found[/red3]", "")
+        else:
+            table.add_row(f"[green]{tool}[/green]", found["path"], found["version"])
+
+    console.print(table)
+    console.print(f"\nCached in [underline]{os.path.join(get_cache_path(), TOOLS_CACHE_FILE_NAME)}[/underline], "
+                  "probed again when $PATH or one of its folders changes (or with --refresh).")
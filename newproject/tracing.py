@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import contextlib
+import os
+import threading
+import time
+
+from typing import Final
+
+TRACE_OPTION: Final[str] = "--trace"
+
+# The events of the current trace, None when tracing is off
+_events = None
+_start_ns = 0
+
+
+class Span:
+    """
+    A timed phase, recorded as a Chrome trace "complete" event when it ends.
+    Spans of the same thread nest in the trace viewer
+    """
+    __slots__ = ("name", "args", "start_ns")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+        self.start_ns = 0
+
+    def set(self, **args) -> None:
+        """
+        Adds arguments to the span, e.g. the exit code of its command
+        """
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start_ns = time.monotonic_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        end_ns = time.monotonic_ns()
+        if exc_type is SystemExit:
+            self.args["exit_code"] = exc_value.code
+        elif exc_type is not None:
+            self.args["error"] = repr(exc_value)
+        if _events is not None:
+            _events.append({
+                "name": self.name,
+                "ph": "X",
+                "ts": (self.start_ns - _start_ns) / 1000,
+                "dur": (end_ns - self.start_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": self.args,
+            })
+
+
+class NullSpan:
+    """
+    The span used when tracing is off: it does nothing
+    """
+    __slots__ = ()
+
+    def set(self, **args) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+NULL_SPAN: Final[NullSpan] = NullSpan()
+
+
+def span(name: str, **args) -> Span | NullSpan:
+    """
+    Times a phase: `with span("git init", command=...) as git_span: ...`
+    :param name: (str) the name of the phase
+    :param args: the arguments shown with the span in the trace viewer
+    :return: the span, a shared no-op span when tracing is off
+    """
+    if _events is None:
+        return NULL_SPAN
+
+    return Span(name, args)
+
+
+def is_tracing() -> bool:
+    return _events is not None
+
+
+def get_trace_file(args: list) -> str:
+    """
+    Finds the --trace option in the command line arguments, before they are parsed:
+    the config is loaded, and traced, before typer runs
+    :param args: (list) the command line arguments
+    :return: (str) the trace file or "" if there is none
+    """
+    for index, arg in enumerate(args):
+        if arg == "--":
+            break
+        if arg == TRACE_OPTION and index + 1 < len(args):
+            return args[index + 1]
+        if arg.startswith(f"{TRACE_OPTION}="):
+            return arg[len(TRACE_OPTION) + 1:]
+
+    return ""
+
+
+def write_trace(trace_file: str, events: list) -> None:
+    """
+    Writes a trace as Chrome trace-event JSON (chrome://tracing, Perfetto)
+    :param trace_file: (str) the trace file
+    :param events: (list) the events of the trace
+    """
+    import json
+
+    with open(trace_file, "w") as trace_f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_f)
+
+
+@contextlib.contextmanager
+def tracing(trace_file: str):
+    """
+    Records the spans of the block, then writes them to the trace file.
+    Does nothing if trace_file is empty or if a trace is already being recorded
+    :param trace_file: (str) the trace file
+    """
+    global _events, _start_ns
+
+    if not trace_file or _events is not None:
+        yield
+        return
+
+    _events, _start_ns = [], time.monotonic_ns()
+    try:
+        yield
+    finally:
+        events, _events = _events, None
+        try:
+            write_trace(trace_file, events)
+        except OSError as trace_error:
+            from newproject.error_codes import CREATE_OR_WRITE_ERROR
+            from newproject.error_logger import log_error
+
+            log_error(error_code=CREATE_OR_WRITE_ERROR, create_or_write_error=trace_error, not_writable_file=trace_file)
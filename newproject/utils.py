@@ -1,13 +1,119 @@
 #!/usr/bin/env python3
 
+import contextlib
+import contextvars
+import functools
+import io
 import os
 import site
 import sys
 
 from pathlib import Path
+from typing import Final, Iterator
 
+# Per-directory config, read from the folder newproject runs in
+DIRECTORY_CONFIG_FILE_NAME: Final[str] = ".newproject.yaml"
 
+
+class NullFile:
+    """
+    A file that discards what is written to it
+    """
+
+    @staticmethod
+    def write(text: str) -> int:
+        return len(text)
+
+    @staticmethod
+    def flush() -> None:
+        pass
+
+
+class QuietConsole:
+    """
+    Stands in for the rich Console when nothing is printed (--quiet, --output json): rich is not even imported
+    """
+    file = NullFile()
+    is_terminal = False
+
+    def print(self, *objects, **kwargs) -> None:
+        pass
+
+    def status(self, *args, **kwargs):
+        return contextlib.nullcontext()
+
+
+class LazyConsole:
+    """
+    Proxy of a rich Console: rich is imported and the Console is created only when it is first used.
+    A thread or a task can send its output to a buffer of its own with capture_output.
+    """
+
+    def __init__(self):
+        self._console = None
+        self._capture_console = contextvars.ContextVar("capture_console", default=None)
+        self._quiet_console = QuietConsole()
+        # Set while nothing must be printed, see report.reporting
+        self.quiet = False
+
+    def get_console(self):
+        if self.quiet:
+            return self._quiet_console
+
+        capture_console = self._capture_console.get()
+        if capture_console is not None:
+            return capture_console
+
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console()
+        return self._console
+
+    def is_capturing_output(self) -> bool:
+        return self.quiet or self._capture_console.get() is not None
+
+    @contextlib.contextmanager
+    def capture_output(self, buffer: io.StringIO = None) -> Iterator[io.StringIO]:
+        """
+        Sends what the current thread or task prints to a buffer, which keeps the styles of the console
+        :param buffer: (io.StringIO) the buffer, a new one if None
+        :return: the buffer
+        """
+        if buffer is None:
+            buffer = io.StringIO()
+        if self.quiet:
+            yield buffer
+            return
+
+        from rich.console import Console
+
+        main_console = self.get_console()
+        token = self._capture_console.set(Console(
+            file=buffer,
+            force_terminal=main_console.is_terminal,
+            color_system=main_console.color_system,
+            width=main_console.width,
+        ))
+        try:
+            yield buffer
+        finally:
+            self._capture_console.reset(token)
+
+    def __getattr__(self, name: str):
+        return getattr(self.get_console(), name)
+
+
+# rich config
+console = LazyConsole()
+
+
+@functools.cache
 def get_config_path() -> str:
+    """
+    Gets the folder of the package's default config and JSON Schema, once per process
+    :return: (str) the folder path
+    """
     # Gets the site-packages path
     site_packages = ""
     if sys.platform.startswith("darwin"):
@@ -19,20 +125,58 @@ def get_config_path() -> str:
         site_packages = site.getsitepackages()[1]
 
     newproject_cli_config_files_path = os.path.join(site_packages, "newproject/config")
+    if not os.path.isdir(newproject_cli_config_files_path):
+        # Not installed in the site-packages, e.g. run from a checkout
+        newproject_cli_config_files_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config")
 
     return newproject_cli_config_files_path
 
 
+def get_default_config_file() -> str:
+    return f"{get_config_path()}/newproject_config.yaml"
+
+
+def get_config_layer_candidates(home: str, cwd: str) -> tuple:
+    """
+    :return: (tuple) the config files that can override the defaults, whether they exist or not:
+    the user's config file, then the per-directory one
+    """
+    return f"{home}/.config/newproject/newproject_config.yaml", os.path.join(cwd, DIRECTORY_CONFIG_FILE_NAME)
+
+
+@functools.cache
+def find_config_layers(home: str, cwd: str) -> tuple:
+    """
+    Finds the config files, memoized: the candidates are only looked for once per process
+    :return: (tuple) the existing config files, in increasing order of precedence
+    """
+    candidates = get_config_layer_candidates(home=home, cwd=cwd)
+
+    return get_default_config_file(), *(layer for layer in candidates if os.path.isfile(layer))
+
+
+def get_config_layers() -> tuple:
+    """
+    Gets the config files that apply here: the package defaults, then the user's config file
+    (~/.config/newproject/newproject_config.yaml), then .newproject.yaml in the current folder.
+    Each file only overrides the keys it sets
+    :return: (tuple) the config files, in increasing order of precedence
+    """
+    return find_config_layers(home=str(Path.home()), cwd=os.getcwd())
+
+
 def select_config_file() -> str:
     """
-    Checks the presence of the configuration file in .config and if it exists it returns its path,
-    otherwise it returns the path of the one located in site_packages.
-    :return: (str) the config file path
+    :return: (str) the config file with the highest precedence, see get_config_layers
+    """
+    return get_config_layers()[-1]
+
+
+def get_cache_path() -> str:
+    """
+    Gets the newproject cache folder, honoring $XDG_CACHE_HOME if it is set
+    :return: (str) the cache folder path
     """
-    dot_config_yaml_file = f"{Path.home()}/.config/newproject/newproject_config.yaml"
-    site_packages_config_file = f"{get_config_path()}/newproject_config.yaml"
+    cache_home = os.environ.get("XDG_CACHE_HOME") or f"{Path.home()}/.cache"
 
-    if os.path.exists(dot_config_yaml_file):
-        return dot_config_yaml_file
-    else:
-        return site_packages_config_file
+    return os.path.join(cache_home, "newproject")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from typing import Final
+
+from newproject.tracing import span
+from newproject.utils import get_cache_path
+
+VENVS_DIR_NAME: Final[str] = "venvs"
+# Part of the key of the golden venvs: version 1 was hardlinked into the projects, which could modify it
+GOLDEN_VENV_VERSION: Final[int] = 2
+ORIGIN_FILE_NAME: Final[str] = "origin.json"
+
+# Files of a venv that contain its own path
+RELOCATED_DIRS: Final[tuple] = ("bin",)
+RELOCATED_FILES: Final[tuple] = ("pyvenv.cfg",)
+
+# Longest shebang the kernel accepts: pip writes /bin/sh wrappers above it, cloned scripts can't
+MAX_SHEBANG_LENGTH: Final[int] = 127
+
+# ioctl that clones a file on copy-on-write filesystems (btrfs, xfs...)
+FICLONE: Final[int] = 0x40049409
+
+
+def get_base_interpreter(python_command: str = "python3") -> dict:
+    """
+    Identifies the interpreter that `python3 -m venv` would use
+    :param python_command: (str) the python command
+    :return: (dict) its real path, version, and the mtime and size of its executable
+    """
+    command = [python_command, "-c", "import os, sys; print(os.path.realpath(sys.executable)); print(sys.version)"]
+    with span("get_base_interpreter", command=command) as interpreter_span:
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        interpreter_span.set(exit_code=result.returncode)
+    executable, version = result.stdout.split("\n", 1)
+    executable_stat = os.stat(executable)
+
+    return {
+        "executable": executable,
+        "version": version.strip(),
+        "mtime_ns": executable_stat.st_mtime_ns,
+        "size": executable_stat.st_size,
+    }
+
+
+def build_golden_venv(golden_dir: str, python_command: str = "python3") -> None:
+    """
+    Builds a golden venv the normal way, in a scratch folder renamed once it is complete
+    :param golden_dir: (str) the folder of the golden venv
+    :param python_command: (str) the python command
+    """
+    build_dir = f"{golden_dir}.build-{os.getpid()}"
+    venv_dir = os.path.join(build_dir, "venv")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    try:
+        command = [python_command, "-m", "venv", venv_dir]
+        with span("build_golden_venv", command=command) as build_span:
+            result = subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            build_span.set(exit_code=result.returncode)
+        with open(os.path.join(build_dir, ORIGIN_FILE_NAME), "w") as origin_file:
+            json.dump({"path": venv_dir}, origin_file)
+
+        try:
+            os.rename(build_dir, golden_dir)
+        except OSError:
+            # Another newproject built it first
+            if not os.path.isdir(golden_dir):
+                raise
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def get_golden_venv(python_command: str = "python3") -> tuple[str, str]:
+    """
+    Gets the golden venv of the base interpreter, building it on first use.
+    It is rebuilt when the base interpreter changes
+    :param python_command: (str) the python command
+    :return: the path of the golden venv and the path it was built at
+    """
+    base_interpreter = get_base_interpreter(python_command=python_command)
+    key = hashlib.sha256(
+        json.dumps({**base_interpreter, "version": GOLDEN_VENV_VERSION}, sort_keys=True).encode()
+    ).hexdigest()[:16]
+    golden_dir = os.path.join(get_cache_path(), VENVS_DIR_NAME, key)
+
+    if not os.path.isdir(golden_dir):
+        os.makedirs(os.path.dirname(golden_dir), exist_ok=True)
+        build_golden_venv(golden_dir=golden_dir, python_command=python_command)
+
+    with open(os.path.join(golden_dir, ORIGIN_FILE_NAME)) as origin_file:
+        origin = json.load(origin_file)["path"]
+
+    return os.path.join(golden_dir, "venv"), origin
+
+
+def clone_file(src: str, dst: str, use_reflink: bool) -> bool:
+    """
+    Clones a file: reflink if the filesystem supports it, otherwise copy. Never a hardlink: an edit of the venv,
+    e.g. pip install --upgrade, would change the golden venv and every later clone
+    :return: (bool) whether reflinks should still be tried
+    """
+    if use_reflink:
+        import fcntl
+
+        try:
+            with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            shutil.copystat(src, dst)
+            return True
+        except OSError:
+            os.unlink(dst)
+    shutil.copy2(src, dst)
+
+    return False
+
+
+def clone_venv(golden_venv: str, origin: str, venv_dir: str) -> None:
+    """
+    Clones a golden venv: the files containing the venv's path are rewritten for the new location,
+    the others are reflinked or copied. Bytecode caches are left out, python rebuilds them
+    :param golden_venv: (str) the golden venv
+    :param origin: (str) the path the golden venv was built at
+    :param venv_dir: (str) the new venv
+    :raises ValueError: if the new venv can't be a clone
+    """
+    venv_dir = os.path.abspath(venv_dir)
+    if " " in venv_dir or len(f"#!{venv_dir}/bin/python3") > MAX_SHEBANG_LENGTH:
+        raise ValueError(f"{venv_dir}: the venv scripts need /bin/sh wrappers")
+
+    old_path, new_path = origin.encode(), venv_dir.encode()
+    use_reflink = sys.platform.startswith("linux")
+
+    for root, dir_names, file_names in os.walk(golden_venv):
+        dir_names[:] = [dir_name for dir_name in dir_names if dir_name != "__pycache__"]
+        relative_root = os.path.relpath(root, golden_venv)
+        target_root = os.path.normpath(os.path.join(venv_dir, relative_root))
+        os.makedirs(target_root, exist_ok=True)
+
+        for name in dir_names + file_names:
+            src = os.path.join(root, name)
+            dst = os.path.join(target_root, name)
+            if os.path.islink(src):
+                os.symlink(os.readlink(src), dst)
+                if name in dir_names:
+                    # Symlinked folders (e.g. lib64 -> lib) are not walked into
+                    dir_names.remove(name)
+            elif name in file_names:
+                if relative_root in RELOCATED_DIRS or (relative_root == "." and name in RELOCATED_FILES):
+                    with open(src, "rb") as src_file:
+                        content = src_file.read()
+                    if old_path in content:
+                        with open(dst, "wb") as dst_file:
+                            dst_file.write(content.replace(old_path, new_path))
+                        shutil.copymode(src, dst)
+                        continue
+                use_reflink = clone_file(src, dst, use_reflink=use_reflink)
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+
+import csv
+import glob
+import hashlib
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+
+from typing import Final, NamedTuple
+
+from newproject.tracing import span
+from newproject.utils import get_cache_path
+from newproject.venv_template import clone_file
+
+# The unpacked wheels, shared by the venvs
+WHEELS_DIR_NAME: Final[str] = "wheels"
+UNPACKED_VERSION: Final[int] = 1
+# Folders of an unpacked wheel: where its files go in a venv
+SITE_PACKAGES_DIR: Final[str] = "site-packages"
+SCRIPTS_DIR: Final[str] = "scripts"
+DATA_DIR: Final[str] = "data"
+ENTRY_POINTS_FILE_NAME: Final[str] = "entry_points.json"
+
+INSTALLER: Final[str] = "newproject"
+
+# The wrapper of a console script, the same as pip's
+CONSOLE_SCRIPT: Final[str] = """#!{python}
+# -*- coding: utf-8 -*-
+import re
+import sys
+from {module} import {import_name}
+if __name__ == "__main__":
+    sys.argv[0] = re.sub(r"(-script\\.pyw|\\.exe)?$", "", sys.argv[0])
+    sys.exit({function}())
+"""
+
+
+class WheelhouseError(Exception):
+    pass
+
+
+class Wheel(NamedTuple):
+    path: str
+    # The normalized distribution name, see normalize_name
+    name: str
+    version: str
+    python_tags: tuple
+    abi_tags: tuple
+    platform_tags: tuple
+
+
+def normalize_name(name: str) -> str:
+    """
+    :return: (str) the distribution name normalized like PEP 503: pip, Pip and p_i_p are the same
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def parse_wheel(path: str) -> Wheel | None:
+    """
+    :return: (Wheel) the wheel named by a file name, {name}-{version}(-{build})?-{python}-{abi}-{platform}.whl,
+    None if it is not a wheel
+    """
+    parts = os.path.basename(path)[:-len(".whl")].split("-") if path.endswith(".whl") else []
+    if len(parts) not in (5, 6):
+        return None
+
+    return Wheel(path, normalize_name(parts[0]), parts[1], *(tuple(tags.split(".")) for tags in parts[-3:]))
+
+
+def version_key(version: str) -> tuple:
+    """
+    :return: (tuple) a sort key of a version: the numbers of its release compared as numbers, the pre-releases first
+    """
+    release = re.match(r"\d+(?:\.\d+)*", version)
+    numbers = tuple(int(number) for number in release.group().split(".")) if release else ()
+
+    return numbers, release is not None and release.end() == len(version), version
+
+
+def platform_matches(platform_tag: str) -> bool:
+    """
+    :return: (bool) whether a platform tag is one of this machine's: the venvs are created with its python
+    """
+    if platform_tag == "any":
+        return True
+
+    machine = platform.machine().lower()
+    machine = {"amd64": "x86_64", "arm64": "aarch64" if sys.platform.startswith("linux") else "arm64"}.get(machine, machine)
+    if sys.platform.startswith("linux"):
+        return re.fullmatch(rf"(many|musl)?linux(1|2010|2014|_\d+_\d+)?_{machine}", platform_tag) is not None
+    if sys.platform == "darwin":
+        return re.fullmatch(rf"macosx_\d+_\d+_({machine}|universal2)", platform_tag) is not None
+    if sys.platform == "win32":
+        return platform_tag == {"x86_64": "win_amd64", "aarch64": "win_arm64"}.get(machine, "win32")
+
+    return False
+
+
+def is_compatible(wheel: Wheel, python_version: tuple) -> bool:
+    """
+    :param wheel: (Wheel) the wheel
+    :param python_version: (tuple) the major and minor versions of the venv's python
+    :return: (bool) whether the wheel can be installed in the venv: pure python wheels, and the CPython wheels
+    built for its version or for the stable ABI
+    """
+    major, minor = python_version
+    python_tags = {f"py{major}", f"py{major}{minor}", f"cp{major}{minor}"}
+    if not python_tags & set(wheel.python_tags) and not (
+            "abi3" in wheel.abi_tags and any(re.fullmatch(rf"cp{major}(\d+)", tag) and int(tag[3:]) <= minor
+                                             for tag in wheel.python_tags)
+    ):
+        return False
+    if not {"none", "abi3", f"cp{major}{minor}"} & set(wheel.abi_tags):
+        return False
+
+    return any(platform_matches(platform_tag) for platform_tag in wheel.platform_tags)
+
+
+def find_wheels(wheelhouse: str, requirements: list, python_version: tuple) -> list:
+    """
+    Picks the wheel of every requirement: the pinned version (name==version) or the latest one. The requirements
+    are not resolved: list their dependencies too, e.g. from `pip freeze`
+    :param wheelhouse: (str) the folder of the wheels, e.g. made by `pip wheel -w`
+    :param requirements: (list) the distribution names, possibly pinned
+    :param python_version: (tuple) the major and minor versions of the venv's python
+    :return: (list) the Wheel of every requirement
+    :raises WheelhouseError: if a requirement has no compatible wheel in the wheelhouse
+    """
+    try:
+        wheels = [wheel for wheel in map(parse_wheel, os.listdir(wheelhouse)) if wheel is not None]
+    except OSError as listdir_error:
+        raise WheelhouseError(f"can't read the wheelhouse {wheelhouse}: {listdir_error}") from listdir_error
+
+    found = []
+    for requirement in requirements:
+        if not isinstance(requirement, str) or not re.fullmatch(r"[\w.-]+(==[\w.!+-]+)?", requirement.strip()):
+            raise WheelhouseError(f"{requirement!r}: only names and name==version pins are supported")
+        name, _, pinned = requirement.strip().partition("==")
+        candidates = [
+            wheel for wheel in wheels
+            if wheel.name == normalize_name(name) and (not pinned or wheel.version == pinned)
+            and is_compatible(wheel, python_version)
+        ]
+        if not candidates:
+            raise WheelhouseError(f"{requirement}: no wheel for python {'.'.join(map(str, python_version))} "
+                                  f"in {wheelhouse}")
+        latest = max(candidates, key=lambda wheel: version_key(wheel.version))
+        found.append(latest._replace(path=os.path.join(wheelhouse, latest.path)))
+
+    return found
+
+
+def read_entry_points(entry_points_content: str) -> dict:
+    """
+    :return: (dict) script name -> "module:function" of the console_scripts of a wheel's entry_points.txt
+    """
+    import configparser
+
+    parser = configparser.ConfigParser(delimiters=("=",), interpolation=None)
+    parser.optionxform = str
+    parser.read_string(entry_points_content)
+
+    return dict(parser["console_scripts"]) if parser.has_section("console_scripts") else {}
+
+
+def unpacked_path(member_name: str) -> str | None:
+    """
+    :param member_name: (str) the name of a file of a wheel
+    :return: (str) where the file goes in the unpacked wheel, or None if it is not installed
+    """
+    parts = member_name.split("/")
+    if ".." in parts or member_name.startswith("/"):
+        return None
+    if not parts[0].endswith(".data") or len(parts) <= 2:
+        return os.path.join(SITE_PACKAGES_DIR, *parts)
+
+    # name.data/purelib/..., name.data/scripts/...: the headers are not installed
+    target_dir = {"purelib": SITE_PACKAGES_DIR, "platlib": SITE_PACKAGES_DIR,
+                  "scripts": SCRIPTS_DIR, "data": DATA_DIR}.get(parts[1])
+    return os.path.join(target_dir, *parts[2:]) if target_dir else None
+
+
+def unpack_wheel(wheel: Wheel) -> str:
+    """
+    Unpacks a wheel once, sorted by where its files go in a venv. It is unpacked again when the wheel file changes
+    :param wheel: (Wheel) the wheel
+    :return: (str) the folder of the unpacked wheel
+    :raises WheelhouseError: if the wheel can't be read
+    """
+    import zipfile
+
+    wheel_stat = os.stat(wheel.path)
+    key = hashlib.sha256(json.dumps(
+        [UNPACKED_VERSION, os.path.basename(wheel.path), wheel_stat.st_size, wheel_stat.st_mtime_ns]
+    ).encode()).hexdigest()[:16]
+    unpacked_dir = os.path.join(get_cache_path(), WHEELS_DIR_NAME, key)
+    if os.path.isdir(unpacked_dir):
+        return unpacked_dir
+
+    # Unpacked in a scratch folder renamed once it is complete, like the golden venvs
+    build_dir = f"{unpacked_dir}.build-{os.getpid()}"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    try:
+        with span("unpack_wheel", wheel=os.path.basename(wheel.path)), zipfile.ZipFile(wheel.path) as wheel_zip:
+            entry_points = {}
+            for member in wheel_zip.infolist():
+                parts = member.filename.split("/")
+                relative_target = None if member.is_dir() else unpacked_path(member.filename)
+                if relative_target is None:
+                    continue
+                target = os.path.join(build_dir, relative_target)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with wheel_zip.open(member) as member_file, open(target, "wb") as target_file:
+                    shutil.copyfileobj(member_file, target_file)
+                # The permissions are kept, e.g. the executable bit of the scripts and of the shared libraries
+                os.chmod(target, (member.external_attr >> 16) & 0o777 or 0o644)
+                if parts[0].endswith(".dist-info") and parts[-1] == "entry_points.txt":
+                    entry_points = read_entry_points(wheel_zip.read(member).decode())
+
+        with open(os.path.join(build_dir, ENTRY_POINTS_FILE_NAME), "w") as entry_points_file:
+            json.dump(entry_points, entry_points_file)
+
+        os.makedirs(os.path.dirname(unpacked_dir), exist_ok=True)
+        try:
+            os.rename(build_dir, unpacked_dir)
+        except OSError:
+            # Another newproject unpacked it first
+            if not os.path.isdir(unpacked_dir):
+                raise
+    except (OSError, zipfile.BadZipFile, UnicodeDecodeError, ValueError) as unpack_error:
+        raise WheelhouseError(f"can't unpack {wheel.path}: {unpack_error}") from unpack_error
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    return unpacked_dir
+
+
+def venv_layout(venv_dir: str) -> tuple:
+    """
+    :return: (tuple) the major and minor versions of the venv's python, its site-packages and its scripts folder
+    :raises WheelhouseError: if the folder is not a venv
+    """
+    try:
+        with open(os.path.join(venv_dir, "pyvenv.cfg")) as pyvenv_cfg:
+            config = dict(line.partition("=")[::2] for line in pyvenv_cfg.read().splitlines())
+    except OSError as cfg_error:
+        raise WheelhouseError(f"{venv_dir} is not a venv: {cfg_error}") from cfg_error
+    config = {key.strip(): value.strip() for key, value in config.items()}
+    # version: venv, version_info: virtualenv
+    version = re.match(r"(\d+)\.(\d+)", config.get("version", "") or config.get("version_info", ""))
+    if version is None:
+        raise WheelhouseError(f"{venv_dir}: the python version is missing from pyvenv.cfg")
+    python_version = (int(version.group(1)), int(version.group(2)))
+
+    if sys.platform == "win32":
+        return python_version, os.path.join(venv_dir, "Lib", "site-packages"), os.path.join(venv_dir, "Scripts")
+    site_packages = glob.glob(os.path.join(venv_dir, "lib", f"python{python_version[0]}.{python_version[1]}*",
+                                           "site-packages"))
+    if not site_packages:
+        raise WheelhouseError(f"{venv_dir}: site-packages not found")
+
+    return python_version, site_packages[0], os.path.join(venv_dir, "bin")
+
+
+def remove_distribution(site_packages: str, name: str) -> None:
+    """
+    Uninstalls a distribution from a venv, e.g. the pip the venv was created with, like pip does: the files listed
+    in the RECORD of its .dist-info folder, then the folder
+    :param site_packages: (str) the site-packages of the venv
+    :param name: (str) the normalized distribution name
+    """
+    for dist_info in glob.glob(os.path.join(site_packages, "*.dist-info")):
+        if normalize_name(os.path.basename(dist_info)[:-len(".dist-info")].rsplit("-", 1)[0]) != name:
+            continue
+        try:
+            with open(os.path.join(dist_info, "RECORD"), newline="") as record_file:
+                recorded = [row[0] for row in csv.reader(record_file) if row]
+        except OSError:
+            recorded = []
+        for recorded_path in recorded:
+            path = os.path.normpath(os.path.join(site_packages, recorded_path))
+            if os.path.isfile(path) or os.path.islink(path):
+                os.unlink(path)
+        shutil.rmtree(dist_info, ignore_errors=True)
+
+
+def link_tree(source_dir: str, target_dir: str, use_reflink: bool, skipped: tuple = ()) -> tuple[list, bool]:
+    """
+    Reflinks or hardlinks the files of a folder of an unpacked wheel into a venv, see venv_template.clone_file
+    :param source_dir: (str) the folder of the unpacked wheel
+    :param target_dir: (str) the folder of the venv
+    :param use_reflink: (bool) False if reflinks already failed
+    :param skipped: (tuple) the paths, relative to source_dir, of the files that are not linked
+    :return: (tuple) the linked files and whether to keep trying reflinks
+    """
+    linked = []
+    for root, _, file_names in os.walk(source_dir):
+        relative_root = os.path.relpath(root, source_dir)
+        os.makedirs(os.path.normpath(os.path.join(target_dir, relative_root)), exist_ok=True)
+        for file_name in file_names:
+            relative_path = os.path.normpath(os.path.join(relative_root, file_name))
+            if relative_path in skipped:
+                continue
+            target = os.path.join(target_dir, relative_path)
+            if os.path.lexists(target):
+                # Never written through: the file may be a hardlink, e.g. to the golden venv
+                os.unlink(target)
+            use_reflink = clone_file(os.path.join(root, file_name), target, use_reflink=use_reflink)
+            linked.append(target)
+
+    return linked, use_reflink
+
+
+def write_script(target: str, content: bytes) -> None:
+    if os.path.lexists(target):
+        os.unlink(target)
+    with open(target, "wb") as script_file:
+        script_file.write(content)
+    os.chmod(target, 0o755)
+
+
+def write_record(site_packages: str, dist_info: str, installed: list) -> None:
+    """
+    Writes the INSTALLER and RECORD files of an installed wheel: pip uninstalls the files listed in RECORD
+    """
+    installer_file = os.path.join(site_packages, dist_info, "INSTALLER")
+    with open(installer_file, "w") as installer:
+        installer.write(f"{INSTALLER}\n")
+    record_file = os.path.join(site_packages, dist_info, "RECORD")
+    record = io.StringIO()
+    writer = csv.writer(record, lineterminator="\n")
+    for installed_file in [*installed, installer_file]:
+        writer.writerow([os.path.relpath(installed_file, site_packages).replace(os.sep, "/"), "", ""])
+    writer.writerow([os.path.relpath(record_file, site_packages).replace(os.sep, "/"), "", ""])
+    with open(record_file, "w") as record_f:
+        record_f.write(record.getvalue())
+
+
+def link_wheel(unpacked_dir: str, site_packages: str, scripts_dir: str, venv_dir: str) -> None:
+    """
+    Installs an unpacked wheel in a venv. The files are reflinked or hardlinked from the unpacked wheel
+    (see venv_template.clone_file); the scripts, which contain the path of the venv's python, and RECORD,
+    which lists them, are written
+    """
+    python = os.path.join(scripts_dir, "python.exe" if sys.platform == "win32" else "python")
+
+    unpacked_site = os.path.join(unpacked_dir, SITE_PACKAGES_DIR)
+    top_level = os.listdir(unpacked_site) if os.path.isdir(unpacked_site) else []
+    dist_info = next((name for name in sorted(top_level) if name.endswith(".dist-info")), "")
+    if not dist_info:
+        raise WheelhouseError(f"{unpacked_dir}: the wheel has no .dist-info folder")
+    installed, use_reflink = link_tree(
+        unpacked_site, site_packages, use_reflink=sys.platform.startswith("linux"),
+        skipped=(os.path.join(dist_info, "RECORD"), os.path.join(dist_info, "INSTALLER")),
+    )
+    linked_data, _ = link_tree(os.path.join(unpacked_dir, DATA_DIR), venv_dir, use_reflink=use_reflink)
+    installed.extend(linked_data)
+
+    os.makedirs(scripts_dir, exist_ok=True)
+    unpacked_scripts = os.path.join(unpacked_dir, SCRIPTS_DIR)
+    script_names = os.listdir(unpacked_scripts) if os.path.isdir(unpacked_scripts) else []
+    for script_name in script_names:
+        with open(os.path.join(unpacked_scripts, script_name), "rb") as script_file:
+            content = script_file.read()
+        # PEP 427: #!python is the python of the venv
+        write_script(os.path.join(scripts_dir, script_name), re.sub(rb"\A#!pythonw?", f"#!{python}".encode(), content))
+        installed.append(os.path.join(scripts_dir, script_name))
+
+    with open(os.path.join(unpacked_dir, ENTRY_POINTS_FILE_NAME)) as entry_points_file:
+        entry_points = json.load(entry_points_file)
+    for script_name, reference in entry_points.items():
+        module, _, function = reference.partition(":")
+        function = function.split("[")[0].strip()
+        write_script(os.path.join(scripts_dir, script_name), CONSOLE_SCRIPT.format(
+            python=python, module=module.strip(), import_name=function.split(".")[0], function=function
+        ).encode())
+        installed.append(os.path.join(scripts_dir, script_name))
+
+    write_record(site_packages=site_packages, dist_info=dist_info, installed=installed)
+
+
+def preinstall(venv_dir: str, requirements: list, wheelhouse: str) -> list:
+    """
+    Installs packages in a new venv from a local wheelhouse, without pip, the network or a resolver:
+    the wheels are unpacked once in the cache, then linked into the venvs
+    :param venv_dir: (str) the venv
+    :param requirements: (list) the distribution names, possibly pinned with ==, dependencies included
+    :param wheelhouse: (str) the folder of the wheels
+    :return: (list) the installed wheels
+    :raises WheelhouseError: if a wheel is missing or can't be installed
+    """
+    python_version, site_packages, scripts_dir = venv_layout(venv_dir)
+    wheels = find_wheels(wheelhouse=os.path.expanduser(wheelhouse), requirements=requirements,
+                         python_version=python_version)
+    for wheel in wheels:
+        unpacked_dir = unpack_wheel(wheel)
+        with span("link_wheel", wheel=os.path.basename(wheel.path)):
+            try:
+                remove_distribution(site_packages=site_packages, name=wheel.name)
+                link_wheel(unpacked_dir=unpacked_dir, site_packages=site_packages, scripts_dir=scripts_dir,
+                           venv_dir=venv_dir)
+            except OSError as link_error:
+                raise WheelhouseError(f"can't install {wheel.path}: {link_error}") from link_error
+
+    return wheels
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import contextlib
+import contextvars
+import os
+import threading
+
+from typing import Final
+
+# none: no fsync, e.g. on tmpfs CI runners
+# batch: one fsync of every written file, then of their folders, once the project is written
+# strict: fsync of every file as soon as it is written, then of their folders
+DURABILITY_POLICIES: Final[tuple] = ("none", "batch", "strict")
+
+# The batch of the creation running in the current thread or task, None outside of a creation
+_batch = contextvars.ContextVar("batch", default=None)
+
+
+class WriteBatch:
+    """
+    The files and folders written by a creation, synced to disk according to the durability policy
+    """
+
+    def __init__(self, durability: str, root: str):
+        """
+        :param durability: (str) one of DURABILITY_POLICIES
+        :param root: (str) the folder that contains the project: the entries of the folders between the written paths
+        and the root, the root included, are synced too
+        """
+        self.durability = durability
+        self.root = os.path.abspath(root)
+        self.files = []
+        self.dirs = set()
+        # The steps of a creation write from several threads
+        self.lock = threading.Lock()
+
+    def add(self, path: str, is_file: bool) -> None:
+        path = os.path.abspath(path)
+        with self.lock:
+            if is_file:
+                self.files.append(path)
+            parent = os.path.dirname(path)
+            while parent not in self.dirs and (parent == self.root or parent.startswith(self.root + os.sep)):
+                self.dirs.add(parent)
+                parent = os.path.dirname(parent)
+
+    def sync(self) -> None:
+        """
+        Syncs the written files (unless they already are, in strict mode), then the folders that contain them
+        """
+        if self.durability == "batch":
+            for file_path in self.files:
+                fsync_path(file_path)
+
+        # Folders can't be opened to be synced on Windows
+        if os.name == "posix":
+            # Children first: a folder is synced once the entries it contains are
+            for dir_path in sorted(self.dirs, key=len, reverse=True):
+                fsync_path(dir_path)
+
+
+def fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def write_batch(durability: str, root: str):
+    """
+    Collects what the block writes with write_file, make_dir and add_written, then syncs it to disk
+    if durability is not none. Nothing is synced if the block fails
+    :param durability: (str) one of DURABILITY_POLICIES
+    :param root: (str) the folder that contains the project
+    :raises OSError: if a file or folder can't be synced
+    """
+    if durability == "none":
+        yield None
+        return
+
+    batch = WriteBatch(durability=durability, root=root)
+    token = _batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _batch.reset(token)
+
+    batch.sync()
+
+
+def write_file(path: str, content: str, **open_args) -> None:
+    """
+    Writes a text file, part of the batch of the current creation
+    :param path: (str) the file
+    :param content: (str) the content of the file
+    :param open_args: the other arguments of open, e.g. encoding and newline
+    """
+    batch = _batch.get()
+    with open(path, "w", **open_args) as file:
+        file.write(content)
+        if batch is not None and batch.durability == "strict":
+            file.flush()
+            os.fsync(file.fileno())
+
+    if batch is not None:
+        batch.add(path, is_file=True)
+
+
+def add_written(path: str) -> None:
+    """
+    Adds a file written by other means (e.g. copied) to the batch of the current creation
+    :param path: (str) the file
+    """
+    batch = _batch.get()
+    if batch is None:
+        return
+
+    if batch.durability == "strict":
+        fsync_path(path)
+    batch.add(path, is_file=True)
+
+
+def make_dir(path: str, parents: bool = False, exist_ok: bool = False) -> None:
+    """
+    Creates a folder, part of the batch of the current creation
+    :param path: (str) the folder
+    :param parents: (bool) creates the missing parents too, like os.makedirs
+    :param exist_ok: (bool) with parents, an existing folder is not an error
+    """
+    if parents:
+        os.makedirs(path, exist_ok=exist_ok)
+    else:
+        os.mkdir(path)
+    batch = _batch.get()
+    if batch is not None:
+        batch.add(path, is_file=False)
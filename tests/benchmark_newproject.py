@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of newproject: every language path of NewProject.handle, with real and stubbed subprocesses,
+and the startup phases (imports, config loading, validation).
+
+    python tests/benchmark_newproject.py --output results.json
+    python tests/benchmark_newproject.py --output new.json --compare results.json
+
+The results are saved as JSON to be compared across commits.
+"""
+
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Annotated, Final
+from unittest.mock import patch
+
+import typer
+
+REPO_DIR: Final[str] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import newproject.cache  # noqa: E402
+from newproject._version import __version__  # noqa: E402
+from newproject.languages import BUILTIN_LANGUAGES  # noqa: E402
+from newproject.newproject import NewProject  # noqa: E402
+from newproject.utils import console, get_config_path, get_default_config_file  # noqa: E402
+
+# Commands needed by the real runs of the command-based languages
+LANGUAGE_COMMANDS: Final[dict] = {
+    language.name: language.command[0] for language in BUILTIN_LANGUAGES.values() if language.command
+}
+
+# Number of projects of the catalog benchmarks
+CATALOG_PROJECTS: Final[int] = 50_000
+DISK_USAGE_TREES: Final[int] = 20
+
+# A result is a regression when its median is slower than the baseline's by more than this ratio
+DEFAULT_REGRESSION_THRESHOLD: Final[float] = 0.2
+
+
+def summarize(timings: list) -> dict:
+    """
+    :param timings: (list) the durations of the runs, in seconds
+    :return: (dict) the statistics of the runs, in milliseconds
+    """
+    return {
+        "runs": len(timings),
+        "min_ms": min(timings) * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "mean_ms": statistics.mean(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+    }
+
+
+def projects_dir_names() -> dict:
+    """
+    :return: (dict) language -> projects folder name, from the default config
+    """
+    import yaml
+
+    with open(get_default_config_file()) as config_file:
+        config = yaml.safe_load(config_file)
+
+    return {language.name: config[language.section]["projects_dir_name"] for language in BUILTIN_LANGUAGES.values()}
+
+
+@contextlib.contextmanager
+def development_dir():
+    """
+    A temporary home with a development folder for every language, and its own cache
+    """
+    with tempfile.TemporaryDirectory() as temp_dir, \
+            patch.dict(os.environ, {"HOME": temp_dir, "XDG_CACHE_HOME": os.path.join(temp_dir, "cache")}):
+        for projects_dir_name in projects_dir_names().values():
+            os.makedirs(os.path.join(temp_dir, "Developer", "projects", projects_dir_name))
+        yield temp_dir
+
+
+@contextlib.contextmanager
+def stubbed_subprocesses():
+    """
+    Subprocesses succeed immediately and every command is installed
+    """
+    def run(command, *args, **kwargs):
+        return subprocess.CompletedProcess(command, 0, stdout="", stderr="")
+
+    with patch("subprocess.run", side_effect=run), \
+            patch("newproject.newproject.which", side_effect=lambda command: f"/usr/bin/{command}"):
+        yield
+
+
+def time_creations(language: str, mode: str, repeat: int) -> dict | None:
+    """
+    Times the creations of a language through NewProject.handle, the config being loaded beforehand
+    :param language: (str) the language, named as its command line option
+    :param mode: (str) "real" or "stubbed" subprocesses, or "dry_run" (planning only)
+    :param repeat: (int) the number of timed creations, after one warmup creation
+    :return: (dict) the statistics of the creations, the exit code of a failed creation,
+    or None if the language can't be created here
+    """
+    if mode != "stubbed" and language in LANGUAGE_COMMANDS and shutil.which(LANGUAGE_COMMANDS[language]) is None:
+        return None
+
+    stubs = stubbed_subprocesses() if mode == "stubbed" else contextlib.nullcontext()
+    timings = []
+    with development_dir(), stubs, patch("sys.stdout", new_callable=io.StringIO):
+        new_project = NewProject()
+        for run in range(repeat + 1):
+            start = time.perf_counter()
+            try:
+                new_project.handle(**{language: f"bench_{run}", "dry_run": mode == "dry_run"})
+            except SystemExit as creation_exit:
+                return {"exit_code": creation_exit.code}
+            if run:
+                timings.append(time.perf_counter() - start)
+
+    return summarize(timings)
+
+
+def time_function(func, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return summarize(timings)
+
+
+def time_python(args: list, repeat: int, env: dict = None) -> dict:
+    """
+    Times a python process, e.g. the cost of importing newproject
+    """
+    return time_function(
+        lambda: subprocess.run([sys.executable, *args], cwd=REPO_DIR, env=env, check=True, capture_output=True),
+        repeat=repeat,
+    )
+
+
+def benchmark_startup(repeat: int) -> dict:
+    """
+    Times the startup phases: interpreter, imports, creations, config loading (cold and cached), YAML parsing and validation
+    """
+    import jsonschema
+    import yaml
+
+    from newproject.schema_validator import compile_validator
+
+    results = {
+        "startup.python": time_python(["-c", "pass"], repeat=repeat),
+        "startup.import_newproject": time_python(["-c", "import newproject.newproject"], repeat=repeat),
+        "startup.version": time_python(["-m", "newproject.newproject", "--version"], repeat=repeat),
+    }
+
+    with development_dir() as temp_dir, patch("sys.stdout", new_callable=io.StringIO):
+        cache_dir = os.path.join(temp_dir, "cache")
+        project_names = (f"startup_{index}" for index in itertools.count())
+
+        def create(drop_cache_file: bool):
+            if drop_cache_file:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            subprocess.run(
+                [sys.executable, "-m", "newproject.newproject", "--bash", next(project_names)],
+                cwd=REPO_DIR, check=True, capture_output=True
+            )
+
+        # A whole creation process, with the config loaded from the YAML file or from the cache
+        results["startup.creation_cold"] = time_function(lambda: create(drop_cache_file=True), repeat=repeat)
+        results["startup.creation_warm"] = time_function(lambda: create(drop_cache_file=False), repeat=repeat)
+
+        def load(drop_cache_file: bool) -> NewProject:
+            # The config resolved by the previous loads of this process is dropped too
+            newproject.cache._resolved_config = None
+            if drop_cache_file:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            return NewProject()
+
+        results["config.load_cold"] = time_function(lambda: load(drop_cache_file=True), repeat=repeat)
+        results["config.load_cached"] = time_function(lambda: load(drop_cache_file=False), repeat=repeat)
+        results["config.load_resolved"] = time_function(NewProject, repeat=repeat)
+
+    with open(get_default_config_file()) as config_file:
+        config_content = config_file.read()
+    with open(f"{get_config_path()}/schema/json_schema.json") as json_schema_file:
+        json_schema = json.load(json_schema_file)
+    config = yaml.safe_load(config_content)
+    validate = compile_validator(json_schema)
+
+    results["config.yaml_parse"] = time_function(lambda: yaml.safe_load(config_content), repeat=repeat)
+    results["config.validate_compiled"] = time_function(lambda: validate(config), repeat=repeat)
+    results["config.validate_jsonschema"] = time_function(lambda: jsonschema.validate(config, json_schema), repeat=repeat)
+
+    return results
+
+
+def synthetic_catalog(projects_count: int):
+    """
+    A catalog of made up project names: two or three words, sometimes a number
+    """
+    import random
+
+    from newproject.catalog import Catalog
+
+    rng = random.Random(0)
+    words = sorted({word for module in sys.stdlib_module_names for word in module.strip("_").split("_") if word})
+    words += ["api", "app", "core", "data", "web", "tool", "cli", "lib", "demo", "server", "client", "bot", "parser"]
+    catalog = Catalog()
+    for _ in range(projects_count):
+        name = rng.choice("_-").join(rng.choice(words) for _ in range(rng.randint(2, 3)))
+        if rng.random() < 0.3:
+            name += str(rng.randint(1, 99))
+        catalog.add({"name": name, "language": "python", "path": name, "created": 0.0, "git": True, "venv": True,
+                     "mtime_ns": 0})
+
+    return catalog
+
+
+def benchmark_catalog(repeat: int) -> dict:
+    from newproject.catalog import load_catalog, store_catalog
+
+    catalog = synthetic_catalog(CATALOG_PROJECTS)
+    # Misspelled, partial and exact names
+    queries = ["jsonparser", "server-api", "asynco_web", "parser", catalog.projects[CATALOG_PROJECTS // 2]["name"]]
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            catalog.search(query)
+            timings.append(time.perf_counter() - start)
+    results = {f"catalog.search_{CATALOG_PROJECTS // 1000}k": summarize(timings)}
+
+    with tempfile.TemporaryDirectory() as temp_dir, patch.dict(os.environ, {"XDG_CACHE_HOME": temp_dir}):
+        store_catalog(catalog)
+        results[f"catalog.load_{CATALOG_PROJECTS // 1000}k"] = time_function(load_catalog, repeat=repeat)
+        # What newproject search does once the catalog is up to date
+        results[f"catalog.load_and_search_{CATALOG_PROJECTS // 1000}k"] = time_function(
+            lambda: load_catalog().search(queries[1]), repeat=repeat
+        )
+
+    return results
+
+
+def benchmark_disk_usage(repeat: int) -> dict:
+    """
+    Measures venv-like trees: many small files in nested packages
+    """
+    from newproject.disk_usage import measure_dirs
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        trees = []
+        for tree in range(DISK_USAGE_TREES):
+            tree_dir = os.path.join(temp_dir, f"venv_{tree}")
+            for package in range(50):
+                package_dir = os.path.join(tree_dir, "lib", f"package_{package}", "sub")
+                os.makedirs(package_dir)
+                for module in range(20):
+                    with open(os.path.join(package_dir, f"module_{module}.py"), "w") as module_file:
+                        module_file.write("pass\n" * module)
+            trees.append(tree_dir)
+
+        files = DISK_USAGE_TREES * 50 * 20
+        return {f"du.measure_{files // 1000}k_files": time_function(lambda: measure_dirs(trees), repeat=repeat)}
+
+
+def benchmark_creations(repeat: int, modes: list) -> dict:
+    results = {}
+    for language in BUILTIN_LANGUAGES:
+        for mode in modes:
+            console.print(f"[dodger_blue1]{language}[/dodger_blue1] ({mode})...")
+            stats = time_creations(language=language, mode=mode, repeat=repeat)
+            if stats is not None:
+                results[f"create.{language}.{mode}"] = stats
+
+    return results
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    :return: (list) (name, baseline median, median) of the results slower than the baseline by more than threshold
+    """
+    regressions = []
+    for name, stats in results.items():
+        if "median_ms" in stats and "median_ms" in baseline.get(name, {}):
+            baseline_median = baseline[name]["median_ms"]
+            if stats["median_ms"] > baseline_median * (1 + threshold):
+                regressions.append((name, baseline_median, stats["median_ms"]))
+
+    return regressions
+
+
+def run_benchmarks(
+        output: Annotated[str, typer.Option(help="the JSON file the results are saved to")] = "benchmark.json",
+        repeat: Annotated[int, typer.Option(help="the number of timed runs of every benchmark")] = 10,
+        real: Annotated[bool, typer.Option(help="also run the creations with real subprocesses")] = True,
+        compare_to: Annotated[str, typer.Option("--compare", help="a previous results file to compare to")] = "",
+        threshold: Annotated[
+            float, typer.Option(help="the slowdown ratio reported as a regression")
+        ] = DEFAULT_REGRESSION_THRESHOLD,
+):
+    """
+    Benchmark newproject
+    """
+    output = os.path.abspath(output)
+    compare_to = compare_to and os.path.abspath(compare_to)
+    # Without a user site-packages, the default config is found relative to the repository
+    os.chdir(REPO_DIR)
+
+    modes = ["dry_run", "stubbed", "real"] if real else ["dry_run", "stubbed"]
+    results = {
+        **benchmark_startup(repeat=repeat),
+        **benchmark_catalog(repeat=repeat),
+        **benchmark_disk_usage(repeat=repeat),
+        **benchmark_creations(repeat=repeat, modes=modes),
+    }
+
+    report = {
+        "metadata": {
+            "version": __version__,
+            "commit": get_commit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    with open(output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+
+    for name, stats in results.items():
+        if "median_ms" in stats:
+            console.print(f"{name:<36} median {stats['median_ms']:9.3f} ms   min {stats['min_ms']:9.3f} ms")
+        else:
+            console.print(f"{name:<36} [red3]failed with exit code {stats['exit_code']}[/red3]")
+    console.print(f"Results saved to [underline]{output}[/underline]")
+
+    if compare_to:
+        with open(compare_to) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results=results, baseline=baseline, threshold=threshold)
+        for name, baseline_median, median in regressions:
+            console.print(f"[red3]regression[/red3] {name}: {baseline_median:.3f} ms -> {median:.3f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(run_benchmarks)
@@ -1,19 +1,55 @@
+import copy
 import errno
+import glob
+import inspect
 import io
+import json
 import os
+import shutil
+import socket
+import subprocess
+import sys
 import tempfile
+import threading
+import time
 import unittest
 from shutil import which
 from typing import Final
-from unittest.mock import patch, mock_open
+from unittest.mock import Mock, patch, mock_open
 
 import pytest
+import typer
 
+import newproject.cache
+import newproject.catalog
 import newproject.check
+import newproject.daemon
+import newproject.dedupe
+import newproject.disk_usage
 import newproject.error_codes
 import newproject.error_logger
+import newproject.git_repository
+import newproject.languages
+import newproject.manifest
+import newproject.newproject
+import newproject.plan
+import newproject.report
+import newproject.scaffold_cache
+import newproject.schema_validator
+import newproject.steps
+import newproject.templates
+import newproject.tools
+import newproject.tracing
+import newproject.venv_template
+import newproject.wheelhouse
+import newproject.writer
 from newproject.newproject import NewProject
-from newproject.utils import get_config_path, select_config_file
+from newproject.config_layers import ConfigLayerError, load_config_layers, merge_config
+from newproject.languages import get_language
+from newproject.utils import (
+    console, get_cache_path, get_config_layer_candidates, get_config_layers, get_config_path, get_default_config_file,
+    select_config_file
+)
 from newproject.error_logger import log_error
 
 OK: str = "OK\n----------"
@@ -21,8 +57,35 @@ PATH_TO_PROJECT: str = "/path/to/project"
 
 EXIT_FAILURE: Final[int] = 1
 
+REPO_DIR: Final[str] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-class TestCheck(unittest.TestCase):
+# Modules that must not be imported by --version, and by a creation once the config is cached: the timings are in
+# tests/benchmark_newproject.py
+VERSION_UNUSED_MODULES: Final[tuple] = (
+    "typer", "rich", "yaml", "jsonschema", "newproject.catalog", "newproject.dedupe", "newproject.disk_usage"
+)
+CREATION_UNUSED_MODULES: Final[tuple] = ("yaml", "jsonschema", "newproject.dedupe", "newproject.disk_usage")
+
+
+class IsolatedTestCase(unittest.TestCase):
+    """
+    Runs every test with a temporary home folder, which has the development folder of the default config, and its
+    own cache folder: the tests never read or write the user's
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.projects_dir = os.path.join(self.temp_dir, "Developer", "projects")
+        os.makedirs(self.projects_dir)
+
+        environ = patch.dict(os.environ, {"HOME": self.temp_dir, "XDG_CACHE_HOME": os.path.join(self.temp_dir, "cache")})
+        environ.start()
+        self.addCleanup(environ.stop)
+
+
+class TestCheck(IsolatedTestCase):
     def test_config_file_validator(self):
         # Create a sample config file and JSON schema for testing
         print("- test_config_file_validator\n")
@@ -44,6 +107,56 @@ class TestCheck(unittest.TestCase):
 
         print(OK)
 
+    def test_generated_validator(self):
+        print("- test_generated_validator\n")
+        import jsonschema
+        import yaml
+
+        with open(get_default_config_file()) as config_file:
+            valid_config = yaml.safe_load(config_file)
+        with open(f"{get_config_path()}/schema/json_schema.json") as json_schema_file:
+            json_schema = json.load(json_schema_file)
+
+        invalid_configs = []
+        for key in ["development_dir_path", "python", "web"]:
+            invalid_config = copy.deepcopy(valid_config)
+            del invalid_config[key]
+            invalid_configs.append(invalid_config)
+        for key in ["development_dir_path", "bash"]:
+            invalid_config = copy.deepcopy(valid_config)
+            invalid_config[key] = 123
+            invalid_configs.append(invalid_config)
+        invalid_config = copy.deepcopy(valid_config)
+        del invalid_config["go"]["file_content"]
+        invalid_config["go"]["gitignore_content"] = None
+        invalid_configs.append(invalid_config)
+        invalid_config = copy.deepcopy(valid_config)
+        invalid_config["lua"]["file_content"] = ["print()"]
+        del invalid_config["rust"]
+        invalid_configs.append(invalid_config)
+        invalid_config = copy.deepcopy(valid_config)
+        invalid_config["python"]["preinstall"] = ["rich", 1]
+        invalid_configs.append(invalid_config)
+
+        validate = newproject.schema_validator.compile_validator(json_schema)
+        self.assertIsNone(validate(valid_config))
+
+        for invalid_config in invalid_configs:
+            expected_error = jsonschema.exceptions.best_match(
+                jsonschema.Draft7Validator(json_schema).iter_errors(invalid_config)
+            )
+            validation_error = validate(invalid_config)
+            self.assertEqual(validation_error.message, expected_error.message)
+            self.assertEqual(validation_error.validator, expected_error.validator)
+            self.assertEqual(list(validation_error.relative_path), list(expected_error.relative_path))
+
+        # Schemas with keywords the generator doesn't know fall back to jsonschema
+        self.assertIsNone(newproject.schema_validator.compile_validator({"type": "string", "minLength": 1}))
+        with self.assertRaises(SystemExit):
+            newproject.check.config_file_validator("", {"type": "string", "minLength": 1})
+
+        print(OK)
+
     def test_dev_dir_check(self):
         print("- test_dev_dir_check\n")
         # Create a temporary directory for testing
@@ -80,7 +193,7 @@ class TestCheck(unittest.TestCase):
         print(OK)
 
 
-class TestUtils:
+class TestUtils(IsolatedTestCase):
     def test_get_config_path(self):
         assert get_config_path() is not None
 
@@ -106,7 +219,13 @@ class TestErrorLogger:
             newproject.error_codes.GIT_ERROR,
             newproject.error_codes.GIT_NOT_INSTALLED,
             newproject.error_codes.IDE_NOT_FOUND_ERROR,
-            newproject.error_codes.CREATE_OR_WRITE_ERROR
+            newproject.error_codes.CREATE_OR_WRITE_ERROR,
+            newproject.error_codes.DAEMON_ALREADY_RUNNING_ERROR,
+            newproject.error_codes.MANIFEST_FILE_ERROR,
+            newproject.error_codes.TEMPLATE_ERROR,
+            newproject.error_codes.LANGUAGE_PLUGIN_ERROR,
+            newproject.error_codes.PREINSTALL_ERROR,
+            newproject.error_codes.INITIAL_COMMIT_ERROR
         ]
 
         for error in error_codes:
@@ -194,9 +313,1419 @@ class TestErrorLogger:
                     out, _ = capfd.readouterr()
                     expected_output = f"newproject: error: can't create or write {not_writable_file}\n"
                     assert out in expected_output
+                case newproject.error_codes.DAEMON_ALREADY_RUNNING_ERROR:
+                    socket_path = "test.sock"
+                    log_error(error_code=error, socket_path=socket_path)
+                    out, _ = capfd.readouterr()
+                    expected_output = f"newproject: error: a daemon is already listening on {socket_path}\n"
+                    assert out in expected_output
+                case newproject.error_codes.MANIFEST_FILE_ERROR:
+                    manifest_file = "manifest.yaml"
+                    log_error(error_code=error, manifest_file=manifest_file)
+                    out, _ = capfd.readouterr()
+                    expected_output = f"newproject: error: can't read the manifest {manifest_file}\n"
+                    assert out in expected_output
+                case newproject.error_codes.TEMPLATE_ERROR:
+                    template_error = "unknown variable {{ test }}"
+                    log_error(error_code=error, template_error=template_error)
+                    out, _ = capfd.readouterr()
+                    expected_output = f"newproject: error: template error: {template_error}\n"
+                    assert out in expected_output
+                case newproject.error_codes.LANGUAGE_PLUGIN_ERROR:
+                    plugin_error = "zig (zig_plugin:LANGUAGE)"
+                    log_error(error_code=error, plugin_error=plugin_error)
+                    out, _ = capfd.readouterr()
+                    expected_output = f"newproject: error: can't load the language plugin {plugin_error}\n"
+                    assert out in expected_output
+                case newproject.error_codes.PREINSTALL_ERROR:
+                    preinstall_error = "rich: no wheel for python 3.12"
+                    log_error(error_code=error, preinstall_error=preinstall_error)
+                    out, _ = capfd.readouterr()
+                    expected_output = f"newproject: error: can't preinstall the packages: {preinstall_error}\n"
+                    assert out in expected_output
+                case newproject.error_codes.INITIAL_COMMIT_ERROR:
+                    commit_error = "user.email is not set"
+                    log_error(error_code=error, commit_error=commit_error)
+                    out, _ = capfd.readouterr()
+                    expected_output = f"newproject: error: can't create the initial commit: {commit_error}\n"
+                    assert out in expected_output
+
+
+class TestCache(IsolatedTestCase):
+    def test_config_cache(self):
+        print("- test_config_cache\n")
+        config_file = os.path.join(self.temp_dir, "newproject_config.yaml")
+        with open(get_default_config_file()) as default_config, open(config_file, "w") as test_config:
+            test_config.write(default_config.read())
+
+        with patch("newproject.newproject.get_config_layers", return_value=(config_file,)):
+            # Cold start: the validated config is cached, then the validated section of the language used
+            NewProject().language_config(get_language("python"))
+            self.assertTrue(
+                os.path.exists(os.path.join(get_cache_path(), newproject.cache.CONFIG_CACHE_FILE_NAME))
+            )
+
+            # Warm start: no YAML parsing, no schema loading and no schema validation, even for the section
+            newproject.cache._resolved_config = None
+            with patch("yaml.safe_load") as mock_safe_load, \
+                    patch("newproject.newproject.config_file_validator") as mock_validator, \
+                    patch.object(NewProject, "load_json_schema") as mock_load_json_schema:
+                new_project = NewProject()
+                self.assertEqual(new_project.language_config(get_language("python"))["projects_dir_name"],
+                                 "python_projects")
+                self.assertIn("python.file_content", new_project.templates)
+                mock_safe_load.assert_not_called()
+                mock_validator.assert_not_called()
+                mock_load_json_schema.assert_not_called()
+
+            # A section used for the first time is validated once, then cached too
+            with patch("newproject.newproject.config_file_validator", return_value=True) as mock_validator:
+                NewProject().language_config(get_language("go"))
+                NewProject().language_config(get_language("go"))
+                mock_validator.assert_called_once()
+
+            # The cache is invalidated when the config file changes
+            with open(config_file, "a") as test_config:
+                test_config.write("\n# changed\n")
+            with patch("newproject.newproject.config_file_validator", return_value=True) as mock_validator:
+                NewProject()
+                mock_validator.assert_called_once()
+
+        print(OK)
+
+    def test_config_cache_key_missing_file(self):
+        print("- test_config_cache_key_missing_file\n")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            non_existing_file = os.path.join(temp_dir, "non_existing.yaml")
+            self.assertIsNone(newproject.cache.config_cache_key((non_existing_file,), non_existing_file))
+            self.assertIsNone(newproject.cache.load_cached_config(None))
+
+        print(OK)
+
+
+def run_with_importtime(args: list) -> tuple[subprocess.CompletedProcess, dict]:
+    """
+    Runs newproject with -X importtime
+    :return: the completed process and the self import time (us) of every imported module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "newproject.newproject", *args],
+        cwd=REPO_DIR, capture_output=True, text=True
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            self_time, _, module = line[len("import time:"):].split("|")
+            if self_time.strip().isdigit():
+                import_times[module.strip()] = int(self_time)
+
+    return result, import_times
+
+
+class TestStartup(IsolatedTestCase):
+    def test_version_imports(self):
+        print("- test_version_imports\n")
+        result, import_times = run_with_importtime(["--version"])
+
+        self.assertIn("newproject-cli version", result.stdout)
+        for module in VERSION_UNUSED_MODULES:
+            self.assertNotIn(module, import_times)
+
+        print(OK)
+
+    def test_version_without_parser(self):
+        print("- test_version_without_parser\n")
+        # handle imports typer itself to exit: newproject.newproject only imports it to type the parser's options
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout, self.assertRaises(typer.Exit):
+            NewProject().handle(version=True)
+        self.assertIn("newproject-cli version", stdout.getvalue())
+
+        print(OK)
+
+    def test_creation_imports(self):
+        print("- test_creation_imports\n")
+        os.makedirs(os.path.join(self.projects_dir, "bash_projects"))
+
+        # The cache folder is empty: the config is loaded and validated, then cached
+        result, import_times = run_with_importtime(["--bash", "cold_start"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("yaml", import_times)
+
+        result, import_times = run_with_importtime(["--bash", "warm_start"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertTrue(os.path.exists(os.path.join(self.projects_dir, "bash_projects", "warm_start")))
+        for module in CREATION_UNUSED_MODULES:
+            self.assertNotIn(module, import_times)
+
+        print(OK)
+
+
+class TestDaemon(IsolatedTestCase):
+    def test_daemon_creation(self):
+        print("- test_daemon_creation\n")
+        os.makedirs(os.path.join(self.projects_dir, "bash_projects"))
+        socket_path = os.path.join(self.temp_dir, "daemon.sock")
+
+        server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server_socket.bind(socket_path)
+        server_socket.listen()
+        runner = newproject.daemon.NewProjectRunner()
+        threading.Thread(
+            target=newproject.daemon.serve_forever, args=(server_socket, runner), daemon=True
+        ).start()
+
+        response = newproject.daemon.send_request(["--version"], socket_path=socket_path)
+        self.assertEqual(response["exit_code"], 0)
+        self.assertIn("newproject-cli version", response["output"])
+
+        # The output of the subprocesses goes to the client too
+        with patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0, stdout="git init output\n")), \
+                patch("newproject.newproject.requires_git_binary", return_value=True), \
+                patch("newproject.newproject.which", return_value="/usr/bin/git"):
+            response = newproject.daemon.send_request(["--bash", "test_project"], socket_path=socket_path)
+        self.assertEqual(response["exit_code"], 0)
+        self.assertIn("git init output", response["output"])
+        self.assertTrue(
+            os.path.exists(os.path.join(self.projects_dir, "bash_projects", "test_project"))
+        )
+
+        # A request that can't be run gets an error object
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+            client_socket.connect(socket_path)
+            with client_socket.makefile("rwb") as stream:
+                stream.write(b"not json\n")
+                stream.flush()
+                self.assertIn("error", json.loads(stream.readline()))
+        with self.assertRaises(ValueError):
+            newproject.daemon.send_request([1], socket_path=socket_path)
+
+        # The warm instance reports errors instead of exiting
+        response = newproject.daemon.send_request(["--bash", "test_project"], socket_path=socket_path)
+        self.assertEqual(response["exit_code"], errno.EEXIST)
+        self.assertIn("already exists", response["output"])
+
+        server_socket.close()
+
+        print(OK)
+
+    @unittest.skipIf(which("echo") is None, "echo is not installed")
+    def test_runner_captures_subprocesses(self):
+        print("- test_runner_captures_subprocesses\n")
+        runner = newproject.daemon.NewProjectRunner()
+        runner.command = Mock()
+        runner.command.main.side_effect = lambda **_: newproject.newproject.run_command(["echo", "from a subprocess"])
+        # Not a step: the live steps and the generators print outside of the steps' own capture
+        with patch.object(runner, "load"):
+            exit_code, output = runner.run(["--bash", "test_project"])
+        self.assertEqual(exit_code, 0)
+        self.assertIn("from a subprocess", output)
+
+        print(OK)
+
+    @patch("newproject.newproject.main")
+    def test_client_fallback(self, mock_main):
+        print("- test_client_fallback\n")
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch.dict(os.environ, {"NEWPROJECT_SOCKET": os.path.join(temp_dir, "non_existing.sock")}):
+            newproject.daemon.client()
+
+        # No daemon running: the creation runs in process
+        mock_main.assert_called_once()
+
+        # The daemon failed to run it
+        with patch("newproject.daemon.send_request", side_effect=ValueError("invalid request")):
+            newproject.daemon.client()
+        self.assertEqual(mock_main.call_count, 2)
+
+        print(OK)
+
+
+class TestManifest(IsolatedTestCase):
+    @patch("subprocess.run")
+    def test_create_from_manifest(self, mock_run):
+        print("- test_create_from_manifest\n")
+        for projects_dir_name in ["bash_projects", "web_projects", "lua_projects"]:
+            os.makedirs(os.path.join(self.projects_dir, projects_dir_name))
+
+        manifest_file = os.path.join(self.temp_dir, "manifest.jsonl")
+        with open(manifest_file, "w") as manifest_f:
+            for entry in [
+                {"language": "bash", "name": "first"},
+                {"language": "web", "name": "second"},
+                {"language": "bash", "name": "first"},
+                {"language": "cobol", "name": "third"},
+                {"language": "lua", "name": "fourth"},
+                {"language": "bash", "name": 123},
+                {"language": ["bash"], "name": "fifth"},
+                {"language": "bash", "name": "sixth", "ide": None},
+            ]:
+                manifest_f.write(json.dumps(entry) + "\n")
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout, \
+                self.assertRaises(SystemExit) as e:
+            NewProject().create_from_manifest(manifest_file=manifest_file)
+        self.assertEqual(e.exception.code, EXIT_FAILURE)
+
+        # The failing entries don't stop the others
+        for project_dir in ["bash_projects/first", "web_projects/second", "lua_projects/fourth"]:
+            self.assertTrue(os.path.isdir(os.path.join(self.projects_dir, project_dir)))
+        self.assertIn("3 created, 5 failed", mock_stdout.getvalue())
+
+        # An unexpected error is recorded as a failure too
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout, \
+                patch("newproject.newproject.run_creation", side_effect=RuntimeError("boom")), \
+                self.assertRaises(SystemExit):
+            NewProject().create_from_manifest(manifest_file=manifest_file)
+        self.assertIn("0 created, 8 failed", mock_stdout.getvalue())
+
+        print(OK)
+
+    def test_load_manifest(self):
+        print("- test_load_manifest\n")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest_file = os.path.join(temp_dir, "manifest.yaml")
+            with open(manifest_file, "w") as manifest_f:
+                manifest_f.write("- language: go\n  name: service\n  ide: code\n")
+            self.assertEqual(
+                newproject.manifest.load_manifest(manifest_file),
+                [{"language": "go", "name": "service", "ide": "code"}]
+            )
+
+            with open(manifest_file, "w") as manifest_f:
+                manifest_f.write("language: go\n")
+            with self.assertRaises(ValueError):
+                newproject.manifest.load_manifest(manifest_file)
+
+            newproject.manifest.check_entry({"language": "go", "name": "service"})
+            for entry in [{"language": "go"}, {"language": "go", "name": 123}, {"language": "go", "name": ""},
+                          {"language": "go", "name": "service", "ide": 1}]:
+                with self.assertRaises(ValueError):
+                    newproject.manifest.check_entry(entry)
+
+        print(OK)
+
+
+class TestTemplates(IsolatedTestCase):
+    def test_compile_and_render_template(self):
+        print("- test_compile_and_render_template\n")
+        parts = newproject.templates.compile_template("# {{ project_name }} by {{author}}, \\{{ literal }}\n")
+        self.assertEqual(parts, ["# ", "project_name", " by ", "author", ", {{ literal }}\n"])
+        self.assertEqual(
+            newproject.templates.render_template(parts, {"project_name": "demo", "author": "me"}),
+            "# demo by me, {{ literal }}\n"
+        )
+
+        # Unknown variables are errors when the template is compiled, not when it is rendered
+        with self.assertRaises(newproject.templates.TemplateError):
+            newproject.templates.compile_template("{{ projct_name }}", source="python.file_content")
+
+        # What is not a variable name is written as is: C++ initializers, Jinja filters and attributes
+        for content in ("std::vector<int> v{{}};\n", "{{ }}", "{{ message | upper }}", "{{ user.name }}",
+                        "{% if x %}{{ x[0] }}{% endif %}"):
+            self.assertEqual(newproject.templates.compile_template(content), [content])
+        # An escaped name too, e.g. a Vue template
+        self.assertEqual(newproject.templates.compile_template("<p>\\{{ message }}</p>"), ["<p>{{ message }}</p>"])
+
+        print(OK)
+
+    def test_config_templates(self):
+        print("- test_config_templates\n")
+        import yaml
+
+        with open(get_default_config_file()) as default_config:
+            config = yaml.safe_load(default_config)
+        config["python"]["file_content"] = "# {{ project_name }} ({{ language }}, {{ year }})\n"
+        config_file = os.path.join(self.temp_dir, "newproject_config.yaml")
+        with open(config_file, "w") as test_config:
+            yaml.safe_dump(config, test_config)
+
+        with patch("newproject.newproject.get_config_layers", return_value=(config_file,)):
+            # Compiled on the cold start, then loaded from the cache
+            for _ in range(2):
+                creation = NewProject().project_creation("python", "demo")
+                self.assertEqual(creation[4], f"# demo (python, {time.localtime().tm_year})\n")
+
+            config["python"]["file_content"] = "# {{ name }} of {{ project_name }}\n"
+            with open(config_file, "w") as test_config:
+                yaml.safe_dump(config, test_config)
+            # The templates of a language are compiled when it is used: a misspelled variable stops the creation
+            new_project = NewProject()
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout, \
+                    self.assertRaises(SystemExit) as e:
+                new_project.project_creation("python", "demo")
+            self.assertEqual(e.exception.code, EXIT_FAILURE)
+            self.assertIn("unknown variable {{ name", mock_stdout.getvalue())
+
+        print(OK)
+
+    def test_template_dir_unknown_variable(self):
+        print("- test_template_dir_unknown_variable\n")
+        os.makedirs(os.path.join(self.projects_dir, "go_projects"))
+        template_dir = os.path.join(self.temp_dir, "template")
+        os.makedirs(template_dir)
+        with open(os.path.join(template_dir, "index.html"), "w") as f:
+            f.write("<h1>{{ project_name }}</h1><p>{{ item.name }}</p>{{}}\n")
+        with open(os.path.join(template_dir, "main.go"), "w") as f:
+            f.write("package {{ package }}\n")
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout, self.assertRaises(SystemExit):
+            NewProject().create_project(
+                projects_dir_name="go_projects",
+                project_name="test_project",
+                file_name="main.go",
+                file_content="",
+                gitignore_content="",
+                template_dir=template_dir,
+            )
+        self.assertIn("{{ package }}", mock_stdout.getvalue())
+
+        # Nothing is created
+        project_dir = os.path.join(self.projects_dir, "go_projects", "test_project")
+        self.assertFalse(os.path.exists(project_dir))
+
+        # What is not a variable name is left for the other template engines
+        os.remove(os.path.join(template_dir, "main.go"))
+        with patch("sys.stdout", new_callable=io.StringIO):
+            NewProject().create_project(
+                projects_dir_name="go_projects",
+                project_name="test_project",
+                file_name="main.go",
+                file_content="",
+                gitignore_content="",
+                template_dir=template_dir,
+            )
+        with open(os.path.join(project_dir, "index.html")) as f:
+            self.assertEqual(f.read(), "<h1>test_project</h1><p>{{ item.name }}</p>{{}}\n")
+
+        print(OK)
+
+
+class TestTracing(IsolatedTestCase):
+    def test_tracing_off(self):
+        print("- test_tracing_off\n")
+        self.assertFalse(newproject.tracing.is_tracing())
+        self.assertIs(newproject.tracing.span("phase", command=["true"]), newproject.tracing.NULL_SPAN)
+        self.assertEqual(newproject.tracing.get_trace_file(["--bash", "name", "--trace", "t.json"]), "t.json")
+        self.assertEqual(newproject.tracing.get_trace_file(["--trace=t.json"]), "t.json")
+        self.assertEqual(newproject.tracing.get_trace_file(["--bash", "name"]), "")
+
+        print(OK)
+
+    def test_trace_creation(self):
+        print("- test_trace_creation\n")
+        os.makedirs(os.path.join(self.projects_dir, "bash_projects"))
+        trace_file = os.path.join(self.temp_dir, "trace.json")
+
+        with newproject.tracing.tracing(trace_file), \
+                patch("subprocess.run", return_value=subprocess.CompletedProcess([], 3, stdout="")), \
+                patch("newproject.newproject.requires_git_binary", return_value=True), \
+                patch("sys.stdout", new_callable=io.StringIO):
+            NewProject().handle(bash="traced")
+
+        with open(trace_file) as trace_f:
+            events = {event["name"]: event for event in json.load(trace_f)["traceEvents"]}
+
+        for name in ["NewProject.__init__", "load_cached_config", "dev_dir_check", "create_project",
+                     "projects_path_check", "plan", "execute_plan", "step git", "step file"]:
+            self.assertIn(name, events)
+            self.assertEqual(events[name]["ph"], "X")
+        # Subprocesses carry their command and exit code
+        self.assertEqual(events["run_command"]["args"]["command"][:2], ["git", "init"])
+        self.assertEqual(events["run_command"]["args"]["exit_code"], 3)
+        # Spans nest: the creation contains its plan and its execution
+        creation = events["create_project"]
+        for name in ["plan", "execute_plan"]:
+            self.assertGreaterEqual(events[name]["ts"], creation["ts"])
+            self.assertLessEqual(events[name]["ts"] + events[name]["dur"], creation["ts"] + creation["dur"])
+
+        self.assertFalse(newproject.tracing.is_tracing())
+
+        print(OK)
+
+
+class TestReport(IsolatedTestCase):
+    def test_get_output_mode(self):
+        print("- test_get_output_mode\n")
+        self.assertEqual(newproject.report.get_output_mode(["--bash", "name", "--output", "json"]), "json")
+        self.assertEqual(newproject.report.get_output_mode(["--output=json"]), "json")
+        self.assertEqual(newproject.report.get_output_mode(["--quiet", "--bash", "name"]), "quiet")
+        self.assertEqual(newproject.report.get_output_mode(["--output", "text", "--bash", "name"]), "text")
+        self.assertEqual(newproject.report.get_output_mode(["--bash", "--output"]), "text")
+
+        print(OK)
+
+    def test_output_json(self):
+        print("- test_output_json\n")
+        os.makedirs(os.path.join(self.projects_dir, "bash_projects"))
+        project_dir = os.path.join(self.projects_dir, "bash_projects", "reported")
+
+        with patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0, stdout="git output\n")), \
+                patch("newproject.newproject.requires_git_binary", return_value=True), \
+                patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            NewProject().handle(bash="reported", output="json")
+
+        # One JSON object and nothing else
+        report = json.loads(mock_stdout.getvalue())
+        self.assertEqual(report["exit_code"], 0)
+        self.assertEqual(report["errors"], [])
+
+        creation, = report["projects"]
+        self.assertEqual((creation["language"], creation["project_name"]), ("bash", "reported"))
+        self.assertEqual((creation["project_dir"], creation["status"]), (project_dir, "ok"))
+        for path in [project_dir, os.path.join(project_dir, "README.md"), os.path.join(project_dir, "reported.sh")]:
+            self.assertIn(path, creation["paths"])
+
+        steps = {step["name"]: step for step in creation["steps"]}
+        self.assertEqual(set(steps), {"project_dir", "readme", "git", "file"})
+        self.assertTrue(all(step["status"] == "ok" and step["duration_ms"] >= 0 for step in steps.values()))
+        # The output of subprocesses is captured, not passed through
+        command, = steps["git"]["commands"]
+        self.assertEqual(command["command"][:2], ["git", "init"])
+        self.assertEqual(command["output"], "git output\n")
+
+        self.assertFalse(newproject.report.is_reporting())
+
+        print(OK)
+
+    def test_output_quiet_error(self):
+        print("- test_output_quiet_error\n")
+        os.makedirs(os.path.join(self.projects_dir, "bash_projects", "existing"))
+
+        new_project = NewProject()
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout, self.assertRaises(SystemExit) as exit_cm:
+            new_project.handle(bash="existing", quiet=True)
+        self.assertEqual(exit_cm.exception.code, errno.EEXIST)
+        self.assertEqual(mock_stdout.getvalue(), "")
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout, self.assertRaises(SystemExit):
+            new_project.handle(bash="existing", output="json")
+        report = json.loads(mock_stdout.getvalue())
+        self.assertEqual(report["exit_code"], errno.EEXIST)
+        self.assertEqual(report["projects"][0]["status"], "failed")
+        self.assertEqual(report["projects"][0]["errors"], [
+            {"code": newproject.error_codes.PROJECT_ALREADY_EXISTS_ERROR, "name": "PROJECT_ALREADY_EXISTS_ERROR"}
+        ])
+
+        print(OK)
+
+
+class TestWriter(IsolatedTestCase):
+    def test_write_batch(self):
+        print("- test_write_batch\n")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = os.path.join(temp_dir, "project")
+            synced = []
+
+            def fsync(fd):
+                synced.append(os.readlink(f"/proc/self/fd/{fd}") if os.path.exists("/proc/self/fd") else fd)
+
+            with patch("os.fsync", side_effect=fsync):
+                with newproject.writer.write_batch(durability="none", root=temp_dir):
+                    newproject.writer.make_dir(project_dir)
+                    newproject.writer.write_file(os.path.join(project_dir, "none.txt"), "none")
+                self.assertEqual(synced, [])
+
+                # Nothing is synced before the end of the batch
+                with newproject.writer.write_batch(durability="batch", root=temp_dir):
+                    newproject.writer.make_dir(os.path.join(project_dir, "src", "lib"), parents=True)
+                    newproject.writer.write_file(os.path.join(project_dir, "src", "lib", "batch.txt"), "batch")
+                    self.assertEqual(synced, [])
+                if os.path.exists("/proc/self/fd"):
+                    self.assertEqual(synced, [os.path.join(project_dir, "src", "lib", "batch.txt"),
+                                              os.path.join(project_dir, "src", "lib"), os.path.join(project_dir, "src"),
+                                              project_dir, temp_dir])
+
+                synced.clear()
+                with newproject.writer.write_batch(durability="strict", root=temp_dir):
+                    newproject.writer.write_file(os.path.join(project_dir, "strict.txt"), "strict")
+                    self.assertEqual(len(synced), 1)
+                self.assertEqual(len(synced), 3 if os.name == "posix" else 1)
+
+            with open(os.path.join(project_dir, "strict.txt")) as strict_file:
+                self.assertEqual(strict_file.read(), "strict")
+
+        print(OK)
+
+    def test_handle_durability(self):
+        print("- test_handle_durability\n")
+        os.makedirs(os.path.join(self.projects_dir, "web_projects"))
+
+        with patch("os.fsync", wraps=os.fsync) as mock_fsync, \
+                patch("newproject.newproject.requires_git_binary", return_value=False), \
+                patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            NewProject().handle(web="durable", durability="batch")
+
+        # README.md, .gitignore, the 3 files and the 4 files of .git, then their folders
+        self.assertGreaterEqual(mock_fsync.call_count, 9)
+        # One line per file
+        self.assertIn("▶ style.css created.", mock_stdout.getvalue())
+        self.assertEqual(mock_stdout.getvalue().count("Creating the project structure"), 0)
+
+        with patch("sys.stdout", new_callable=io.StringIO), self.assertRaises(typer.BadParameter):
+            NewProject().handle(web="other", durability="always")
+
+        print(OK)
+
+
+FAKE_CARGO: Final[str] = """
+import os, sys
+with open(os.environ["FAKE_CARGO_LOG"], "a") as log:
+    log.write(" ".join(sys.argv[1:2]) + "\\n")
+if sys.argv[1] == "--version":
+    print(VERSION)
+else:
+    name = os.path.basename(sys.argv[2])
+    os.makedirs(os.path.join(sys.argv[2], "src"))
+    with open(os.path.join(sys.argv[2], "Cargo.toml"), "w") as cargo_toml:
+        cargo_toml.write(f'[package]\\nname = "{name}"\\n')
+    with open(os.path.join(sys.argv[2], "src", "main.rs"), "w") as main_rs:
+        main_rs.write(f'struct {name.replace("_", " ").title().replace(" ", "")};\\n')
+"""
+
+
+class TestScaffoldCache(IsolatedTestCase):
+    def test_name_forms(self):
+        print("- test_name_forms\n")
+        self.assertEqual(newproject.scaffold_cache.probe_name("foo_bar-baz"), "nprobea_nprobeb-nprobec")
+        forms = newproject.scaffold_cache.name_forms("foo_bar-baz")
+        for form in ["foo_bar_baz", "foo-bar-baz", "foo_bar/baz", "FOO_BAR_BAZ", "FooBarBaz", "FooBar::Baz"]:
+            self.assertIn(form, forms)
+        # Snapshots are only rebuilt for names whose spellings are known
+        self.assertIsNone(newproject.scaffold_cache.get_scaffold(["cargo", "new"], "/projects/Foo", git_config={}))
+        # The generators that ask questions run in the user's terminal
+        with patch("newproject.scaffold_cache.snapshot_generator") as mock_snapshot_generator:
+            self.assertIsNone(newproject.scaffold_cache.get_scaffold(["bundler", "gem"], "/projects/foo", git_config={}))
+            self.assertIsNone(newproject.scaffold_cache.get_scaffold(["v", "new"], "/projects/foo", git_config={}))
+        mock_snapshot_generator.assert_not_called()
+        # The generator checks the names it refuses itself
+        for name in ["test", "proc-macro", "self", "con"]:
+            self.assertTrue(newproject.scaffold_cache.is_rejected_name("cargo", name))
+        self.assertFalse(newproject.scaffold_cache.is_rejected_name("cargo", "tester"))
+        self.assertFalse(newproject.scaffold_cache.is_rejected_name("v", "test"))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            projects_dir = os.path.join(temp_dir, "workspace", "crates")
+            os.makedirs(projects_dir)
+            self.assertFalse(newproject.scaffold_cache.in_workspace("cargo", projects_dir))
+            with open(os.path.join(temp_dir, "workspace", "Cargo.toml"), "w") as cargo_toml:
+                cargo_toml.write('[workspace]\nmembers = ["crates/*"]\n')
+            self.assertTrue(newproject.scaffold_cache.in_workspace("cargo", projects_dir))
+            self.assertFalse(newproject.scaffold_cache.in_workspace("dune", projects_dir))
+            os.makedirs(os.path.join(temp_dir, ".git"))
+            self.assertTrue(newproject.scaffold_cache.in_workspace("dune", projects_dir))
+
+        print(OK)
+
+    @unittest.skipIf(sys.platform.startswith("win32"), "The fake generator is a script.")
+    def test_scaffold_cache(self):
+        print("- test_scaffold_cache\n")
+        bin_dir = os.path.join(self.temp_dir, "bin")
+        os.makedirs(bin_dir)
+
+        def install_cargo(version: str) -> None:
+            # Replaced like an upgrade does: the tools cache notices that its folder changed
+            with open(os.path.join(self.temp_dir, "cargo"), "w") as fake_cargo:
+                fake_cargo.write(f"#!{sys.executable}\nVERSION = {version!r}\n{FAKE_CARGO}")
+            os.chmod(os.path.join(self.temp_dir, "cargo"), 0o755)
+            os.replace(os.path.join(self.temp_dir, "cargo"), os.path.join(bin_dir, "cargo"))
+            os.utime(bin_dir, ns=(time.time_ns(), os.stat(bin_dir).st_mtime_ns + 1_000_000_000))
+
+        install_cargo("cargo 1.0")
+        log_file = os.path.join(self.temp_dir, "cargo.log")
+        os.makedirs(os.path.join(self.projects_dir, "rust_projects"))
+        rust_projects = os.path.join(self.projects_dir, "rust_projects")
+
+        def generator_runs():
+            with open(log_file) as log:
+                return log.read().split().count("new")
+
+        with patch.dict(os.environ, {"PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}", "FAKE_CARGO_LOG": log_file}), \
+                patch("newproject.tools._resolved", None), \
+                patch("newproject.newproject.requires_git_binary", return_value=False), \
+                patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            new_project = NewProject()
+
+            # Miss: the generator runs on a probe name, the project is rebuilt from its snapshot
+            new_project.handle(rust="first_app")
+            self.assertEqual(generator_runs(), 1)
+            self.assertIn("from the cargo scaffold cache", mock_stdout.getvalue())
+
+            # Hit: the generator doesn't run
+            new_project.handle(rust="second_app")
+            self.assertEqual(generator_runs(), 1)
+            with open(os.path.join(rust_projects, "second_app", "Cargo.toml")) as cargo_toml:
+                self.assertEqual(cargo_toml.read(), '[package]\nname = "second_app"\n')
+            with open(os.path.join(rust_projects, "second_app", "src", "main.rs")) as main_rs:
+                self.assertEqual(main_rs.read(), "struct SecondApp;\n")
+
+            # The version comes from the tools cache: the generator is not run to get it
+            with open(log_file) as log:
+                self.assertEqual(log.read().split().count("--version"), 1)
+
+            # A new version of the generator invalidates its snapshots
+            install_cargo("cargo 2.0")
+            new_project.handle(rust="third_app")
+            self.assertEqual(generator_runs(), 2)
+
+            # The generator runs on the names it refuses and in workspaces, its checks apply
+            new_project.handle(rust="test")
+            self.assertEqual(generator_runs(), 3)
+            with open(os.path.join(rust_projects, "Cargo.toml"), "w") as cargo_toml:
+                cargo_toml.write("[workspace]\n")
+            new_project.handle(rust="fourth_app")
+            self.assertEqual(generator_runs(), 4)
+
+        print(OK)
+
 
+class TestTools(IsolatedTestCase):
+    @unittest.skipIf(sys.platform.startswith("win32"), "The fake tool is a script.")
+    def test_tools_cache(self):
+        print("- test_tools_cache\n")
+        bin_dir = os.path.join(self.temp_dir, "bin")
+        os.makedirs(bin_dir)
+        with open(os.path.join(bin_dir, "dune"), "w") as fake_dune:
+            fake_dune.write("#!/bin/sh\necho 3.14\n")
+        os.chmod(os.path.join(bin_dir, "dune"), 0o755)
+
+        with patch.dict(os.environ, {"PATH": bin_dir}), \
+                patch("newproject.tools._resolved", None):
+            with patch("shutil.which", wraps=shutil.which) as mock_which:
+                self.assertEqual(newproject.tools.which("dune"), os.path.join(bin_dir, "dune"))
+                self.assertIsNone(newproject.tools.which("cargo"))
+                # Every known tool is probed at once
+                self.assertEqual(mock_which.call_count, len(newproject.tools.KNOWN_TOOLS))
+
+            # Another process reads the cache
+            newproject.tools._resolved = None
+            with patch("shutil.which") as mock_which:
+                self.assertEqual(newproject.tools.which("dune"), os.path.join(bin_dir, "dune"))
+                mock_which.assert_not_called()
+
+            # The doctor probes the versions, then they are cached
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                newproject.tools.doctor()
+            self.assertIn("3.14", mock_stdout.getvalue())
+            newproject.tools._resolved = None
+            with patch("subprocess.run") as mock_run:
+                self.assertEqual(newproject.tools.resolve_tools(with_versions=True)["dune"]["version"], "3.14")
+                mock_run.assert_not_called()
+
+            # A tool removed from a folder of $PATH is not found anymore
+            os.remove(os.path.join(bin_dir, "dune"))
+            self.assertIsNone(newproject.tools.which("dune"))
 
-class TestNewProject(unittest.TestCase):
+        print(OK)
+
+
+class TestConfigLayers(IsolatedTestCase):
+    def test_config_layers(self):
+        print("- test_config_layers\n")
+        user_config_file, directory_config_file = get_config_layer_candidates(home=self.temp_dir, cwd=self.temp_dir)
+        os.makedirs(os.path.dirname(user_config_file))
+        with open(user_config_file, "w") as user_config:
+            user_config.write("python:\n  projects_dir_name: my_python_projects\n")
+        with open(directory_config_file, "w") as directory_config:
+            directory_config.write("bash:\n  projects_dir_name: scripts\n  template_dir: templates/bash\n")
+
+        with patch("os.getcwd", return_value=self.temp_dir):
+            self.assertEqual(get_config_layers(), (get_default_config_file(), user_config_file, directory_config_file))
+            # Found once per process
+            with patch("os.path.isfile") as mock_isfile:
+                get_config_layers()
+                mock_isfile.assert_not_called()
+
+            new_project = NewProject()
+
+        # Only the keys set by each layer are overridden
+        self.assertEqual(new_project.language_config(get_language("python"))["projects_dir_name"], "my_python_projects")
+        self.assertEqual(new_project.language_config(get_language("bash"))["projects_dir_name"], "scripts")
+        self.assertEqual(new_project.language_config(get_language("bash"))["file_content"], "#!/bin/bash")
+        self.assertEqual(new_project.language_config(get_language("clang"))["projects_dir_name"], "c_projects")
+        # A relative template folder is relative to its layer
+        self.assertEqual(new_project.get_template_dir("bash"), os.path.join(self.temp_dir, "templates/bash"))
+
+        print(OK)
+
+    def test_merge_config(self):
+        print("- test_merge_config\n")
+        base = {"python": {"projects_dir_name": "python_projects", "file_content": ""}, "venv": ["a"]}
+        merged = merge_config(base, {"python": {"file_content": "pass"}, "venv": ["b"]})
+        self.assertEqual(merged, {"python": {"projects_dir_name": "python_projects", "file_content": "pass"}, "venv": ["b"]})
+        self.assertEqual(base["python"]["file_content"], "")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            layer_file = os.path.join(temp_dir, ".newproject.yaml")
+            with open(layer_file, "w") as layer:
+                layer.write("- not a mapping\n")
+            with self.assertRaises(ConfigLayerError):
+                load_config_layers((layer_file,))
+
+        print(OK)
+
+
+class TestLanguages(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        newproject.languages.find_plugins.cache_clear()
+        newproject.languages.get_language.cache_clear()
+
+    def tearDown(self):
+        newproject.languages.find_plugins.cache_clear()
+        newproject.languages.get_language.cache_clear()
+
+    def test_language_plugin(self):
+        print("- test_language_plugin\n")
+        with patch("sys.path", [os.path.join(self.temp_dir, "plugins"), *sys.path]), \
+                patch("newproject.newproject.which", return_value="/usr/bin/git"):
+            os.makedirs(os.path.join(self.projects_dir, "zig_projects"))
+            os.makedirs(os.path.join(self.temp_dir, "plugins"))
+            with open(os.path.join(self.temp_dir, "plugins", "zig_plugin.py"), "w") as plugin:
+                plugin.write(
+                    "from newproject.languages import FILE_KIND, Language\n"
+                    "LANGUAGE = Language('zig', FILE_KIND, file_name='main.zig', defaults={\n"
+                    "    'projects_dir_name': 'zig_projects', 'file_content': '// {{ project_name }}',"
+                    " 'gitignore_content': 'zig-out/'})\n"
+                )
+
+            with patch("newproject.languages.scan_plugins", return_value={"zig": "zig_plugin:LANGUAGE"}) as mock_scan:
+                self.assertEqual(newproject.languages.language_names()[-1], "zig")
+                newproject.newproject.import_typer()
+                self.assertIn("zig", inspect.signature(NewProject.handle).parameters)
+                # The plugin is only imported when its language is used
+                self.assertNotIn("zig_plugin", sys.modules)
+
+                with patch("sys.stdout", new_callable=io.StringIO):
+                    NewProject().handle(zig="hello")
+                with open(os.path.join(self.projects_dir, "zig_projects", "hello", "main.zig")) as main:
+                    self.assertEqual(main.read(), "// hello")
+
+                # The entry points are only scanned again when the installed distributions change
+                newproject.languages.find_plugins.cache_clear()
+                newproject.languages.find_plugins()
+                mock_scan.assert_called_once()
+            sys.modules.pop("zig_plugin", None)
+
+            with patch("newproject.languages.scan_plugins", return_value={"zig": "zig_plugin:MISSING"}), \
+                    patch("newproject.languages.plugins_cache_key", return_value={"changed": True}):
+                self.setUp()
+                with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout, \
+                        self.assertRaises(SystemExit) as e:
+                    NewProject().handle(zig="broken")
+                self.assertEqual(e.exception.code, EXIT_FAILURE)
+                self.assertIn("can't load the language plugin", mock_stdout.getvalue())
+            sys.modules.pop("zig_plugin", None)
+
+        print(OK)
+
+    def test_language_sections_validated_when_used(self):
+        print("- test_language_sections_validated_when_used\n")
+        config_file = os.path.join(self.temp_dir, "newproject_config.yaml")
+        with open(config_file, "w") as test_config:
+            test_config.write("lua:\n  file_content: [print]\n")
+
+        with patch("newproject.newproject.get_config_layers", return_value=(get_default_config_file(), config_file)):
+            new_project = NewProject()
+            self.assertEqual(new_project.project_creation("bash", "demo")[0], new_project.create_project)
+            self.assertEqual(list(new_project.language_configs), ["bash"])
+
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout, \
+                    self.assertRaises(SystemExit) as e:
+                new_project.project_creation("lua", "demo")
+            self.assertEqual(e.exception.code, EXIT_FAILURE)
+            self.assertIn("lua:", mock_stdout.getvalue())
+
+        print(OK)
+
+
+class TestCatalog(IsolatedTestCase):
+    def test_catalog_refresh(self):
+        print("- test_catalog_refresh\n")
+        python_dir = os.path.join(self.temp_dir, "python_projects")
+        go_dir = os.path.join(self.temp_dir, "go_projects")
+        os.makedirs(os.path.join(python_dir, "weather_api", ".git"))
+        os.makedirs(os.path.join(python_dir, "weather_api", "venv"))
+        os.makedirs(os.path.join(go_dir, "scraper"))
+        language_folders = {"python": python_dir, "go": go_dir}
+
+        catalog = newproject.catalog.Catalog()
+        self.assertTrue(catalog.refresh(language_folders))
+        self.assertEqual(
+            [(record["language"], record["name"], record["git"], record["venv"]) for record in catalog.records()],
+            [("go", "scraper", False, False), ("python", "weather_api", True, True)],
+        )
+        newproject.catalog.store_catalog(catalog)
+
+        # Unchanged folders are not scanned again
+        catalog = newproject.catalog.load_catalog()
+        with patch("newproject.catalog.scan_folder") as mock_scan:
+            self.assertFalse(catalog.refresh(language_folders))
+        mock_scan.assert_not_called()
+
+        # Only the changed folder is
+        os.makedirs(os.path.join(go_dir, "crawler"))
+        shutil.rmtree(os.path.join(go_dir, "scraper"))
+        with patch("newproject.catalog.scan_folder", wraps=newproject.catalog.scan_folder) as mock_scan:
+            self.assertTrue(catalog.refresh(language_folders))
+        mock_scan.assert_called_once_with(go_dir)
+        self.assertEqual([record["name"] for record in catalog.records(language="go")], ["crawler"])
+        self.assertEqual([record["name"] for _, record in catalog.search("scraper")], [])
+        self.assertEqual([record["name"] for _, record in catalog.search("crawlr")], ["crawler"])
+
+        print(OK)
+
+    def test_catalog_search(self):
+        print("- test_catalog_search\n")
+        catalog = newproject.catalog.Catalog()
+        for name in ("weather_api", "weather_bot", "todo_app", "parser"):
+            catalog.add({"name": name, "language": "python", "path": name, "created": 0, "git": False, "venv": False,
+                         "mtime_ns": 0})
+        catalog.remove(2)
+
+        results = catalog.search("weather-ap")
+        self.assertEqual([record["name"] for _, record in results], ["weather_api", "weather_bot"])
+        self.assertGreater(results[0][0], results[1][0])
+        self.assertEqual([record["name"] for _, record in catalog.search("weather", limit=1)], ["weather_api"])
+        self.assertEqual(catalog.search("weather", limit=0), [])
+        self.assertEqual(catalog.search("todo_app"), [])
+        with self.assertRaises(typer.BadParameter):
+            newproject.catalog.search_projects("weather", limit=0)
+
+        # A partial name finds the names that contain it
+        self.assertEqual([(similarity, record["name"]) for similarity, record in catalog.search("api")],
+                         [(1.0, "weather_api")])
+        self.assertEqual([record["name"] for _, record in catalog.search("weath")], ["weather_api", "weather_bot"])
+
+        newproject.catalog.store_catalog(catalog)
+        loaded = newproject.catalog.load_catalog()
+        self.assertEqual(loaded.search("weather-ap"), results)
+        # Only the records of the results are read
+        self.assertEqual(sum(record is not None for record in loaded.projects), 2)
+
+        # The posting lists and records that were not read are copied by the next store
+        loaded.remove(0)
+        loaded.add({"name": "api_gateway", "language": "go", "path": "api_gateway", "created": 0, "git": False,
+                    "venv": False, "mtime_ns": 0})
+        newproject.catalog.store_catalog(loaded)
+        loaded = newproject.catalog.load_catalog()
+        self.assertEqual([record["name"] for _, record in loaded.search("api")], ["api_gateway"])
+        self.assertEqual([(record["language"], record["name"]) for record in loaded.records()],
+                         [("go", "api_gateway"), ("python", "parser"), ("python", "weather_bot")])
+
+        # A catalog whose folders file was written by another store is not used
+        with open(os.path.join(get_cache_path(), newproject.catalog.CATALOG_FOLDERS_FILE_NAME), "w") as folders:
+            folders.write(json.dumps({"version": newproject.catalog.CATALOG_VERSION, "generation": "other",
+                                      "folders": {}}))
+        self.assertEqual(newproject.catalog.load_catalog().records(), [])
+
+        print(OK)
+
+    def test_list_and_name_collisions(self):
+        print("- test_list_and_name_collisions\n")
+        with patch("newproject.newproject.which", return_value="/usr/bin/git"):
+            os.makedirs(os.path.join(self.projects_dir, "go_projects", "hello"))
+            os.makedirs(os.path.join(self.projects_dir, "go_projects", "other"))
+
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                newproject.catalog.list_projects(output="json")
+            listed = json.loads(mock_stdout.getvalue())
+            self.assertEqual([(record["language"], record["name"]) for record in listed],
+                             [("go", "hello"), ("go", "other")])
+
+            # Once the config is cached, the folders are read from it without loading the config
+            os.makedirs(os.path.join(self.projects_dir, "rust_projects", "hello"))
+            with patch("newproject.newproject.NewProject") as mock_new_project, \
+                    patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                newproject.catalog.list_projects(output="json")
+            mock_new_project.assert_not_called()
+            self.assertEqual([(record["language"], record["name"]) for record in json.loads(mock_stdout.getvalue())],
+                             [("go", "hello"), ("go", "other"), ("rust", "hello")])
+
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                NewProject().project_creation("bash", "hello")
+            self.assertIn("there is a go project with the same name", mock_stdout.getvalue())
+
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                NewProject().project_creation("bash", "unique")
+            self.assertNotIn("warning", mock_stdout.getvalue())
+
+        print(OK)
+
+
+class TestDiskUsage(IsolatedTestCase):
+    def test_measure_dirs(self):
+        print("- test_measure_dirs\n")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for index in range(30):
+                os.makedirs(os.path.join(temp_dir, "tree", f"package_{index}", "sub"))
+                with open(os.path.join(temp_dir, "tree", f"package_{index}", "sub", "module.py"), "w") as module:
+                    module.write("x" * 5000 * index)
+            os.link(os.path.join(temp_dir, "tree", "package_1", "sub", "module.py"),
+                    os.path.join(temp_dir, "tree", "package_1", "linked.py"))
+            os.symlink(os.path.join(temp_dir, "tree"), os.path.join(temp_dir, "tree", "loop"))
+
+            expected_size, expected_files = 0, 0
+            seen = set()
+            for root, dir_names, file_names in os.walk(os.path.join(temp_dir, "tree")):
+                for name in [".", *dir_names, *file_names]:
+                    entry_stat = os.stat(os.path.join(root, name), follow_symlinks=False)
+                    if (entry_stat.st_dev, entry_stat.st_ino) not in seen:
+                        seen.add((entry_stat.st_dev, entry_stat.st_ino))
+                        expected_size += newproject.disk_usage.disk_size(entry_stat)
+                # The symlink is counted as a file, it is not followed
+                expected_files += len(file_names) + sum(os.path.islink(os.path.join(root, name)) for name in dir_names)
+
+            # Small batches: the folders are spread over the tasks
+            with patch("newproject.disk_usage.SCAN_BATCH", 4):
+                (size, files, _), (missing_size, _, _) = newproject.disk_usage.measure_dirs(
+                    [os.path.join(temp_dir, "tree"), os.path.join(temp_dir, "missing")], workers=4
+                )
+            self.assertEqual(files, expected_files)
+            self.assertEqual(size, expected_size)
+            self.assertEqual(missing_size, 0)
+
+        self.assertEqual(newproject.disk_usage.parse_size("500M"), 500 * 1024 ** 2)
+        self.assertEqual(newproject.disk_usage.parse_size("1.5gb"), 1.5 * 1024 ** 3)
+        with self.assertRaises(typer.BadParameter):
+            newproject.disk_usage.parse_size("big")
+
+        print(OK)
+
+    def test_prune(self):
+        print("- test_prune\n")
+        old_venv = os.path.join(self.projects_dir, "python_projects", "old", "venv")
+        new_venv = os.path.join(self.projects_dir, "python_projects", "new", "venv")
+        used_venv = os.path.join(self.projects_dir, "python_projects", "used", "venv")
+        old_target = os.path.join(self.projects_dir, "rust_projects", "small", "target")
+        # Not build outputs: a go source folder and a folder without the marker of a venv
+        go_target = os.path.join(self.projects_dir, "go_projects", "service", "target")
+        plain_venv = os.path.join(self.projects_dir, "python_projects", "plain", "venv")
+        for build_dir, marker in ((old_venv, "pyvenv.cfg"), (new_venv, "pyvenv.cfg"), (used_venv, "pyvenv.cfg"),
+                                  (old_target, "CACHEDIR.TAG"), (go_target, "CACHEDIR.TAG"), (plain_venv, "")):
+            os.makedirs(os.path.join(build_dir, "lib"))
+            with open(os.path.join(build_dir, "lib", "site.py"), "w") as site:
+                site.write("x" * 100_000)
+            if marker:
+                with open(os.path.join(build_dir, marker), "w") as marker_file:
+                    marker_file.write("home = /usr/bin\n")
+        long_ago = time.time() - 90 * 86400
+        for build_dir in (old_venv, used_venv, old_target, go_target, plain_venv):
+            for root, dir_names, file_names in os.walk(os.path.dirname(build_dir), topdown=False):
+                for name in [*dir_names, *file_names]:
+                    os.utime(os.path.join(root, name), (long_ago, long_ago))
+                os.utime(root, (long_ago, long_ago))
+        # The venv is used every day: python reads pyvenv.cfg, nothing is modified
+        os.utime(os.path.join(used_venv, "pyvenv.cfg"), (time.time(), long_ago))
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            newproject.disk_usage.du(sort="age", output="json")
+        build_dirs = [build_dir["path"] for build_dir in json.loads(mock_stdout.getvalue())]
+        self.assertEqual(sorted(build_dirs), sorted([old_venv, new_venv, used_venv, old_target]))
+        self.assertEqual(sorted(build_dirs[-2:]), sorted([used_venv, new_venv]))
+
+        # Nothing is deleted without --yes
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            newproject.disk_usage.prune(older_than=30, min_size="50K", output="json")
+        self.assertEqual([build_dir["path"] for build_dir in json.loads(mock_stdout.getvalue())],
+                         [old_venv, old_target])
+        self.assertTrue(os.path.isdir(old_venv))
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            newproject.disk_usage.prune(older_than=30, min_size="50K")
+        self.assertIn("--yes", mock_stdout.getvalue())
+        self.assertTrue(os.path.isdir(old_venv))
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            newproject.disk_usage.prune(older_than=30, min_size="50K", yes=True)
+        self.assertIn("Freed", mock_stdout.getvalue())
+        self.assertFalse(os.path.exists(old_venv))
+        self.assertFalse(os.path.exists(old_target))
+        for build_dir in (new_venv, used_venv, go_target, plain_venv):
+            self.assertTrue(os.path.isdir(build_dir))
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            newproject.catalog.list_projects(language="python", output="json")
+        self.assertEqual({record["name"]: record["venv"] for record in json.loads(mock_stdout.getvalue())},
+                         {"new": True, "old": False, "plain": True, "used": True})
+
+        print(OK)
+
+
+class TestDedupe(IsolatedTestCase):
+    def test_dedupe_venvs(self):
+        print("- test_dedupe_venvs\n")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_dir = os.path.join(temp_dir, newproject.dedupe.STORE_DIR_NAME)
+            venv_dirs = [os.path.join(temp_dir, project, "venv") for project in ("a", "b", "c")]
+            for venv_dir in venv_dirs:
+                os.makedirs(os.path.join(venv_dir, "lib", "pip"))
+                os.makedirs(os.path.join(venv_dir, "bin"))
+                with open(os.path.join(venv_dir, "lib", "pip", "__init__.py"), "w") as shared:
+                    shared.write("__version__ = '23.2'\n" * 100)
+                with open(os.path.join(venv_dir, "bin", "activate"), "w") as own:
+                    own.write(f"VIRTUAL_ENV={venv_dir}\n")
+                os.symlink("python3", os.path.join(venv_dir, "bin", "python"))
+
+            result = newproject.dedupe.dedupe_venvs(venv_dirs=venv_dirs, store_dir=store_dir)
+            self.assertEqual((result.files, result.linked), (6, 2))
+            self.assertGreater(result.freed, 0)
+            shared_stats = [os.stat(os.path.join(venv_dir, "lib", "pip", "__init__.py")) for venv_dir in venv_dirs]
+            self.assertEqual({file_stat.st_ino for file_stat in shared_stats}, {shared_stats[0].st_ino})
+            self.assertEqual(shared_stats[0].st_nlink, 4)
+            # The shared files can't be written in place
+            self.assertFalse(shared_stats[0].st_mode & newproject.dedupe.WRITE_BITS)
+            self.assertEqual(os.stat(os.path.join(venv_dirs[0], "bin", "activate")).st_nlink, 1)
+            self.assertTrue(os.path.islink(os.path.join(venv_dirs[0], "bin", "python")))
+
+            # Nothing is left to link, a new venv is linked to the store
+            self.assertEqual(newproject.dedupe.dedupe_venvs(venv_dirs=venv_dirs, store_dir=store_dir).linked, 0)
+            shutil.copytree(venv_dirs[0], os.path.join(temp_dir, "d", "venv"), symlinks=True)
+            result = newproject.dedupe.dedupe_venvs(venv_dirs=[os.path.join(temp_dir, "d", "venv")], store_dir=store_dir)
+            self.assertEqual(result.linked, 1)
+
+            # Replacing a file, as pip does, leaves the other venvs alone
+            upgraded = os.path.join(venv_dirs[0], "lib", "pip", "__init__.py")
+            with open(f"{upgraded}.new", "w") as new_version:
+                new_version.write("__version__ = '24.0'\n")
+            os.replace(f"{upgraded}.new", upgraded)
+            with open(os.path.join(venv_dirs[1], "lib", "pip", "__init__.py")) as shared:
+                self.assertEqual(shared.read(), "__version__ = '23.2'\n" * 100)
+
+            # The stored files no venv links to are deleted
+            for project in ("b", "c", "d"):
+                shutil.rmtree(os.path.join(temp_dir, project))
+            result = newproject.dedupe.dedupe_venvs(venv_dirs=venv_dirs[:1], store_dir=store_dir)
+            self.assertGreater(result.collected, 0)
+            self.assertEqual([file_names for _, _, file_names in os.walk(store_dir) if file_names], [])
+
+        print(OK)
+
+    def test_dedupe_at_creation(self):
+        print("- test_dedupe_at_creation\n")
+        python_dir = os.path.join(self.projects_dir, "python_projects")
+        os.makedirs(python_dir)
+        config_file = os.path.join(self.temp_dir, "newproject_config.yaml")
+        with open(config_file, "w") as test_config:
+            test_config.write("python:\n  dedupe_venv: true\n")
+
+        with patch("newproject.newproject.get_config_layers", return_value=(get_default_config_file(), config_file)):
+            new_project = NewProject()
+            create, *args = new_project.project_creation("python", "tool")
+            plan = new_project.plan_project(*args)
+
+        self.assertEqual([plan_step.name for plan_step in plan],
+                         ["project_dir", "readme", "git", "venv", "dedupe", "file"])
+        self.assertEqual(plan[4].after, ("venv",))
+        self.assertEqual(plan[4].operation, newproject.plan.DedupeVenv(
+            os.path.join(python_dir, "tool", "venv"), os.path.join(python_dir, newproject.dedupe.STORE_DIR_NAME)
+        ))
+
+        print(OK)
+
+
+def write_wheel(wheelhouse: str, name: str, version: str, tags: str = "py3-none-any") -> str:
+    """
+    Writes a wheel with a module, a console script and a script
+    """
+    import zipfile
+
+    wheel_path = os.path.join(wheelhouse, f"{name}-{version}-{tags}.whl")
+    dist_info = f"{name}-{version}.dist-info"
+    with zipfile.ZipFile(wheel_path, "w") as wheel_zip:
+        wheel_zip.writestr(f"{name}/__init__.py", f"__version__ = '{version}'\ndef main():\n    print('{name}')\n")
+        wheel_zip.writestr(f"{name}-{version}.data/scripts/{name}-tool", "#!python\nprint('tool')\n")
+        wheel_zip.writestr(f"{dist_info}/METADATA", f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n")
+        wheel_zip.writestr(f"{dist_info}/entry_points.txt", f"[console_scripts]\n{name} = {name}:main\n")
+        wheel_zip.writestr(f"{dist_info}/RECORD", "")
+
+    return wheel_path
+
+
+class TestWheelhouse(IsolatedTestCase):
+    def test_find_wheels(self):
+        print("- test_find_wheels\n")
+        with tempfile.TemporaryDirectory() as wheelhouse:
+            write_wheel(wheelhouse, "tool_kit", "1.9.0")
+            write_wheel(wheelhouse, "tool_kit", "1.10.0")
+            write_wheel(wheelhouse, "tool_kit", "2.0.0", tags="cp39-cp39-win_amd64")
+            write_wheel(wheelhouse, "fastlib", "1.0", tags="cp38-abi3-manylinux_2_17_x86_64")
+
+            def versions(requirements: list) -> list:
+                wheels = newproject.wheelhouse.find_wheels(wheelhouse, requirements, python_version=(3, 11))
+                return [wheel.version for wheel in wheels]
+
+            self.assertEqual(versions(["Tool-Kit"]), ["1.10.0"])
+            self.assertEqual(versions(["tool_kit==1.9.0"]), ["1.9.0"])
+            with self.assertRaises(newproject.wheelhouse.WheelhouseError):
+                versions(["tool_kit==2.0.0"])
+            with self.assertRaises(newproject.wheelhouse.WheelhouseError):
+                versions(["tool_kit>=1"])
+            with patch("platform.machine", return_value="x86_64"), patch("sys.platform", "linux"):
+                self.assertEqual(versions(["fastlib"]), ["1.0"])
+                with self.assertRaises(newproject.wheelhouse.WheelhouseError):
+                    newproject.wheelhouse.find_wheels(wheelhouse, ["fastlib"], python_version=(3, 7))
+
+        print(OK)
+
+    def test_preinstall(self):
+        print("- test_preinstall\n")
+        wheelhouse = os.path.join(self.temp_dir, "wheelhouse")
+        os.makedirs(wheelhouse)
+        write_wheel(wheelhouse, "tool_kit", "1.0")
+        write_wheel(wheelhouse, "other", "2.0")
+
+        venv_dirs = [os.path.join(self.temp_dir, project, "venv") for project in ("a", "b")]
+        for venv_dir in venv_dirs:
+            os.makedirs(os.path.join(venv_dir, "lib", "python3.11", "site-packages"))
+            with open(os.path.join(venv_dir, "pyvenv.cfg"), "w") as pyvenv_cfg:
+                pyvenv_cfg.write("home = /usr/bin\nversion = 3.11.7\n")
+
+        wheels = newproject.wheelhouse.preinstall(venv_dirs[0], ["tool_kit", "other"], wheelhouse)
+        self.assertEqual([wheel.name for wheel in wheels], ["tool-kit", "other"])
+        # The wheels are unpacked once
+        with patch("zipfile.ZipFile") as mock_zipfile:
+            newproject.wheelhouse.preinstall(venv_dirs[1], ["tool_kit", "other"], wheelhouse)
+        mock_zipfile.assert_not_called()
+
+        site_packages = os.path.join(venv_dirs[1], "lib", "python3.11", "site-packages")
+        with open(os.path.join(site_packages, "tool_kit", "__init__.py")) as module:
+            self.assertIn("__version__ = '1.0'", module.read())
+        with open(os.path.join(venv_dirs[1], "bin", "tool_kit")) as console_script:
+            content = console_script.read()
+        self.assertTrue(content.startswith(f"#!{os.path.join(venv_dirs[1], 'bin', 'python')}\n"))
+        self.assertIn("from tool_kit import main", content)
+        with open(os.path.join(venv_dirs[1], "bin", "tool_kit-tool")) as script:
+            self.assertEqual(script.readline(), f"#!{os.path.join(venv_dirs[1], 'bin', 'python')}\n")
+        with open(os.path.join(site_packages, "tool_kit-1.0.dist-info", "RECORD")) as record:
+            recorded = [line.split(",")[0] for line in record.read().splitlines()]
+        self.assertIn("tool_kit/__init__.py", recorded)
+        self.assertIn("../../../bin/tool_kit", recorded)
+        self.assertIn("tool_kit-1.0.dist-info/INSTALLER", recorded)
+
+        # A newer version replaces the installed one
+        write_wheel(wheelhouse, "tool_kit", "1.1")
+        newproject.wheelhouse.preinstall(venv_dirs[1], ["tool_kit"], wheelhouse)
+        self.assertFalse(os.path.exists(os.path.join(site_packages, "tool_kit-1.0.dist-info")))
+        with open(os.path.join(site_packages, "tool_kit", "__init__.py")) as module:
+            self.assertIn("__version__ = '1.1'", module.read())
+        # The other venv is left alone
+        with open(os.path.join(venv_dirs[0], "lib", "python3.11", "site-packages", "tool_kit", "__init__.py")) as module:
+            self.assertIn("__version__ = '1.0'", module.read())
+
+        print(OK)
+
+    def test_preinstall_plan(self):
+        print("- test_preinstall_plan\n")
+        python_dir = os.path.join(self.projects_dir, "python_projects")
+        os.makedirs(python_dir)
+        config_file = os.path.join(self.temp_dir, "newproject_config.yaml")
+        with open(config_file, "w") as test_config:
+            test_config.write("python:\n  preinstall: [rich, pytest]\n  wheelhouse: wheels\n  dedupe_venv: true\n")
+
+        with patch("newproject.newproject.get_config_layers", return_value=(get_default_config_file(), config_file)):
+            new_project = NewProject()
+            _, *args = new_project.project_creation("python", "tool")
+            plan = new_project.plan_project(*args)
+
+        self.assertEqual([plan_step.name for plan_step in plan],
+                         ["project_dir", "readme", "git", "venv", "preinstall", "dedupe", "file"])
+        # The wheelhouse is relative to the config file
+        self.assertEqual(plan[4].operation, newproject.plan.Preinstall(
+            os.path.join(python_dir, "tool", "venv"), ("rich", "pytest"), os.path.join(self.temp_dir, "wheels")
+        ))
+        self.assertEqual(plan[5].after, ("preinstall",))
+
+        # The packages are names: the config is refused before the venv is created
+        with open(config_file, "w") as test_config:
+            test_config.write("python:\n  preinstall: [1]\n")
+        with patch("newproject.newproject.get_config_layers", return_value=(get_default_config_file(), config_file)), \
+                patch("sys.stdout", new_callable=io.StringIO) as mock_stdout, self.assertRaises(SystemExit):
+            NewProject().language_config(get_language("python"))
+        self.assertIn("is not of type 'string'", mock_stdout.getvalue())
+
+        print(OK)
+
+
+@unittest.skipIf(which("git") is None, "git is not installed")
+class TestInitialCommit(IsolatedTestCase):
+    GIT_IDENTITY: Final[dict] = {
+        "GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.com",
+        "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.com",
+    }
+
+    def test_initial_commit(self):
+        print("- test_initial_commit\n")
+        with tempfile.TemporaryDirectory() as temp_dir, patch.dict(os.environ, self.GIT_IDENTITY):
+            project_dir = os.path.join(temp_dir, "tool")
+            os.makedirs(os.path.join(project_dir, "src"))
+            newproject.git_repository.init_repository(project_dir=project_dir, git_config={})
+            paths = []
+            for relative_path, content in (("README.md", "# tool\n"), (".gitignore", "venv/\n"),
+                                           ("src/tool.py", "print('tool')\n")):
+                paths.append(os.path.join(project_dir, relative_path))
+                with open(paths[-1], "w") as scaffold_file:
+                    scaffold_file.write(content)
+            os.chmod(paths[-1], 0o755)
+            os.symlink("src/tool.py", os.path.join(project_dir, "tool"))
+            paths += [os.path.join(project_dir, "src"), os.path.join(project_dir, "tool")]
+
+            with patch("newproject.git_repository.subprocess.run", wraps=subprocess.run) as run:
+                committed = newproject.git_repository.initial_commit(project_dir=project_dir, paths=tuple(paths),
+                                                                     git_config={})
+            self.assertEqual(committed, 4)
+            # One process, whatever the number of files
+            run.assert_called_once()
+
+            def git(*args) -> str:
+                return subprocess.run(["git", "-C", project_dir, *args], capture_output=True, text=True).stdout
+
+            self.assertEqual(git("log", "--format=%an <%ae>|%s").strip(), "Test <test@example.com>|Initial commit")
+            self.assertEqual(git("ls-tree", "-r", "--format=%(objectmode) %(path)", "HEAD").split("\n")[:4],
+                             ["100644 .gitignore", "100644 README.md", "100755 src/tool.py", "120000 tool"])
+            # The index matches the commit and the files
+            self.assertEqual(git("status", "--porcelain"), "")
+            self.assertEqual(git("diff", "--cached", "--name-only", "HEAD"), "")
+
+        print(OK)
+
+    def test_initial_commit_errors(self):
+        print("- test_initial_commit_errors\n")
+        for variable in self.GIT_IDENTITY:
+            os.environ.pop(variable, None)
+        newproject.git_repository.init_repository(project_dir=self.temp_dir, git_config={})
+        with self.assertRaises(newproject.git_repository.CommitError):
+            newproject.git_repository.initial_commit(project_dir=self.temp_dir, paths=(), git_config={})
+
+        git_config = {"user.name": "Test", "user.email": "test@example.com"}
+        with open(os.path.join(self.temp_dir, ".git", "HEAD"), "w") as head_file:
+            head_file.write("0" * 40 + "\n")
+        with self.assertRaises(newproject.git_repository.CommitError):
+            newproject.git_repository.initial_commit(project_dir=self.temp_dir, paths=(), git_config=git_config)
+
+        print(OK)
+
+    def test_initial_commit_plan(self):
+        print("- test_initial_commit_plan\n")
+        python_dir = os.path.join(self.projects_dir, "python_projects")
+        os.makedirs(python_dir)
+
+        new_project = NewProject()
+        new_project.initial_commit = True
+        _, *args = new_project.project_creation("python", "tool")
+        plan = new_project.plan_project(*args)
+
+        commit_step = plan[-1]
+        self.assertEqual(commit_step.name, "commit")
+        self.assertEqual(commit_step.after, tuple(plan_step.name for plan_step in plan[:-1]))
+        project_dir = os.path.join(python_dir, "tool")
+        self.assertEqual(commit_step.operation.project_dir, project_dir)
+        for path in ("README.md", ".gitignore", "tool.py"):
+            self.assertIn(os.path.join(project_dir, path), commit_step.operation.files)
+
+        print(OK)
+
+
+class TestSteps(IsolatedTestCase):
+    def test_run_steps(self):
+        print("- test_run_steps\n")
+        calls = []
+
+        def record_call(name: str, fail: bool = False) -> None:
+            calls.append((name, threading.current_thread() is threading.main_thread()))
+            if fail:
+                raise RuntimeError(name)
+
+        def steps(slow: bool, fail: bool = False) -> list:
+            return [
+                newproject.steps.Step("dir", record_call, {"name": "dir"}),
+                newproject.steps.Step("file", record_call, {"name": "file", "fail": fail}, after=("dir",)),
+                newproject.steps.Step("venv", record_call, {"name": "venv"}, after=("dir",), slow=slow),
+                newproject.steps.Step("ide", record_call, {"name": "ide"}, after=("file", "venv")),
+            ]
+
+        # Fast steps run one after another in the current thread, without asyncio
+        with patch.dict(sys.modules, {"asyncio": None}):
+            newproject.steps.run_steps(steps(slow=False))
+        self.assertEqual(calls, [("dir", True), ("file", True), ("venv", True), ("ide", True)])
+
+        # A slow step: the steps run in a thread pool, after the steps they depend on
+        calls.clear()
+        with patch.dict(sys.modules, {"asyncio": None}):
+            newproject.steps.run_steps(steps(slow=True))
+        self.assertEqual(calls[0], ("dir", False))
+        self.assertEqual(calls[-1], ("ide", False))
+        self.assertEqual(len(calls), 4)
+
+        # The pooled steps print to the console of the creation, even the live ones
+        with console.capture_output() as output:
+            newproject.steps.run_steps([
+                newproject.steps.Step("print", lambda: console.print("captured"), {}, live=True, slow=True)
+            ])
+        self.assertIn("captured", output.getvalue())
+
+        # A failed step fails the steps that depend on it, the others are run
+        for slow in (False, True):
+            calls.clear()
+            with self.assertRaisesRegex(RuntimeError, "file"):
+                newproject.steps.run_steps(steps(slow=slow, fail=True))
+            self.assertEqual(sorted(name for name, _ in calls), ["dir", "file", "venv"])
+
+        print(OK)
+
+
+class TestVenvTemplate(IsolatedTestCase):
+    @unittest.skipIf(which("python3") is None or sys.platform.startswith("win32"), "Do not run without python3.")
+    def test_clone_venv(self):
+        print("- test_clone_venv\n")
+        golden_venv, origin = newproject.venv_template.get_golden_venv()
+        # The golden venv is built once
+        self.assertEqual(newproject.venv_template.get_golden_venv(), (golden_venv, origin))
+
+        venv_dir = os.path.join(self.temp_dir, "test_project", "venv")
+        newproject.venv_template.clone_venv(golden_venv=golden_venv, origin=origin, venv_dir=venv_dir)
+
+        # The clone is relocated: nothing points to the golden venv
+        with open(os.path.join(venv_dir, "pyvenv.cfg")) as pyvenv_cfg:
+            self.assertNotIn(origin, pyvenv_cfg.read())
+        with open(os.path.join(venv_dir, "bin", "activate")) as activate:
+            self.assertIn(venv_dir, activate.read())
+
+        prefix = subprocess.run(
+            [os.path.join(venv_dir, "bin", "python"), "-c", "import sys; print(sys.prefix)"],
+            capture_output=True, text=True
+        ).stdout.strip()
+        self.assertEqual(prefix, venv_dir)
+        pip_version = subprocess.run([os.path.join(venv_dir, "bin", "pip"), "--version"], capture_output=True, text=True)
+        self.assertEqual(pip_version.returncode, 0)
+        self.assertIn(venv_dir, pip_version.stdout)
+
+        # Editing the clone leaves the golden venv untouched
+        pip_files = glob.glob(os.path.join("lib", "python*", "site-packages", "pip", "__init__.py"), root_dir=venv_dir)
+        self.assertEqual(len(pip_files), 1)
+        with open(os.path.join(golden_venv, pip_files[0])) as golden_file:
+            golden_content = golden_file.read()
+        with open(os.path.join(venv_dir, pip_files[0]), "a") as cloned_file:
+            cloned_file.write("# edited in the project\n")
+        with open(os.path.join(golden_venv, pip_files[0])) as golden_file:
+            self.assertEqual(golden_file.read(), golden_content)
+        self.assertEqual(os.stat(os.path.join(golden_venv, pip_files[0])).st_nlink, 1)
+
+        print(OK)
+
+    @patch("newproject.newproject.get_golden_venv", side_effect=Exception("Test Exception"))
+    @patch("subprocess.run")
+    def test_clone_python_venv_fallback(self, mock_run, mock_get_golden_venv):
+        print("- test_clone_python_venv_fallback\n")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = os.path.join(temp_dir, "test_project")
+            NewProject.clone_python_venv(new_project_path=project_dir)
+
+            # The venv is created the normal way
+            mock_run.assert_called_once_with(["python3", "-m", "venv", f"{project_dir}/venv"])
+
+        print(OK)
+
+
+class TestNewProject(IsolatedTestCase):
     @unittest.skipIf(which("code") is None, "Do not run if code is not installed.")
     @patch("shutil.which", return_value="code")
     @patch("subprocess.run")
@@ -227,12 +1756,11 @@ class TestNewProject(unittest.TestCase):
         print("OK")
 
     @patch("subprocess.run")
-    @patch("shutil.which")
-    def test_git_init_command_success(self, mock_which, mock_run):
+    def test_git_init_command_success(self, mock_run):
         print("- test_git_init_command_success\n")
-        mock_which.return_value = which("git")
 
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch.dict(os.environ, {"GIT_CONFIG_GLOBAL": os.devnull, "GIT_CONFIG_NOSYSTEM": "1"}):
             content = "sample_content"
 
             NewProject().git_init_command(temp_dir, content)
@@ -248,11 +1776,61 @@ class TestNewProject(unittest.TestCase):
             # Assert that the .gitignore is not empty
             self.assertFalse(is_empty)
 
-            # Assert that git init was called
+            # Assert that the repository was initialized without forking git
+            self.assertTrue(os.path.isfile(os.path.join(temp_dir, ".git", "HEAD")))
+            mock_run.assert_not_called()
+
+        print(OK)
+
+    @patch("subprocess.run")
+    @patch("shutil.which")
+    def test_git_init_command_with_git_binary(self, mock_which, mock_run):
+        print("- test_git_init_command_with_git_binary\n")
+        mock_which.return_value = which("git")
+
+        with tempfile.TemporaryDirectory() as temp_dir, patch.dict(os.environ, {"GIT_TEMPLATE_DIR": temp_dir}):
+            NewProject().git_init_command(temp_dir, "sample_content")
+
+            # Templates need git init
             mock_run.assert_called_once_with(["git", "init", temp_dir])
 
         print(OK)
 
+    @unittest.skipIf(which("git") is None, "Do not run if git is not installed.")
+    def test_init_repository_like_git_init(self):
+        print("- test_init_repository_like_git_init\n")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, ".gitconfig"), "w") as gitconfig:
+                gitconfig.write("[user]\n\tname = Test\n[init]\n\tdefaultBranch = trunk  # comment\n")
+            env = {"HOME": temp_dir, "XDG_CONFIG_HOME": os.path.join(temp_dir, ".config"), "GIT_CONFIG_NOSYSTEM": "1"}
+
+            git_status = {}
+            for project in ["in_process", "git_init"]:
+                project_dir = os.path.join(temp_dir, project)
+                os.mkdir(project_dir)
+                with open(os.path.join(project_dir, "main.c"), "w") as source_file:
+                    source_file.write("int main() {}\n")
+
+                with patch.dict(os.environ, env):
+                    if project == "in_process":
+                        git_config = newproject.git_repository.read_git_config()
+                        self.assertFalse(newproject.git_repository.requires_git_binary(project_dir, git_config))
+                        newproject.git_repository.init_repository(project_dir, git_config)
+                    else:
+                        subprocess.run(["git", "init", "-q", "--template=", project_dir], check=True)
+
+                    git_status[project] = [
+                        subprocess.run(command, cwd=project_dir, capture_output=True, text=True)
+                        for command in [["git", "status"], ["git", "config", "--local", "--list"]]
+                    ]
+
+            for in_process, git_init in zip(git_status["in_process"], git_status["git_init"]):
+                self.assertEqual(in_process.returncode, 0, in_process.stderr)
+                self.assertEqual(in_process.stdout, git_init.stdout)
+            self.assertIn("On branch trunk", git_status["in_process"][0].stdout)
+
+        print(OK)
+
     @patch("subprocess.run", side_effect=Exception("Test Exception"))
     @patch("logging.error")
     def test_git_init_command_failure(self, mock_run, mock_logging_error):
@@ -273,6 +1851,171 @@ class TestNewProject(unittest.TestCase):
 
         print(OK)
 
+    def test_handle_several_languages(self):
+        print("- test_handle_several_languages\n")
+        for projects_dir_name in ["bash_projects", "lua_projects", "web_projects"]:
+            os.makedirs(os.path.join(self.projects_dir, projects_dir_name))
+
+        def slow_git_init(command, **kwargs):
+            time.sleep(0.5)
+            return subprocess.CompletedProcess(command, 0, stdout=f"git init {command[-1]}\n")
+
+        start = time.monotonic()
+        with patch("subprocess.run", side_effect=slow_git_init) as mock_run, \
+                patch("newproject.newproject.requires_git_binary", return_value=True), \
+                patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            # The same name for every language
+            NewProject().handle(bash="same_name", lua="same_name", web="same_name")
+        elapsed = time.monotonic() - start
+
+        # Every flag is honored
+        for projects_dir_name in ["bash_projects", "lua_projects", "web_projects"]:
+            self.assertTrue(os.path.isdir(os.path.join(self.projects_dir, projects_dir_name, "same_name")))
+        self.assertEqual(mock_run.call_count, 3)
+
+        # The creations overlap
+        self.assertLess(elapsed, 1.0)
+
+        # The output of every creation is printed in one block
+        out = mock_stdout.getvalue()
+        self.assertEqual(out.count("Happy Coding!"), 3)
+        for block in out.split("Happy Coding!")[:-1]:
+            self.assertEqual(block.count("Initializing git repository"), 1)
+            self.assertEqual(block.count("git init"), 1)
+
+        print(OK)
+
+    def test_handle_dry_run(self):
+        print("- test_handle_dry_run\n")
+        os.makedirs(os.path.join(self.projects_dir, "web_projects"))
+
+        new_project = NewProject()
+        with patch("subprocess.run") as mock_run, \
+                patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            new_project.handle(web="site", code=True, dry_run=True)
+
+        # Nothing is created
+        mock_run.assert_not_called()
+        self.assertEqual(os.listdir(os.path.join(self.projects_dir, "web_projects")), [])
+
+        out = mock_stdout.getvalue()
+        site_dir = os.path.join(self.projects_dir, "web_projects", "site")
+        for line in [f"mkdir     {site_dir}", f"git-init  {site_dir}", f"write     {site_dir}/styles/style.css",
+                     f"open-ide  code {site_dir}"]:
+            self.assertIn(line, out)
+
+        # The next creation of the same instance (e.g. in the daemon) is not a dry run
+        self.assertIsInstance(new_project.executor, newproject.plan.DryRunExecutor)
+        with patch("sys.stdout", new_callable=io.StringIO):
+            new_project.handle(web="site")
+        self.assertTrue(os.path.isfile(os.path.join(site_dir, "styles", "style.css")))
+
+        # An executor must carry out the plans
+        with self.assertRaises(TypeError):
+            newproject.plan.Executor()
+
+        print(OK)
+
+    def test_plan_project(self):
+        print("- test_plan_project\n")
+        os.makedirs(os.path.join(self.projects_dir, "python_projects"))
+
+        plan = NewProject().plan_project(
+            projects_dir_name="python_projects",
+            project_name="tool",
+            file_name="tool.py",
+            file_content="print()\n",
+            gitignore_content="venv/\n",
+            ide="code",
+            venv=True,
+        )
+
+        self.assertEqual([plan_step.name for plan_step in plan], ["project_dir", "readme", "git", "venv", "file", "ide"])
+        self.assertEqual(
+            [type(plan_step.operation) for plan_step in plan],
+            [newproject.plan.MakeDir, newproject.plan.WriteFile, newproject.plan.GitInit,
+             newproject.plan.CreateVenv, newproject.plan.WriteFile, newproject.plan.OpenIde]
+        )
+        # Every step waits for the project folder, the IDE waits for everything
+        self.assertTrue(all(plan_step.after == ("project_dir",) for plan_step in plan[1:-1]))
+        self.assertEqual(plan[-1].after, ("project_dir", "readme", "git", "venv", "file"))
+        # Planning has no side effect
+        self.assertFalse(os.path.exists(os.path.join(self.projects_dir, "python_projects", "tool")))
+
+        print(OK)
+
+    def test_create_project_steps_overlap(self):
+        print("- test_create_project_steps_overlap\n")
+        os.makedirs(os.path.join(self.projects_dir, "python_projects"))
+        commands = []
+
+        def slow_command(command, **kwargs):
+            if command[0] != "code":
+                # venv and git init
+                time.sleep(0.5)
+            commands.append(command[0])
+            return subprocess.CompletedProcess(command, 0, stdout="")
+
+        start = time.monotonic()
+        with patch("subprocess.run", side_effect=slow_command), \
+                patch("newproject.newproject.get_golden_venv", side_effect=Exception("No golden venv")), \
+                patch("newproject.newproject.which", return_value="/bin/code"):
+            new_project = NewProject()
+            new_project.create_project(
+                projects_dir_name="python_projects",
+                project_name="test_project",
+                file_name="test_project.py",
+                file_content="",
+                gitignore_content="",
+                ide="code",
+                venv=True,
+            )
+        elapsed = time.monotonic() - start
+
+        # venv and git init overlap, the IDE is opened once every other step is done
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual(commands[-1], "code")
+        self.assertTrue(
+            os.path.exists(os.path.join(self.projects_dir, "python_projects", "test_project", "README.md"))
+        )
+
+        print(OK)
+
+    def test_create_project_from_template(self):
+        print("- test_create_project_from_template\n")
+        os.makedirs(os.path.join(self.projects_dir, "go_projects"))
+        template_dir = os.path.join(self.temp_dir, "template")
+        template_files = ["README.md", "cmd/service/main.go", "internal/a/a.go", "internal/b/b.go", "scripts/run.sh"]
+        for template_file in template_files:
+            os.makedirs(os.path.dirname(os.path.join(template_dir, template_file)), exist_ok=True)
+            with open(os.path.join(template_dir, template_file), "w") as f:
+                f.write(f"// {template_file} of {{{{ project_name }}}}\n")
+        os.chmod(os.path.join(template_dir, "scripts/run.sh"), 0o755)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            NewProject().create_project(
+                projects_dir_name="go_projects",
+                project_name="test_project",
+                file_name="main.go",
+                file_content="",
+                gitignore_content="",
+                template_dir=template_dir,
+            )
+
+        project_dir = os.path.join(self.projects_dir, "go_projects", "test_project")
+        for template_file in template_files:
+            with open(os.path.join(project_dir, template_file)) as f:
+                self.assertEqual(f.read(), f"// {template_file} of test_project\n")
+        self.assertTrue(os.access(os.path.join(project_dir, "scripts/run.sh"), os.X_OK))
+        # The template replaces the single file
+        self.assertFalse(os.path.exists(os.path.join(project_dir, "main.go")))
+
+        # One summary line instead of one line per file
+        self.assertIn(f"▶ {len(template_files)} files created from", mock_stdout.getvalue())
+        self.assertNotIn("main.go created", mock_stdout.getvalue())
+
+        print(OK)
+
     @patch("builtins.open", new_callable=mock_open)
     def test_create_and_write_file_success(self, mock_file_open):
         print("- test_create_and_write_file\n")